@@ -1,7 +1,7 @@
 from .constants import NOT_REQUIRED, REQUIRED, KEYED, DO_NOTHING, CRF, REQUISITION
-from .metadata import MetadataGetter
+from .metadata import MetadataGetter, SubjectMetadataTimeline
 from .metadata_handler import MetadataObjectDoesNotExist
-from .metadata_updater import MetadataUpdater
+from .metadata_updater import MetadataUpdater, BulkMetadataUpdater
 from .next_form_getter import NextFormGetter
 from .requisition import RequisitionMetadataUpdater
 from .requisition import TargetPanelNotScheduledForVisit, InvalidTargetPanel
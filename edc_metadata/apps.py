@@ -23,12 +23,32 @@ class AppConfig(DjangoAppConfig):
     create_on_reasons = [SCHEDULED, UNSCHEDULED]
     delete_on_reasons = [MISSED_VISIT]
 
+    # if True, CRF metadata updates and rules are run once per visit
+    # when the transaction commits, see MetadataCoalescer
+    coalesce_on_commit = False
+
+    # if True, rules are queued and run by the process_metadata_queue
+    # command, see RuleQueue
+    defer_metadata_rules = False
+
+    # if True, the counts of metadata by entry status per visit are
+    # kept in MetadataSummary, see MetadataSummaryUpdater
+    metadata_summary_enabled = False
+
     def ready(self):
         from .signals import (
             metadata_update_on_post_save,
             metadata_create_on_post_save,
             metadata_reset_on_post_delete,
+            metadata_identity_map_on_post_save,
+            metadata_identity_map_on_post_delete,
+            site_panels_reset_on_post_save,
+            site_panels_reset_on_post_delete,
+            metadata_summary_on_post_save,
+            metadata_summary_on_post_delete,
         )
+        from .form_plans import site_form_plans
+        from .rule_groups import site_rule_groups
 
         sys.stdout.write(f'Loading {self.verbose_name} ...\n')
         if self.app_label == self.name:
@@ -37,6 +57,10 @@ class AppConfig(DjangoAppConfig):
         else:
             sys.stdout.write(
                 f' * using custom metadata models from \'{self.app_label}\'\n')
+        site_form_plans.compile()
+        sys.stdout.write(
+            f' * compiled {len(site_form_plans.registry)} visit form plans\n')
+        site_rule_groups.compile()
         sys.stdout.write(f' Done loading {self.verbose_name}.\n')
 
     @property
@@ -58,12 +82,30 @@ class AppConfig(DjangoAppConfig):
             return self.requisition_model
         return None
 
-    def get_metadata(self, subject_identifier, **options):
-        return {
+    def get_metadata_timeline(self, subject_identifier, **options):
+        """Returns the metadata of all visits of a subject,
+        see SubjectMetadataTimeline.
+        """
+        from .metadata import SubjectMetadataTimeline
+        return SubjectMetadataTimeline(
+            subject_identifier=subject_identifier, **options)
+
+    def get_metadata(self, subject_identifier, projection=None, **options):
+        """Returns a dictionary of the CRF and requisition metadata
+        querysets or, if `projection`, lists of MetadataRecords.
+        """
+        from .metadata import CrfMetadataGetter, RequisitionMetadataGetter
+        metadata = {
             CRF: self.crf_model.objects.filter(
                 subject_identifier=subject_identifier, **options),
             REQUISITION: self.requisition_model.objects.filter(
                 subject_identifier=subject_identifier, **options)}
+        if projection:
+            metadata = {
+                CRF: CrfMetadataGetter.get_records(metadata[CRF]),
+                REQUISITION: RequisitionMetadataGetter.get_records(
+                    metadata[REQUISITION])}
+        return metadata
 
 
 if settings.APP_NAME == 'edc_metadata':
@@ -0,0 +1,79 @@
+import threading
+
+from collections import OrderedDict
+from django.apps import apps as django_apps
+
+from .metadata import Resetter
+
+
+class BulkResetter(threading.local):
+
+    """A context manager that collects the CRFs and requisitions
+    deleted in its block and, on exit, resets their metadata
+    with a few statements per visit and runs the rules once per
+    visit.
+
+    For example:
+
+        with metadata_bulk_resetter:
+            CrfOne.objects.filter(...).delete()
+
+    or:
+
+        metadata_bulk_resetter.delete(CrfOne.objects.filter(...))
+
+    Metadata is not reset if the block raises.
+    """
+
+    resetter_cls = Resetter
+
+    def __init__(self):
+        self.depth = 0
+        self.pending = OrderedDict()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+    def __enter__(self):
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.depth -= 1
+        if not self.depth:
+            pending = self.pending
+            self.pending = OrderedDict()
+            if not exc_type:
+                self.process(pending)
+
+    def add(self, instance=None):
+        """Returns True if the deleted instance is collected
+        to be reset on exit.
+        """
+        if not self.depth or not hasattr(instance, 'metadata_reset_on_delete'):
+            return False
+        options = instance.metadata_query_options
+        visit = instance.visit
+        visit, keys = self.pending.setdefault(visit.pk, (visit, []))
+        keys.append((options.get('model'), options.get('panel_name')))
+        return True
+
+    def delete(self, queryset=None):
+        """Deletes a queryset of CRFs or requisitions and
+        resets their metadata.
+        """
+        with self:
+            return queryset.delete()
+
+    def process(self, pending=None):
+        rules_enabled = django_apps.get_app_config(
+            'edc_metadata_rules').metadata_rules_enabled
+        for visit, keys in pending.values():
+            if not visit.__class__.objects.filter(pk=visit.pk).exists():
+                continue  # the visit was deleted in the same block
+            self.resetter_cls(visit=visit).reset(keys=keys)
+            if rules_enabled:
+                visit.run_metadata_rules(visit=visit)
+
+
+metadata_bulk_resetter = BulkResetter()
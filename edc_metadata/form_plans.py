@@ -0,0 +1,228 @@
+from types import MappingProxyType
+
+from edc_visit_schedule import site_visit_schedules
+
+from .constants import NOT_REQUIRED, REQUIRED
+
+
+class FormPlanError(Exception):
+    pass
+
+
+class FormPlan:
+
+    """An immutable, compiled view of the forms of a scheduled or
+    unscheduled visit in the visit schedule.
+
+    CRFs are keyed as (model, None) and requisitions as
+    (model, panel_name). PRN forms are included in `models`,
+    `panel_names`, `entry_statuses` and `show_orders` but are not
+    in `crfs` or `requisitions`, the forms for which metadata
+    is created.
+    """
+
+    __slots__ = ('visit_schedule_name', 'schedule_name', 'visit', 'unscheduled',
+                 'crfs', 'requisitions', 'models', 'panel_names', 'keys',
+                 'entry_statuses', 'show_orders', 'crfs_by_model',
+                 'requisitions_by_panel_name', 'requisitions_by_key')
+
+    def __init__(self, visit_schedule_name=None, schedule_name=None,
+                 visit=None, unscheduled=None):
+        self.visit_schedule_name = visit_schedule_name
+        self.schedule_name = schedule_name
+        self.visit = visit  # visit instance from the visit schedule
+        self.unscheduled = unscheduled
+        if unscheduled:
+            self.crfs = tuple(visit.crfs_unscheduled)
+            self.requisitions = tuple(visit.requisitions_unscheduled)
+        else:
+            self.crfs = tuple(visit.crfs)
+            self.requisitions = tuple(visit.requisitions)
+        crfs = self.crfs + tuple(visit.crfs_prn)
+        requisitions = self.requisitions + tuple(visit.requisitions_prn)
+        self.models = frozenset(
+            [crf.model for crf in crfs] + [r.model for r in requisitions])
+        self.panel_names = frozenset([r.panel.name for r in requisitions])
+        entry_statuses = {}
+        show_orders = {}
+        for key, form in ([((crf.model, None), crf) for crf in crfs]
+                          + [((r.model, r.panel.name), r) for r in requisitions]):
+            if key not in entry_statuses:
+                entry_statuses[key] = REQUIRED if form.required else NOT_REQUIRED
+                show_orders[key] = form.show_order
+        self.keys = frozenset(entry_statuses)
+        self.entry_statuses = MappingProxyType(entry_statuses)
+        self.show_orders = MappingProxyType(show_orders)
+        crfs_by_model = {}
+        for crf in visit.all_crfs:
+            crfs_by_model.setdefault(crf.model, crf)
+        self.crfs_by_model = MappingProxyType(crfs_by_model)
+        requisitions_by_panel_name = {}
+        requisitions_by_key = {}
+        for requisition in visit.all_requisitions:
+            requisitions_by_panel_name.setdefault(requisition.panel.name, requisition)
+            requisitions_by_key.setdefault(
+                (requisition.model, requisition.panel.name), requisition)
+        self.requisitions_by_panel_name = MappingProxyType(
+            requisitions_by_panel_name)
+        self.requisitions_by_key = MappingProxyType(requisitions_by_key)
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}({self.visit_schedule_name}, '
+                f'{self.schedule_name}, {self.visit.code}, '
+                f'unscheduled={self.unscheduled})')
+
+    @property
+    def key(self):
+        return (self.visit_schedule_name, self.schedule_name,
+                self.visit.code, self.unscheduled)
+
+
+class SchedulePlan:
+
+    """An immutable index of the forms of all visits of a
+    schedule, scheduled, unscheduled and PRN.
+
+    `keys` are (model, None) for CRFs and (model, panel_name)
+    for requisitions.
+    """
+
+    __slots__ = ('visit_schedule_name', 'schedule_name', 'schedule',
+                 'keys', 'models', 'panel_names')
+
+    def __init__(self, visit_schedule_name=None, schedule_name=None,
+                 schedule=None):
+        self.visit_schedule_name = visit_schedule_name
+        self.schedule_name = schedule_name
+        self.schedule = schedule
+        keys = set()
+        for visit in schedule.visits.values():
+            keys.update([(crf.model, None) for crf in visit.all_crfs])
+            keys.update([(r.model, r.panel.name) for r in visit.all_requisitions])
+        self.keys = frozenset(keys)
+        self.models = frozenset([model for model, _ in keys])
+        self.panel_names = frozenset(
+            [panel_name for _, panel_name in keys if panel_name])
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}({self.visit_schedule_name}, '
+                f'{self.schedule_name})')
+
+    @property
+    def key(self):
+        return (self.visit_schedule_name, self.schedule_name)
+
+
+class SiteFormPlans:
+
+    """A registry of compiled FormPlans for every visit, scheduled
+    and unscheduled, and a SchedulePlan for every schedule in the
+    registered visit schedules.
+
+    Plans are compiled by AppConfig.ready and compiled on demand
+    for visit schedules registered later. Call `reset` if
+    site_visit_schedules is re-populated with different visit
+    schedules.
+    """
+
+    form_plan_cls = FormPlan
+    schedule_plan_cls = SchedulePlan
+
+    def __init__(self):
+        self.registry = {}
+        self.schedule_registry = {}
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+    def reset(self):
+        self.registry = {}
+        self.schedule_registry = {}
+
+    def compile(self):
+        """Compiles a FormPlan for each visit of each schedule
+        of each registered visit schedule.
+        """
+        self.reset()
+        if site_visit_schedules.loaded:
+            for visit_schedule in site_visit_schedules.registry.values():
+                for schedule in visit_schedule.schedules.values():
+                    self._register_schedule(
+                        visit_schedule_name=visit_schedule.name,
+                        schedule_name=schedule.name,
+                        schedule=schedule)
+                    for visit in schedule.visits.values():
+                        for unscheduled in [False, True]:
+                            self._register(
+                                visit_schedule_name=visit_schedule.name,
+                                schedule_name=schedule.name,
+                                visit=visit,
+                                unscheduled=unscheduled)
+
+    def _register(self, **kwargs):
+        form_plan = self.form_plan_cls(**kwargs)
+        self.registry.update({form_plan.key: form_plan})
+        return form_plan
+
+    def _register_schedule(self, **kwargs):
+        schedule_plan = self.schedule_plan_cls(**kwargs)
+        self.schedule_registry.update({schedule_plan.key: schedule_plan})
+        return schedule_plan
+
+    def get_schedule_plan(self, visit_schedule_name=None, schedule_name=None):
+        """Returns a SchedulePlan, compiling it if not yet registered.
+        """
+        try:
+            schedule_plan = self.schedule_registry[
+                (visit_schedule_name, schedule_name)]
+        except KeyError:
+            visit_schedule = site_visit_schedules.get_visit_schedule(
+                visit_schedule_name)
+            schedule = visit_schedule.schedules.get(schedule_name)
+            if not schedule:
+                raise FormPlanError(
+                    f'Invalid schedule. Got {visit_schedule_name}.{schedule_name}.')
+            schedule_plan = self._register_schedule(
+                visit_schedule_name=visit_schedule_name,
+                schedule_name=schedule_name,
+                schedule=schedule)
+        return schedule_plan
+
+    def get_plan(self, visit_schedule_name=None, schedule_name=None,
+                 visit_code=None, unscheduled=None):
+        """Returns a FormPlan, compiling it if not yet registered.
+        """
+        unscheduled = bool(unscheduled)
+        try:
+            form_plan = self.registry[
+                (visit_schedule_name, schedule_name, visit_code, unscheduled)]
+        except KeyError:
+            visit_schedule = site_visit_schedules.get_visit_schedule(
+                visit_schedule_name)
+            schedule = visit_schedule.schedules.get(schedule_name)
+            try:
+                visit = schedule.visits.get(visit_code)
+            except AttributeError:
+                visit = None
+            if not visit:
+                raise FormPlanError(
+                    f'Invalid visit. Got {visit_schedule_name}.{schedule_name}.'
+                    f'{visit_code}.')
+            form_plan = self._register(
+                visit_schedule_name=visit_schedule_name,
+                schedule_name=schedule_name,
+                visit=visit,
+                unscheduled=unscheduled)
+        return form_plan
+
+    def get_plan_for_visit(self, visit=None):
+        """Returns the FormPlan for a visit model instance.
+        """
+        return self.get_plan(
+            visit_schedule_name=visit.visit_schedule_name,
+            schedule_name=visit.schedule_name,
+            visit_code=visit.visit_code,
+            unscheduled=visit.visit_code_sequence != 0)
+
+
+site_form_plans = SiteFormPlans()
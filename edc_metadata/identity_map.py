@@ -0,0 +1,201 @@
+import threading
+
+from django.db import transaction
+
+
+class MetadataIdentityMap(threading.local):
+
+    """A context manager that caches the CRF and requisition
+    metadata model instances read in its block so that each
+    row is loaded at most once, for example per request, see
+    MetadataIdentityMapMiddleware.
+
+    For example:
+
+        with metadata_identity_map:
+            crf_one.save()
+            NextFormGetter().next_form(model_obj=crf_one)
+
+    Saved instances replace the cached copy. Rows updated or
+    inserted in bulk, e.g. by the Creator or the Resetter,
+    invalidate the cached rows of their visit. Outside of a
+    block, reads go to the database as before.
+
+    Rows loaded or saved in a transaction or savepoint are
+    discarded once it ends, unless the transaction is committed,
+    so rolled back writes are not served from the cache. Lookups
+    that do not give the full natural key go to the database.
+
+    The cache is discarded on exit. Rows changed by another
+    process are not re-read until then, but a `versioned_save`
+    of a stale row re-reads it.
+
+    The map is not active unless opened, for example by adding
+    MetadataIdentityMapMiddleware to settings.MIDDLEWARE.
+    """
+
+    key_fields = ('subject_identifier', 'visit_schedule_name',
+                  'schedule_name', 'visit_code', 'visit_code_sequence',
+                  'model', 'panel_name')
+    visit_fields = ('subject_identifier', 'visit_schedule_name',
+                    'schedule_name', 'visit_code', 'visit_code_sequence')
+
+    def __init__(self):
+        self.depth = 0
+        self.clear()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+    def __enter__(self):
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.depth -= 1
+        if not self.depth:
+            self.clear()
+
+    @property
+    def active(self):
+        return self.depth > 0
+
+    def clear(self):
+        self.rows = {}
+        self.loaded = set()
+        self.savepoints = {}
+
+    def get_key(self, model_cls=None, options=None):
+        return (model_cls._meta.label_lower, ) + tuple(
+            options.get(field) for field in self.key_fields)
+
+    def get_visit_key(self, model_cls=None, options=None):
+        return (model_cls._meta.label_lower, ) + tuple(
+            options.get(field) for field in self.visit_fields)
+
+    def is_key(self, model_cls=None, options=None):
+        """Returns True if `options` are the fields of the natural
+        key of the metadata model.
+        """
+        field_names = [field.name for field in model_cls._meta.fields]
+        return set(options) == set(
+            field for field in self.key_fields if field in field_names)
+
+    def get_savepoints(self, using=None):
+        """Returns a tuple of the database alias and the savepoints
+        of the current transaction or None in autocommit mode.
+        """
+        connection = transaction.get_connection(using)
+        if connection.in_atomic_block:
+            return (using, ) + tuple(connection.savepoint_ids)
+        return None
+
+    def is_current(self, savepoints=None):
+        """Returns True if the transaction and savepoints returned
+        by `get_savepoints` have not ended.
+        """
+        using, savepoint_ids = savepoints[0], savepoints[1:]
+        connection = transaction.get_connection(using)
+        return (connection.in_atomic_block
+                and tuple(connection.savepoint_ids[:len(savepoint_ids)]) == savepoint_ids)
+
+    def check(self, visit_key=None):
+        """Discards the rows of a visit if loaded or saved in a
+        transaction or savepoint that has since ended.
+
+        A released savepoint cannot be told apart from a rolled
+        back one, so the rows are discarded in either case.
+        """
+        savepoints = self.savepoints.get(visit_key)
+        if savepoints and not self.is_current(savepoints):
+            self.discard_visit(visit_key)
+
+    def touch(self, visit_key=None, using=None):
+        """Records the transaction and savepoints of rows of a visit
+        loaded or saved now.
+        """
+        self.check(visit_key)
+        savepoints = self.get_savepoints(using)
+        if savepoints:
+            if visit_key not in self.savepoints:
+                transaction.on_commit(
+                    lambda: self.savepoints.pop(visit_key, None), using=using)
+            self.savepoints.update({visit_key: savepoints})
+
+    def discard_visit(self, visit_key=None):
+        self.rows.pop(visit_key, None)
+        self.loaded.discard(visit_key)
+        self.savepoints.pop(visit_key, None)
+
+    def get(self, model_cls=None, **options):
+        """Returns a metadata model instance for the natural
+        key in `options` or raises DoesNotExist.
+        """
+        if not self.active or not self.is_key(model_cls, options):
+            return model_cls.objects.get(**options)
+        visit_key = self.get_visit_key(model_cls, options)
+        self.check(visit_key)
+        try:
+            return self.rows[visit_key][self.get_key(model_cls, options)]
+        except KeyError:
+            if visit_key in self.loaded:
+                raise model_cls.DoesNotExist(
+                    f'{model_cls._meta.object_name} matching query does not '
+                    f'exist. Got {options}.')
+        obj = model_cls.objects.get(**options)
+        self.put(obj)
+        return obj
+
+    def filter(self, model_cls=None, **options):
+        """Returns a list of the metadata model instances of a
+        visit ordered by show_order, loaded once.
+
+        `options` are the `visit_fields`.
+        """
+        if not self.active or set(options) != set(self.visit_fields):
+            return list(model_cls.objects.filter(**options).order_by('show_order'))
+        visit_key = self.get_visit_key(model_cls, options)
+        self.check(visit_key)
+        if visit_key not in self.loaded:
+            self.touch(visit_key, model_cls.objects.db)
+            rows = self.rows.setdefault(visit_key, {})
+            for obj in model_cls.objects.filter(**options):
+                rows.setdefault(self.get_key(model_cls, obj.__dict__), obj)
+            self.loaded.add(visit_key)
+        return sorted(self.rows.get(visit_key, {}).values(),
+                      key=lambda obj: obj.show_order)
+
+    def put(self, obj=None):
+        """Caches or replaces the cached copy of a metadata
+        model instance.
+        """
+        if self.active and hasattr(obj, 'versioned_save'):
+            model_cls = obj.__class__
+            visit_key = self.get_visit_key(model_cls, obj.__dict__)
+            self.touch(visit_key, obj._state.db)
+            self.rows.setdefault(visit_key, {}).update(
+                {self.get_key(model_cls, obj.__dict__): obj})
+
+    def discard(self, obj=None):
+        """Removes a deleted metadata model instance.
+        """
+        if self.active and hasattr(obj, 'versioned_save'):
+            model_cls = obj.__class__
+            visit_key = self.get_visit_key(model_cls, obj.__dict__)
+            self.touch(visit_key, obj._state.db)
+            self.rows.get(visit_key, {}).pop(
+                self.get_key(model_cls, obj.__dict__), None)
+
+    def invalidate(self, visit=None):
+        """Removes the cached metadata model instances of a
+        visit model instance.
+        """
+        if self.active:
+            visit_values = tuple(getattr(visit, field) for field in self.visit_fields)
+            for visit_key in [
+                    key for key in set(self.rows) | self.loaded
+                    if key[1:] == visit_values]:
+                self.discard_visit(visit_key)
+
+
+metadata_identity_map = MetadataIdentityMap()
@@ -0,0 +1,266 @@
+import django
+import json
+import os
+import sys
+
+from django.apps import apps as django_apps
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import color_style
+from django.db import connections, transaction
+from multiprocessing import Pool
+from time import time
+
+from ...model_mixins.creates import CreatesMetadataModelMixin
+
+style = color_style()
+
+
+def init_worker():
+    if not django_apps.ready:
+        django.setup()
+
+
+def create_metadata_for_chunk(label_lower=None, pks=None, run_rules=None):
+    """Creates metadata in bulk for a chunk of visit model instances.
+
+    Returns a tuple of (label_lower, first_pk, last_pk, count,
+    errors, failed) where failed is a list of the pks of the
+    visits with errors.
+
+    Each visit is processed in its own transaction. An error is
+    recorded and the visit skipped so that one invalid visit, for
+    example with a visit code no longer in the schedule, does not
+    stop the run.
+    """
+    errors = []
+    failed = []
+    model_cls = django_apps.get_model(label_lower)
+    for visit in model_cls.objects.filter(pk__in=pks):
+        try:
+            with transaction.atomic():
+                metadata = visit.metadata_cls(
+                    visit=visit, update_keyed=True, bulk=True)
+                metadata.prepare()
+                if run_rules:
+                    visit.run_metadata_rules(defer=False)
+        except Exception as e:
+            errors.append(f'{visit.pk}: {e.__class__.__name__}: {e}')
+            failed.append(visit.pk)
+    return label_lower, pks[0], pks[-1], len(pks), errors, failed
+
+
+def create_metadata_for_chunk_star(args):
+    return create_metadata_for_chunk(*args)
+
+
+class Command(BaseCommand):
+
+    help = ('Create metadata in bulk for existing visits, for example after '
+            'importing a legacy cohort.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--models',
+            dest='models',
+            default=None,
+            help=('Comma separated list of visit models, e.g. '
+                  '"app_label.subjectvisit". (Default: all visit models)'),
+        )
+
+        parser.add_argument(
+            '--chunk-size',
+            dest='chunk_size',
+            type=int,
+            default=500,
+            help=('Number of visits per chunk. (Default: 500)'),
+        )
+
+        parser.add_argument(
+            '--processes',
+            dest='processes',
+            type=int,
+            default=os.cpu_count() or 1,
+            help=('Number of worker processes. (Default: number of CPUs)'),
+        )
+
+        parser.add_argument(
+            '--checkpoint',
+            dest='checkpoint',
+            default=None,
+            help=('Path to a checkpoint file. Completed chunks are recorded '
+                  'so that an interrupted run resumes where it stopped. '
+                  'Chunks with errors are retried, their failed visits '
+                  'are listed under "failed".'),
+        )
+
+        parser.add_argument(
+            '--restart',
+            dest='restart',
+            action='store_true',
+            default=False,
+            help=('Ignore an existing checkpoint file and start again.'),
+        )
+
+        parser.add_argument(
+            '--run-rules',
+            dest='run_rules',
+            action='store_true',
+            default=False,
+            help=('Run the metadata rules for each visit. (Default: False)'),
+        )
+
+    def handle(self, *args, **options):
+        self.chunk_size = options.get('chunk_size')
+        self.processes = options.get('processes')
+        self.checkpoint = options.get('checkpoint')
+        self.run_rules = options.get('run_rules')
+        if self.chunk_size < 1 or self.processes < 1:
+            raise CommandError(
+                'Invalid option. Expected --chunk-size and --processes > 0.')
+        self.completed = {}
+        self.failed = {}
+        self.segments = {}
+        if self.checkpoint and not options.get('restart'):
+            self.completed, self.failed = self.read_checkpoint()
+        models = self.get_models(options.get('models'))
+
+        sys.stdout.write(style.SUCCESS('\n\nCreate metadata.\n'))
+        chunks = []
+        for model_cls in models:
+            chunks.extend(self.get_chunks(model_cls))
+        total = sum([len(chunk[1]) for chunk in chunks])
+        sys.stdout.write(
+            f'{total} visits in {len(chunks)} chunks to process '
+            f'using {self.processes} processes.\n')
+
+        self.done = 0
+        self.errors = []
+        self.start = time()
+        if self.processes == 1 or len(chunks) <= 1:
+            for label_lower, pks in chunks:
+                self.chunk_done(create_metadata_for_chunk(
+                    label_lower, pks, self.run_rules), total)
+        else:
+            connections.close_all()
+            with Pool(processes=self.processes, initializer=init_worker) as pool:
+                for result in pool.imap_unordered(
+                        create_metadata_for_chunk_star,
+                        [(label_lower, pks, self.run_rules)
+                         for label_lower, pks in chunks]):
+                    self.chunk_done(result, total)
+        elapsed = time() - self.start
+        for error in self.errors:
+            sys.stdout.write(style.ERROR(f'{error}\n'))
+        sys.stdout.write(style.SUCCESS(
+            f'\nDone. {self.done} visits in {elapsed:.1f}s '
+            f'({self.rate(elapsed):.1f} visits/s). '
+            f'{len(self.errors)} errors.\n'))
+
+    def chunk_done(self, result=None, total=None):
+        """Records a chunk as completed, unless a visit failed,
+        and the failed visits, and reports progress.
+        """
+        label_lower, first_pk, last_pk, count, errors, failed = result
+        self.done += count
+        self.errors.extend(errors)
+        first, last = self.pk_value(first_pk), self.pk_value(last_pk)
+        self.failed[label_lower] = [
+            pk for pk in self.failed.get(label_lower, [])
+            if not first <= pk <= last] + [self.pk_value(pk) for pk in failed]
+        if not failed:
+            segments = self.segments[label_lower]
+            for segment in segments:
+                if segment[:2] == [first, last]:
+                    segment[2] = True
+            self.completed[label_lower] = self.merge_segments(segments)
+        if self.checkpoint:
+            self.write_checkpoint()
+        elapsed = time() - self.start
+        sys.stdout.write(
+            f'  {self.done}/{total} visits. '
+            f'{self.rate(elapsed):.1f} visits/s     \r')
+
+    def rate(self, elapsed=None):
+        return self.done / elapsed if elapsed else 0.0
+
+    def get_models(self, labels=None):
+        """Returns a list of visit model classes.
+        """
+        if labels:
+            try:
+                models = [django_apps.get_model(label) for label in labels.split(',')]
+            except (LookupError, ValueError) as e:
+                raise CommandError(f'Invalid model. Got {e}. See --models')
+        else:
+            models = [model for model in django_apps.get_models()
+                      if issubclass(model, CreatesMetadataModelMixin)]
+        for model in models:
+            if not issubclass(model, CreatesMetadataModelMixin):
+                raise CommandError(
+                    f'Invalid visit model. {model._meta.label_lower} does not '
+                    f'use CreatesMetadataModelMixin. See --models')
+        return models
+
+    def get_chunks(self, model_cls=None):
+        """Returns a list of (label_lower, [pk, ...]) for visits
+        not in a completed range, in pk order.
+
+        Also sets the segments of the model, see `merge_segments`.
+        """
+        label_lower = model_cls._meta.label_lower
+        completed = self.completed.get(label_lower, [])
+        queryset = model_cls.objects.order_by('pk')
+        for first, last in completed:
+            queryset = queryset.exclude(pk__range=(first, last))
+        pks = list(queryset.values_list('pk', flat=True))
+        chunks = [(label_lower, pks[i:i + self.chunk_size])
+                  for i in range(0, len(pks), self.chunk_size)]
+        self.segments[label_lower] = sorted(
+            [[first, last, True] for first, last in completed]
+            + [[self.pk_value(chunk[0]), self.pk_value(chunk[-1]), False]
+               for _, chunk in chunks])
+        return chunks
+
+    @staticmethod
+    def merge_segments(segments=None):
+        """Returns a list of [first_pk, last_pk] of the consecutive
+        completed segments.
+
+        `segments` is a list of [first_pk, last_pk, completed] of the
+        completed ranges and the chunks of a model in pk order. Every
+        pk of the model at the start of the run is in a segment, so
+        consecutive completed segments can be merged into one range.
+        """
+        ranges = []
+        previous = False
+        for first, last, completed in segments:
+            if completed and previous:
+                ranges[-1][1] = last
+            elif completed:
+                ranges.append([first, last])
+            previous = completed
+        return ranges
+
+    @staticmethod
+    def pk_value(pk=None):
+        return pk if isinstance(pk, int) else str(pk)
+
+    def read_checkpoint(self):
+        """Returns a tuple of the completed ranges and the failed
+        pks read from the checkpoint file.
+        """
+        try:
+            with open(self.checkpoint) as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            checkpoint = {}
+        except ValueError as e:
+            raise CommandError(
+                f'Invalid checkpoint file. Got {e}. See --checkpoint or --restart')
+        return checkpoint.get('completed', {}), checkpoint.get('failed', {})
+
+    def write_checkpoint(self):
+        path = f'{self.checkpoint}.tmp'
+        with open(path, 'w') as f:
+            json.dump(dict(completed=self.completed, failed=self.failed), f)
+        os.replace(path, self.checkpoint)
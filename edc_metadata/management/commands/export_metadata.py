@@ -0,0 +1,106 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import color_style
+
+from ...constants import REQUIRED
+from ...metadata_report import MetadataReport
+
+style = color_style()
+
+
+class Command(BaseCommand):
+
+    help = ('Export CRF and requisition metadata across subjects, '
+            'e.g. all REQUIRED forms, as CSV or JSON lines.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            dest='format',
+            default='csv',
+            choices=['csv', 'jsonl'],
+            help=('Output format. (Default: csv)'),
+        )
+
+        parser.add_argument(
+            '--output',
+            dest='output',
+            default=None,
+            help=('Path of the file to write. (Default: stdout)'),
+        )
+
+        parser.add_argument(
+            '--entry-status',
+            dest='entry_status',
+            default=REQUIRED,
+            help=('Entry status or "all". (Default: REQUIRED)'),
+        )
+
+        parser.add_argument(
+            '--site',
+            dest='site_id',
+            type=int,
+            default=None,
+            help=('Site id. (Default: all)'),
+        )
+
+        parser.add_argument(
+            '--visit-schedule',
+            dest='visit_schedule_name',
+            default=None,
+            help=('Visit schedule name. (Default: all)'),
+        )
+
+        parser.add_argument(
+            '--schedule',
+            dest='schedule_name',
+            default=None,
+            help=('Schedule name. (Default: all)'),
+        )
+
+        parser.add_argument(
+            '--visit-code',
+            dest='visit_code',
+            default=None,
+            help=('Visit code. (Default: all)'),
+        )
+
+        parser.add_argument(
+            '--model',
+            dest='model',
+            default=None,
+            help=('Form model, e.g. "app_label.crfone". (Default: all)'),
+        )
+
+        parser.add_argument(
+            '--chunk-size',
+            dest='chunk_size',
+            type=int,
+            default=2000,
+            help=('Number of rows fetched at a time. (Default: 2000)'),
+        )
+
+    def handle(self, *args, **options):
+        if options.get('chunk_size') < 1:
+            raise CommandError('Invalid option. Expected --chunk-size > 0.')
+        entry_status = options.get('entry_status')
+        report = MetadataReport(
+            entry_status=None if entry_status == 'all' else entry_status,
+            site_id=options.get('site_id'),
+            visit_schedule_name=options.get('visit_schedule_name'),
+            schedule_name=options.get('schedule_name'),
+            visit_code=options.get('visit_code'),
+            model=options.get('model'),
+            chunk_size=options.get('chunk_size'))
+        output = options.get('output')
+        f = open(output, 'w', newline='') if output else self.stdout
+        try:
+            if options.get('format') == 'jsonl':
+                count = report.write_jsonl(f)
+            else:
+                count = report.write_csv(f)
+        finally:
+            if output:
+                f.close()
+        sys.stderr.write(style.SUCCESS(f'Done. Exported {count} rows.\n'))
@@ -0,0 +1,65 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import color_style
+from time import sleep
+
+from ...rule_queue import rule_queue
+
+style = color_style()
+
+
+class Command(BaseCommand):
+
+    help = ('Run the metadata rules for visits queued when '
+            'edc_metadata.AppConfig.defer_metadata_rules is enabled.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            dest='batch_size',
+            type=int,
+            default=100,
+            help=('Number of visits per batch. (Default: 100)'),
+        )
+
+        parser.add_argument(
+            '--max-attempts',
+            dest='max_attempts',
+            type=int,
+            default=3,
+            help=('Skip visits that failed this many times. (Default: 3)'),
+        )
+
+        parser.add_argument(
+            '--loop',
+            dest='loop',
+            action='store_true',
+            default=False,
+            help=('Keep polling the queue. (Default: exit when empty)'),
+        )
+
+        parser.add_argument(
+            '--sleep',
+            dest='sleep',
+            type=float,
+            default=1.0,
+            help=('Seconds to wait when the queue is empty if --loop. (Default: 1)'),
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options.get('batch_size')
+        if batch_size < 1:
+            raise CommandError('Invalid option. Expected --batch-size > 0.')
+        processed = 0
+        while True:
+            count = rule_queue.process(
+                batch_size=batch_size, max_attempts=options.get('max_attempts'))
+            processed += count
+            if count:
+                sys.stdout.write(f'  processed {processed} visits     \r')
+            elif options.get('loop'):
+                sleep(options.get('sleep'))
+            else:
+                break
+        sys.stdout.write(style.SUCCESS(f'\nDone. Processed {processed} visits.\n'))
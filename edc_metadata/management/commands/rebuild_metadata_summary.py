@@ -0,0 +1,30 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import color_style
+
+from ...metadata_summary import metadata_summary
+
+style = color_style()
+
+
+class Command(BaseCommand):
+
+    help = ('Rebuild the MetadataSummary counts per visit from the '
+            'CRF and requisition metadata.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            dest='batch_size',
+            type=int,
+            default=500,
+            help=('Number of rows per insert. (Default: 500)'),
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options.get('batch_size')
+        if batch_size < 1:
+            raise CommandError('Invalid option. Expected --batch-size > 0.')
+        count = metadata_summary.rebuild(batch_size=batch_size)
+        sys.stdout.write(style.SUCCESS(f'Done. Rebuilt {count} visits.\n'))
@@ -1,4 +1,8 @@
 from .crf_metadata_getter import CrfMetadataGetter
 from .metadata import Metadata, CreatesMetadataError, Creator, Destroyer, DeleteMetadataError
-from .metadata_getter import MetadataGetter
+from .metadata import MetadataDiff, Resetter
+from .keyed_resolver import KeyedResolver
+from .metadata_getter import MetadataGetter, MetadataRecord
 from .requisition_metadata_getter import RequisitionMetadataGetter
+from .subject_metadata_timeline import SubjectMetadataTimeline
+from .upserter import Upserter
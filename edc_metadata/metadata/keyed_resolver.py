@@ -0,0 +1,94 @@
+from functools import reduce
+from operator import or_
+
+from edc_reference import site_reference_configs
+
+from ..model_resolvers import site_model_resolvers
+
+
+class KeyedResolver:
+
+    """A class that determines which CRFs and requisitions of a
+    visit are keyed.
+
+    Instead of querying the reference model once per form, the
+    reference names of all forms are grouped by reference model
+    and each reference model is queried once for the visit.
+
+    Reference names are `model` for CRFs and `model.panel_name`
+    for requisitions. As with `get_requisition_for_visit`, only
+    the reference of the panel field of a requisition is read.
+
+    See also edc_reference.
+    """
+
+    def __init__(self, visit=None, crfs=None, requisitions=None):
+        self._keyed = None
+        self.visit = visit  # visit model instance
+        self.requisition_names = frozenset(
+            [self.requisition_name(r) for r in requisitions or []])
+        self.names = frozenset(
+            [crf.model for crf in crfs or []]) | self.requisition_names
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(visit={self.visit})'
+
+    @staticmethod
+    def requisition_name(requisition=None):
+        return f'{requisition.model}.{requisition.panel.name}'
+
+    @property
+    def keyed(self):
+        """Returns a frozenset of the reference names that
+        are keyed for this visit.
+        """
+        if self._keyed is None:
+            keyed = set()
+            for reference_model, names in self.reference_models.items():
+                reference_model_cls = site_model_resolvers.get_model(
+                    reference_model)
+                queryset = reduce(or_, [
+                    self.filter_for_visit(reference_model_cls, name)
+                    for name in names])
+                keyed.update(
+                    queryset.order_by().values_list('model', flat=True).distinct())
+            self._keyed = frozenset(keyed)
+        return self._keyed
+
+    def filter_for_visit(self, reference_model_cls=None, name=None):
+        """Returns a queryset of the reference model instances of
+        a CRF or requisition for this visit.
+        """
+        queryset = reference_model_cls.objects.filter_crf_for_visit(
+            name=name, visit=self.visit)
+        if name in self.requisition_names:
+            queryset = queryset.filter(field_name='panel')
+        return queryset
+
+    @property
+    def reference_models(self):
+        """Returns a dictionary of {reference_model: [name, ...]}.
+        """
+        reference_models = {}
+        for name in sorted(self.names):
+            reference_model = site_reference_configs.get_reference_model(
+                name=name)
+            reference_models.setdefault(reference_model, []).append(name)
+        return reference_models
+
+    def is_crf_keyed(self, crf=None):
+        """Returns True, False or None if the CRF is not
+        known to this resolver.
+        """
+        if crf.model not in self.names:
+            return None
+        return crf.model in self.keyed
+
+    def is_requisition_keyed(self, requisition=None):
+        """Returns True, False or None if the requisition is not
+        known to this resolver.
+        """
+        name = self.requisition_name(requisition)
+        if name not in self.names:
+            return None
+        return name in self.keyed
@@ -1,10 +1,16 @@
-from django.apps import apps as django_apps
-from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
+from functools import reduce
+from operator import or_
 
-from edc_reference import site_reference_configs
-from edc_visit_schedule import site_visit_schedules
+from django.db.models import CharField, F, Q, Value
+from django.db.models.signals import post_save
 
-from ..constants import NOT_REQUIRED, REQUIRED, KEYED
+from ..constants import CRF, NOT_REQUIRED, REQUIRED, REQUISITION, KEYED
+from ..form_plans import site_form_plans
+from ..identity_map import metadata_identity_map
+from ..metadata_summary import metadata_summary
+from ..model_resolvers import site_model_resolvers
+from .keyed_resolver import KeyedResolver
+from .upserter import Upserter
 
 
 class CreatesMetadataError(Exception):
@@ -17,22 +23,71 @@ class DeleteMetadataError(Exception):
 
 class Base:
 
+    upserter_cls = Upserter
+
     def __init__(self, visit=None, metadata_crf_model=None,
                  metadata_requisition_model=None, **kwargs):
         self.reference_model_cls = None
-        app_config = django_apps.get_app_config('edc_metadata')
+        self.keyed_resolver = None
         self.visit = visit  # visit model instance
-        self.metadata_crf_model = metadata_crf_model or app_config.crf_model
+        self.metadata_crf_model = (
+            metadata_crf_model or site_model_resolvers.get_metadata_model(CRF))
         self.metadata_requisition_model = (
-            metadata_requisition_model or app_config.requisition_model)
-        if not self.metadata_crf_model._meta.unique_together:
-            raise ImproperlyConfigured(
-                f'{self.metadata_crf_model._meta.label_lower}.unique_together '
-                'constraint not set.')
-        if not self.metadata_requisition_model._meta.unique_together:
-            raise ImproperlyConfigured(
-                f'{self.metadata_requisition_model._meta.label_lower}.unique_together '
-                'constraint not set.')
+            metadata_requisition_model
+            or site_model_resolvers.get_metadata_model(REQUISITION))
+        site_model_resolvers.check_unique_together(self.metadata_crf_model)
+        site_model_resolvers.check_unique_together(
+            self.metadata_requisition_model)
+
+    def get_querysets(self, keys=None):
+        """Returns a list of CRF and/or requisition metadata
+        querysets for the visit instance filtered for a sequence
+        of (model, panel_name).
+        """
+        querysets = []
+        options = self.visit.metadata_query_options
+        options.update({'subject_identifier': self.visit.subject_identifier})
+        crf_models = [model for model, panel_name in keys if panel_name is None]
+        requisitions = [
+            Q(model=model, panel_name=panel_name)
+            for model, panel_name in keys if panel_name is not None]
+        if crf_models:
+            querysets.append(self.metadata_crf_model.objects.filter(
+                model__in=crf_models, **options))
+        if requisitions:
+            querysets.append(self.metadata_requisition_model.objects.filter(
+                reduce(or_, requisitions), **options))
+        return querysets
+
+    def send_post_save(self, keys=None, update_fields=None):
+        """Sends the post_save signal for the metadata of a sequence
+        of (model, panel_name) updated with `QuerySet.update`, for
+        example so that edc_sync serializes the change.
+
+        The rows are read in one query per metadata model.
+        """
+        for queryset in self.get_querysets(keys=keys):
+            for obj in queryset:
+                obj.bulk_updated = True
+                try:
+                    post_save.send(
+                        sender=queryset.model, instance=obj, created=False,
+                        raw=False, using=queryset.db,
+                        update_fields=frozenset(update_fields))
+                finally:
+                    obj.bulk_updated = False
+
+    def mark_keyed(self, keys=None):
+        """Updates the metadata of a sequence of (model, panel_name)
+        to KEYED with one UPDATE per metadata model and sends
+        post_save for the rows.
+        """
+        for queryset in self.get_querysets(keys=keys):
+            queryset.exclude(entry_status=KEYED).update(
+                entry_status=KEYED, version=F('version') + 1)
+        metadata_identity_map.invalidate(visit=self.visit)
+        self.send_post_save(keys=keys, update_fields=['entry_status', 'version'])
+        metadata_summary.update_for_visit(visit=self.visit)
 
 
 class CrfCreator(Base):
@@ -41,23 +96,52 @@ class CrfCreator(Base):
         super().__init__(visit=visit, **kwargs)
         self.update_keyed = update_keyed
 
-    def create(self, crf=None):
+    def create(self, crf=None, entry_status=None):
         """Creates metadata for a CRF, if is does not exist.
         """
         options = self.visit.metadata_query_options
         options.update(
             {'subject_identifier': self.visit.subject_identifier,
              'model': crf.model})
-        try:
-            metadata_obj = self.metadata_crf_model.objects.get(**options)
-        except ObjectDoesNotExist:
-            metadata_obj = self.metadata_crf_model.objects.create(
-                entry_status=REQUIRED if crf.required else NOT_REQUIRED,
-                show_order=crf.show_order, **options)
+        metadata_obj, _ = self.upserter_cls(
+            model_cls=self.metadata_crf_model).get_or_create(
+                defaults=dict(
+                    entry_status=entry_status or (
+                        REQUIRED if crf.required else NOT_REQUIRED),
+                    show_order=crf.show_order),
+                **options)
         if self.update_keyed and metadata_obj.entry_status != KEYED:
             if self.is_keyed(crf):
-                metadata_obj.entry_status = KEYED
-                metadata_obj.save()
+                metadata_obj = metadata_obj.versioned_save(entry_status=KEYED)
+        return metadata_obj
+
+    def bulk_create(self, crfs=None):
+        """Creates metadata for a sequence of CRFs reading existing
+        metadata for the visit in one query and inserting those
+        that do not exist in one statement.
+
+        Returns True if rows were inserted or updated.
+        """
+        options = self.visit.metadata_query_options
+        options.update({'subject_identifier': self.visit.subject_identifier})
+        existing = dict(
+            self.metadata_crf_model.objects.filter(**options).values_list(
+                'model', 'entry_status'))
+        objs = [
+            self.metadata_crf_model(
+                entry_status=REQUIRED if crf.required else NOT_REQUIRED,
+                show_order=crf.show_order, model=crf.model, **options)
+            for crf in crfs if crf.model not in existing]
+        self.upserter_cls(model_cls=self.metadata_crf_model).insert(objs=objs)
+        keyed = []
+        if self.update_keyed:
+            keyed = [crf.model for crf in crfs
+                     if existing.get(crf.model) != KEYED and self.is_keyed(crf)]
+            if keyed:
+                self.metadata_crf_model.objects.filter(
+                    model__in=keyed, **options).update(
+                        entry_status=KEYED, version=F('version') + 1)
+        return bool(objs or keyed)
 
     def is_keyed(self, crf=None):
         """Returns True if CRF is keyed determined by
@@ -65,9 +149,12 @@ class CrfCreator(Base):
 
         See also edc_reference.
         """
-        reference_model = site_reference_configs.get_reference_model(
+        if self.keyed_resolver:
+            is_keyed = self.keyed_resolver.is_crf_keyed(crf)
+            if is_keyed is not None:
+                return is_keyed
+        self.reference_model_cls = site_model_resolvers.get_reference_model_cls(
             name=crf.model)
-        self.reference_model_cls = django_apps.get_model(reference_model)
         return self.reference_model_cls.objects.filter_crf_for_visit(
             name=crf.model,
             visit=self.visit).exists()
@@ -79,7 +166,7 @@ class RequisitionCreator(Base):
         super().__init__(visit=visit, **kwargs)
         self.update_keyed = update_keyed
 
-    def create(self, requisition=None):
+    def create(self, requisition=None, entry_status=None):
         """Creates metadata for a requisition.
         """
         options = self.visit.metadata_query_options
@@ -87,20 +174,56 @@ class RequisitionCreator(Base):
             {'subject_identifier': self.visit.subject_identifier,
              'model': requisition.model,
              'panel_name': requisition.panel.name})
-        try:
-            metadata_obj = self.metadata_requisition_model.objects.get(
-                **options)
-        except ObjectDoesNotExist:
-            metadata_obj = self.metadata_requisition_model.objects.create(
-                entry_status=REQUIRED if requisition.required else NOT_REQUIRED,
-                show_order=requisition.show_order,
+        metadata_obj, _ = self.upserter_cls(
+            model_cls=self.metadata_requisition_model).get_or_create(
+                defaults=dict(
+                    entry_status=entry_status or (
+                        REQUIRED if requisition.required else NOT_REQUIRED),
+                    show_order=requisition.show_order),
                 **options)
         if (self.update_keyed and metadata_obj.entry_status != KEYED
                 and self.is_keyed(requisition)):
-            metadata_obj.entry_status = KEYED
-            metadata_obj.save()
+            metadata_obj = metadata_obj.versioned_save(entry_status=KEYED)
         return metadata_obj
 
+    def bulk_create(self, requisitions=None):
+        """Creates metadata for a sequence of requisitions reading
+        existing metadata for the visit in one query and inserting
+        those that do not exist in one statement.
+
+        Returns True if rows were inserted or updated.
+        """
+        options = self.visit.metadata_query_options
+        options.update({'subject_identifier': self.visit.subject_identifier})
+        existing = {
+            (model, panel_name): entry_status
+            for model, panel_name, entry_status in
+            self.metadata_requisition_model.objects.filter(**options).values_list(
+                'model', 'panel_name', 'entry_status')}
+        objs = [
+            self.metadata_requisition_model(
+                entry_status=REQUIRED if requisition.required else NOT_REQUIRED,
+                show_order=requisition.show_order,
+                model=requisition.model,
+                panel_name=requisition.panel.name,
+                **options)
+            for requisition in requisitions
+            if (requisition.model, requisition.panel.name) not in existing]
+        self.upserter_cls(
+            model_cls=self.metadata_requisition_model).insert(objs=objs)
+        keyed = []
+        if self.update_keyed:
+            keyed = [
+                Q(model=requisition.model, panel_name=requisition.panel.name)
+                for requisition in requisitions
+                if (existing.get((requisition.model, requisition.panel.name)) != KEYED
+                    and self.is_keyed(requisition))]
+            if keyed:
+                self.metadata_requisition_model.objects.filter(
+                    reduce(or_, keyed), **options).update(
+                        entry_status=KEYED, version=F('version') + 1)
+        return bool(objs or keyed)
+
     def is_keyed(self, requisition=None):
         """Returns True if requisition is keyed determined by
         getting the reference model instance for this
@@ -108,74 +231,265 @@ class RequisitionCreator(Base):
 
         See also edc_reference.
         """
+        if self.keyed_resolver:
+            is_keyed = self.keyed_resolver.is_requisition_keyed(requisition)
+            if is_keyed is not None:
+                return is_keyed
         name = f'{requisition.model}.{requisition.panel.name}'
-        reference_model = site_reference_configs.get_reference_model(
+        self.reference_model_cls = site_model_resolvers.get_reference_model_cls(
             name=name)
-        self.reference_model_cls = django_apps.get_model(reference_model)
         return self.reference_model_cls.objects.get_requisition_for_visit(
             name=name, visit=self.visit)
 
 
+class Destroyer(Base):
+
+    def delete(self):
+        """Deletes all CRF and requisition metadata for
+        the visit instance, unless KEYED.
+        """
+        self.metadata_crf_model.objects.filter(
+            subject_identifier=self.visit.subject_identifier,
+            **self.visit.metadata_query_options).exclude(
+            entry_status=KEYED).delete()
+        self.metadata_requisition_model.objects.filter(
+            subject_identifier=self.visit.subject_identifier,
+            **self.visit.metadata_query_options).exclude(
+            entry_status=KEYED).delete()
+        metadata_identity_map.invalidate(visit=self.visit)
+        metadata_summary.update_for_visit(visit=self.visit)
+
+    def delete_stale(self, keys=None):
+        """Deletes CRF and requisition metadata for the visit
+        instance for a sequence of (model, panel_name), unless KEYED.
+        """
+        for queryset in self.get_querysets(keys=keys):
+            queryset.exclude(entry_status=KEYED).delete()
+        metadata_identity_map.invalidate(visit=self.visit)
+        metadata_summary.update_for_visit(visit=self.visit)
+
+
+class Resetter(Base):
+
+    """A class to reset the CRF and requisition metadata of a
+    visit to the default entry status in the visit schedule,
+    for example after the CRFs are deleted.
+
+    Metadata for forms not in the visit's FormPlan is deleted.
+    The post_save signal is sent for the metadata reset and
+    `QuerySet.delete` sends post_delete for the metadata deleted.
+    """
+
+    def reset(self, keys=None):
+        """Resets metadata for a sequence of (model, panel_name)
+        with one UPDATE per default entry status and metadata model.
+        """
+        entry_statuses = site_form_plans.get_plan_for_visit(
+            self.visit).entry_statuses
+        groups = {}
+        stale = []
+        for key in set(keys or []):
+            try:
+                entry_status = entry_statuses[key]
+            except KeyError:
+                stale.append(key)
+            else:
+                groups.setdefault(entry_status or REQUIRED, []).append(key)
+        for entry_status, keys in groups.items():
+            for queryset in self.get_querysets(keys=keys):
+                queryset.update(
+                    entry_status=entry_status, report_datetime=None,
+                    version=F('version') + 1)
+        for queryset in self.get_querysets(keys=stale):
+            queryset.delete()
+        metadata_identity_map.invalidate(visit=self.visit)
+        self.send_post_save(
+            keys=[key for keys in groups.values() for key in keys],
+            update_fields=['entry_status', 'report_datetime', 'version'])
+        metadata_summary.update_for_visit(visit=self.visit)
+
+
+class MetadataDiff:
+
+    """The difference between the existing metadata of a visit
+    and the forms in its FormPlan.
+
+    `existing` is a dictionary of {(model, panel_name): entry_status}
+    where panel_name is None for CRFs.
+
+    * crfs, requisitions: forms in the plan without metadata;
+    * stale: keys of metadata not in the plan (including PRN
+      forms) and not KEYED;
+    * unkeyed_crfs, unkeyed_requisitions: forms in the plan with
+      metadata not KEYED, the keyed state of which may have
+      changed without updating the metadata, for example if the
+      form was saved with raw=True.
+
+    A diff is False if there is nothing to create or delete. The
+    unkeyed forms are not considered.
+    """
+
+    def __init__(self, form_plan=None, existing=None):
+        self.crfs = tuple(
+            crf for crf in form_plan.crfs if (crf.model, None) not in existing)
+        self.requisitions = tuple(
+            r for r in form_plan.requisitions
+            if (r.model, r.panel.name) not in existing)
+        self.unkeyed_crfs = tuple(
+            crf for crf in form_plan.crfs
+            if existing.get((crf.model, None), KEYED) != KEYED)
+        self.unkeyed_requisitions = tuple(
+            r for r in form_plan.requisitions
+            if existing.get((r.model, r.panel.name), KEYED) != KEYED)
+        self.stale = tuple(
+            key for key, entry_status in existing.items()
+            if key not in form_plan.entry_statuses and entry_status != KEYED)
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(crfs={len(self.crfs)}, '
+                f'requisitions={len(self.requisitions)}, '
+                f'stale={len(self.stale)}, '
+                f'unkeyed={len(self.unkeyed_crfs) + len(self.unkeyed_requisitions)})')
+
+    def __bool__(self):
+        return bool(self.crfs or self.requisitions or self.stale)
+
+
 class Creator:
 
     crf_creator_cls = CrfCreator
     requisition_creator_cls = RequisitionCreator
+    destroyer_cls = Destroyer
+    keyed_resolver_cls = KeyedResolver
+    metadata_diff_cls = MetadataDiff
 
-    def __init__(self, visit=None, **kwargs):
+    def __init__(self, visit=None, bulk=None, **kwargs):
         """param visit is a visit model instance but the
         instance attr is not.
+
+        If `bulk` is True, metadata is created with one read and
+        one insert per metadata model and the keyed state of all
+        forms is rechecked. Note that `bulk_create` does not send
+        the post_save signal.
+
+        Otherwise, existing metadata is compared to the FormPlan
+        and only the difference is applied, see `diff`.
         """
+        self.bulk = bulk
         self.crf_creator = self.crf_creator_cls(visit=visit, **kwargs)
         self.requisition_creator = self.requisition_creator_cls(
             visit=visit, **kwargs)
+        self.destroyer = self.destroyer_cls(visit=visit, **kwargs)
         self.visit_code_sequence = visit.visit_code_sequence
-        visit_schedule = site_visit_schedules.get_visit_schedule(
-            visit.visit_schedule_name)
-        schedule = visit_schedule.schedules.get(visit.schedule_name)
-        self.visit = schedule.visits.get(visit.visit_code)
+        self.form_plan = site_form_plans.get_plan_for_visit(visit)
+        self.visit = self.form_plan.visit
+        self.keyed_resolver = self.keyed_resolver_cls(
+            visit=visit, crfs=self.crfs, requisitions=self.requisitions)
+        self.crf_creator.keyed_resolver = self.keyed_resolver
+        self.requisition_creator.keyed_resolver = self.keyed_resolver
 
     @property
     def crfs(self):
-        if self.visit_code_sequence != 0:
-            return self.visit.crfs_unscheduled
-        return self.visit.crfs
+        return self.form_plan.crfs
 
     @property
     def requisitions(self):
-        if self.visit_code_sequence != 0:
-            return self.visit.requisitions_unscheduled
-        return self.visit.requisitions
+        return self.form_plan.requisitions
 
     def create(self):
         """Creates metadata for all CRFs and requisitions for
         the scheduled or unscheduled visit instance.
         """
-        for crf in self.crfs:
-            self.create_crf(crf=crf)
-        for requisition in self.requisitions:
-            self.create_requisition(requisition=requisition)
-
-    def create_crf(self, crf=None):
-        return self.crf_creator.create(crf=crf)
-
-    def create_requisition(self, requisition=None):
-        return self.requisition_creator.create(requisition=requisition)
+        if self.bulk:
+            crfs_written = self.crf_creator.bulk_create(crfs=self.crfs)
+            requisitions_written = self.requisition_creator.bulk_create(
+                requisitions=self.requisitions)
+            if crfs_written or requisitions_written:
+                metadata_identity_map.invalidate(visit=self.crf_creator.visit)
+                metadata_summary.update_for_visit(visit=self.crf_creator.visit)
+        else:
+            # rows created from the diff send post_save, and the
+            # destroyer and mark_keyed update the summary.
+            self.apply(self.diff())
 
+    @property
+    def existing(self):
+        """Returns a dictionary of {(model, panel_name): entry_status}
+        of the CRF and requisition metadata for the visit read
+        in one query.
+        """
+        options = self.crf_creator.visit.metadata_query_options
+        options.update(
+            {'subject_identifier': self.crf_creator.visit.subject_identifier})
+        crf_qs = (
+            self.crf_creator.metadata_crf_model.objects.filter(**options)
+            .annotate(metadata_panel_name=Value(None, output_field=CharField()))
+            .order_by()
+            .values_list('model', 'entry_status', 'metadata_panel_name'))
+        requisition_qs = (
+            self.requisition_creator.metadata_requisition_model.objects
+            .filter(**options)
+            .order_by()
+            .values_list('model', 'entry_status', 'panel_name'))
+        return {
+            (model, panel_name): entry_status
+            for model, entry_status, panel_name in crf_qs.union(
+                requisition_qs, all=True)}
+
+    def diff(self):
+        """Returns a MetadataDiff of the existing metadata against
+        the FormPlan.
+        """
+        return self.metadata_diff_cls(
+            form_plan=self.form_plan, existing=self.existing)
 
-class Destroyer(Base):
+    def apply(self, diff=None):
+        """Creates the missing and deletes the stale metadata of
+        a MetadataDiff.
 
-    def delete(self):
-        """Deletes all CRF and requisition metadata for
-        the visit instance, unless KEYED.
+        If `update_keyed`, the keyed state of the missing and the
+        unkeyed metadata is resolved with one query per reference
+        model and unkeyed metadata of keyed forms is updated to
+        KEYED.
         """
-        self.metadata_crf_model.objects.filter(
-            subject_identifier=self.visit.subject_identifier,
-            **self.visit.metadata_query_options).exclude(
-            entry_status=KEYED).delete()
-        self.metadata_requisition_model.objects.filter(
-            subject_identifier=self.visit.subject_identifier,
-            **self.visit.metadata_query_options).exclude(
-            entry_status=KEYED).delete()
+        update_keyed = self.crf_creator.update_keyed
+        unkeyed_crfs = diff.unkeyed_crfs if update_keyed else ()
+        unkeyed_requisitions = diff.unkeyed_requisitions if update_keyed else ()
+        crfs = diff.crfs + unkeyed_crfs
+        requisitions = diff.requisitions + unkeyed_requisitions
+        if crfs or requisitions:
+            keyed_resolver = self.keyed_resolver_cls(
+                visit=self.crf_creator.visit, crfs=crfs,
+                requisitions=requisitions)
+            self.crf_creator.keyed_resolver = keyed_resolver
+            self.requisition_creator.keyed_resolver = keyed_resolver
+            for crf in diff.crfs:
+                self.create_crf(
+                    crf=crf, entry_status=(
+                        KEYED if update_keyed
+                        and self.crf_creator.is_keyed(crf) else None))
+            for requisition in diff.requisitions:
+                self.create_requisition(
+                    requisition=requisition, entry_status=(
+                        KEYED if update_keyed
+                        and self.requisition_creator.is_keyed(requisition)
+                        else None))
+            keyed = (
+                [(crf.model, None) for crf in unkeyed_crfs
+                 if self.crf_creator.is_keyed(crf)]
+                + [(r.model, r.panel.name) for r in unkeyed_requisitions
+                   if self.requisition_creator.is_keyed(r)])
+            if keyed:
+                self.crf_creator.mark_keyed(keys=keyed)
+        if diff.stale:
+            self.destroyer.delete_stale(keys=diff.stale)
+
+    def create_crf(self, crf=None, entry_status=None):
+        return self.crf_creator.create(crf=crf, entry_status=entry_status)
+
+    def create_requisition(self, requisition=None, entry_status=None):
+        return self.requisition_creator.create(
+            requisition=requisition, entry_status=entry_status)
 
 
 class Metadata:
@@ -184,7 +498,7 @@ class Metadata:
     destroyer_cls = Destroyer
 
     def __init__(self, visit=None, update_keyed=None, **kwargs):
-        app_config = django_apps.get_app_config('edc_metadata')
+        app_config = site_model_resolvers.app_config
         self.creator = self.creator_cls(
             visit=visit, update_keyed=update_keyed, **kwargs)
         self.destroyer = self.destroyer_cls(
@@ -214,7 +528,7 @@ class Metadata:
         for the visit instance.
         """
         metadata_exists = False
-        app_config = django_apps.get_app_config('edc_metadata')
+        app_config = site_model_resolvers.app_config
         if self.reason in app_config.delete_on_reasons:
             self.destroyer.delete()
         elif self.reason in app_config.create_on_reasons:
@@ -1,24 +1,86 @@
+from bisect import bisect_right
 from django.apps import apps as django_apps
 
+from ..identity_map import metadata_identity_map
+
+
+class MetadataRecord:
+
+    """A read-only projection of a metadata model instance.
+
+    `object` is not read but may be set by a dashboard, see
+    MetaDataViewMixin.
+    """
+
+    fields = ('pk', 'model', 'show_order', 'entry_status', 'panel_name',
+              'visit_code', 'visit_code_sequence')
+    __slots__ = fields + ('object', )
+
+    def __init__(self, pk=None, model=None, show_order=None, entry_status=None,
+                 panel_name=None, visit_code=None, visit_code_sequence=None):
+        self.pk = pk
+        self.model = model
+        self.show_order = show_order
+        self.entry_status = entry_status
+        self.panel_name = panel_name
+        self.visit_code = visit_code
+        self.visit_code_sequence = visit_code_sequence
+        self.object = None
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}({self.model}, {self.panel_name}, '
+                f'{self.show_order}, {self.entry_status})')
+
+    def __eq__(self, other):
+        return (isinstance(other, self.__class__)
+                and self.as_tuple() == other.as_tuple())
+
+    def __hash__(self):
+        return hash(self.as_tuple())
+
+    def as_tuple(self):
+        return tuple(getattr(self, field) for field in self.fields)
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.fields}
+
 
 class MetadataGetter:
 
     """A class that gets a filtered queryset of metadata --
     `metadata_objects`.
+
+    `next_object` reads `sorted_objects`, a list of the metadata
+    fetched once and ordered by show_order.
+
+    If `projection` is True, `sorted_objects` are MetadataRecords
+    read with `values_list` instead of model instances or, if the
+    MetadataIdentityMap is active, built from its model instances.
     """
 
     metadata_model = None
+    metadata_record_cls = MetadataRecord
+    record_fields = ('pk', 'model', 'show_order', 'entry_status',
+                     'visit_code', 'visit_code_sequence')
 
     def __init__(self, appointment=None, subject_identifier=None, visit_code=None,
-                 visit_code_sequence=None):
+                 visit_code_sequence=None, projection=None,
+                 visit_schedule_name=None, schedule_name=None):
+        self.projection = projection
+        self._sorted_objects = None
+        self._show_orders = None
         try:
             self.visit = appointment.visit
         except AttributeError:
             self.subject_identifier = subject_identifier
+            self.visit_schedule_name = visit_schedule_name
+            self.schedule_name = schedule_name
             self.visit_code = visit_code
             self.visit_code_sequence = visit_code_sequence
         else:
             self.subject_identifier = self.visit.subject_identifier
+            self.visit_schedule_name = self.visit.visit_schedule_name
+            self.schedule_name = self.visit.schedule_name
             self.visit_code = self.visit.visit_code
             self.visit_code_sequence = self.visit.visit_code_sequence
         self.metadata_objects = self.metadata_model_cls.objects.filter(
@@ -31,16 +93,59 @@ class MetadataGetter:
     @property
     def options(self):
         """Returns a dictionary of query options.
+
+        The visit schedule and schedule are only included if known.
         """
-        return dict(
+        options = dict(
             subject_identifier=self.subject_identifier,
             visit_code=self.visit_code,
             visit_code_sequence=self.visit_code_sequence)
+        if self.visit_schedule_name:
+            options.update(visit_schedule_name=self.visit_schedule_name)
+        if self.schedule_name:
+            options.update(schedule_name=self.schedule_name)
+        return options
+
+    @property
+    def sorted_objects(self):
+        """Returns a list of the metadata model instances, or
+        records if `projection`, ordered by show_order, fetched
+        once or read from the MetadataIdentityMap.
+        """
+        if self._sorted_objects is None:
+            if not self.projection:
+                self._sorted_objects = metadata_identity_map.filter(
+                    self.metadata_model_cls, **self.options)
+            elif metadata_identity_map.active:
+                self._sorted_objects = [
+                    self.get_record(obj) for obj in metadata_identity_map.filter(
+                        self.metadata_model_cls, **self.options)]
+            else:
+                self._sorted_objects = self.get_records(self.metadata_objects)
+            self._show_orders = [obj.show_order for obj in self._sorted_objects]
+        return self._sorted_objects
+
+    @classmethod
+    def get_record(cls, obj=None):
+        """Returns a MetadataRecord of a metadata model instance.
+        """
+        return cls.metadata_record_cls(
+            **{field: getattr(obj, field) for field in cls.record_fields})
+
+    @classmethod
+    def get_records(cls, queryset=None):
+        """Returns a list of MetadataRecords read from a metadata
+        queryset with `values_list`.
+        """
+        return [cls.metadata_record_cls(**dict(zip(cls.record_fields, values)))
+                for values in queryset.values_list(*cls.record_fields)]
 
     def next_object(self, show_order=None, entry_status=None):
         """Returns the next model instance based on the show order.
         """
-        opts = {'show_order__gt': show_order}
-        if entry_status:
-            opts.update(entry_status=entry_status)
-        return self.metadata_objects.filter(**opts).order_by('show_order').first()
+        sorted_objects = self.sorted_objects
+        index = bisect_right(self._show_orders, show_order)
+        for obj in sorted_objects[index:]:
+            if not entry_status or obj.entry_status == entry_status:
+                return obj
+        return None
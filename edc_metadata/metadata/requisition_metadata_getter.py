@@ -4,3 +4,4 @@ from .metadata_getter import MetadataGetter
 class RequisitionMetadataGetter(MetadataGetter):
 
     metadata_model = 'edc_metadata.requisitionmetadata'
+    record_fields = MetadataGetter.record_fields + ('panel_name', )
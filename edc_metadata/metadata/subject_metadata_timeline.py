@@ -0,0 +1,186 @@
+from array import array
+from edc_visit_schedule import site_visit_schedules
+from itertools import chain
+
+from ..choices import ENTRY_STATUS
+from ..constants import CRF, KEYED, REQUIRED, REQUISITION
+from ..model_resolvers import site_model_resolvers
+
+
+class SubjectMetadataTimeline:
+
+    """A class that loads the CRF and requisition metadata of all
+    visits of a subject in two queries into compact columns.
+
+    Rows are ordered by visit, see `visits`, then show_order.
+    Visits are ordered by visit schedule and schedule, in
+    registration order, then timepoint and visit code sequence.
+    Each row is an index into `categories`, `model_names`,
+    `panel_names` and `entry_statuses`, and its show order. The
+    rows of visit `i` are `offsets[i]` to `offsets[i + 1]`.
+
+    For example:
+
+        timeline = SubjectMetadataTimeline(subject_identifier='1234')
+        for visit, percent in zip(timeline.visits, timeline.percent_complete()):
+            ...
+    """
+
+    categories = (CRF, REQUISITION)
+    entry_statuses = tuple(entry_status for entry_status, _ in ENTRY_STATUS)
+    visit_fields = ('visit_schedule_name', 'schedule_name', 'visit_code',
+                    'visit_code_sequence')
+
+    def __init__(self, subject_identifier=None, visit_schedule_name=None,
+                 schedule_name=None):
+        self.subject_identifier = subject_identifier
+        self.options = dict(subject_identifier=subject_identifier)
+        if visit_schedule_name:
+            self.options.update(visit_schedule_name=visit_schedule_name)
+        if schedule_name:
+            self.options.update(schedule_name=schedule_name)
+        self.model_names = []
+        self.panel_names = [None]
+        self.visits = []
+        self.visit_indexes = {}
+        self.offsets = array('I', [0])
+        self.category_codes = array('b')
+        self.model_codes = array('H')
+        self.panel_codes = array('H')
+        self.status_codes = array('b')
+        self.show_orders = array('i')
+        self.load()
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(subject_identifier='
+                f'{self.subject_identifier})')
+
+    def __len__(self):
+        return len(self.status_codes)
+
+    def get_rows(self, category=None):
+        """Returns an iterator of (visit key, show_order, category code,
+        model, panel_name, entry_status) for a category.
+        """
+        model_cls = site_model_resolvers.get_metadata_model(category)
+        fields = self.visit_fields + ('show_order', 'model', 'entry_status')
+        if category == REQUISITION:
+            fields += ('panel_name', )
+        category_code = self.categories.index(category)
+        queryset = (model_cls.objects.filter(**self.options)
+                    .order_by()
+                    .values_list(*fields))
+        for row in queryset.iterator():
+            yield (row[:4], row[4], category_code, row[5],
+                   row[7] if category == REQUISITION else None, row[6])
+
+    def load(self):
+        """Merges the CRF and requisition metadata into the columns.
+        """
+        model_index = {}
+        panel_index = {None: 0}
+        status_index = {entry_status: i for i, entry_status
+                        in enumerate(self.entry_statuses)}
+        visit = None
+        visit_orders = self.get_visit_orders()
+        rows = sorted(
+            chain(self.get_rows(CRF), self.get_rows(REQUISITION)),
+            key=lambda row: (
+                visit_orders.get(row[0][:3], len(visit_orders)), row[0], row[1]))
+        for visit_key, show_order, category_code, model, panel_name, entry_status in rows:
+            if visit_key != visit:
+                if visit is not None:
+                    self.offsets.append(len(self.status_codes))
+                self.visit_indexes.update({visit_key: len(self.visits)})
+                self.visits.append(visit_key)
+                visit = visit_key
+            if model not in model_index:
+                model_index.update({model: len(self.model_names)})
+                self.model_names.append(model)
+            if panel_name not in panel_index:
+                panel_index.update({panel_name: len(self.panel_names)})
+                self.panel_names.append(panel_name)
+            self.category_codes.append(category_code)
+            self.model_codes.append(model_index[model])
+            self.panel_codes.append(panel_index[panel_name])
+            self.status_codes.append(status_index.get(entry_status, -1))
+            self.show_orders.append(show_order)
+        if visit is not None:
+            self.offsets.append(len(self.status_codes))
+
+    @staticmethod
+    def get_visit_orders():
+        """Returns a dictionary of {(visit_schedule_name,
+        schedule_name, visit_code): order} of the registered
+        visit schedules.
+        """
+        visit_orders = {}
+        if site_visit_schedules.loaded:
+            for visit_schedule in site_visit_schedules.registry.values():
+                for schedule in visit_schedule.schedules.values():
+                    for visit in sorted(schedule.visits.values(),
+                                        key=lambda visit: visit.timepoint):
+                        visit_orders.update({
+                            (visit_schedule.name, schedule.name, visit.code):
+                            len(visit_orders)})
+        return visit_orders
+
+    def get_visit_index(self, visit_schedule_name=None, schedule_name=None,
+                        visit_code=None, visit_code_sequence=None):
+        """Returns the index of a visit or raises ValueError.
+        """
+        visit_key = (visit_schedule_name, schedule_name, visit_code,
+                     visit_code_sequence or 0)
+        try:
+            return self.visit_indexes[visit_key]
+        except KeyError:
+            raise ValueError(
+                f'Visit not found. Got {visit_schedule_name}.{schedule_name}.'
+                f'{visit_code}.{visit_code_sequence}')
+
+    def get_row(self, index=None):
+        """Returns a tuple of (category, model, panel_name,
+        entry_status, show_order) for a row.
+        """
+        status_code = self.status_codes[index]
+        return (self.categories[self.category_codes[index]],
+                self.model_names[self.model_codes[index]],
+                self.panel_names[self.panel_codes[index]],
+                self.entry_statuses[status_code] if status_code >= 0 else None,
+                self.show_orders[index])
+
+    def counts(self, entry_status=None):
+        """Returns a list of the number of forms with an entry
+        status per visit.
+        """
+        code = self.entry_statuses.index(entry_status)
+        offsets = self.offsets
+        return [self.status_codes[offsets[i]:offsets[i + 1]].count(code)
+                for i in range(len(self.visits))]
+
+    def first_required(self):
+        """Returns a list of the first REQUIRED row, see `get_row`,
+        or None per visit.
+        """
+        code = self.entry_statuses.index(REQUIRED)
+        offsets = self.offsets
+        first_required = []
+        for i in range(len(self.visits)):
+            try:
+                index = self.status_codes[offsets[i]:offsets[i + 1]].index(code)
+            except ValueError:
+                first_required.append(None)
+            else:
+                first_required.append(self.get_row(offsets[i] + index))
+        return first_required
+
+    def percent_complete(self):
+        """Returns a list of KEYED as a percentage of REQUIRED and
+        KEYED per visit, or None if neither.
+        """
+        percent_complete = []
+        for keyed, required in zip(self.counts(KEYED), self.counts(REQUIRED)):
+            total = keyed + required
+            percent_complete.append(
+                round(100.0 * keyed / total, 1) if total else None)
+        return percent_complete
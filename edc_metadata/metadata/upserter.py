@@ -0,0 +1,89 @@
+from django.apps import apps as django_apps
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, router, transaction
+from django.db.utils import IntegrityError
+
+
+class Upserter:
+
+    """A class to insert metadata model instances that may already
+    exist, for example when the same visit is saved concurrently
+    from two devices.
+
+    `insert` uses the database's native conflict handling, e.g.
+    INSERT .. ON CONFLICT DO NOTHING, if the backend supports it
+    (`connection.features.supports_ignore_conflicts`, Django 2.2+).
+    Otherwise it inserts inside a savepoint and falls back to one
+    row at a time if a row conflicts on `unique_together`. Like
+    `bulk_create`, `insert` does not send the post_save signal.
+
+    `get_or_create` saves the instance so post_save is sent,
+    e.g. for edc_sync.
+    """
+
+    def __init__(self, model_cls=None):
+        self.model_cls = model_cls
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(model_cls={self.model_cls})'
+
+    @property
+    def connection(self):
+        return connections[router.db_for_write(self.model_cls)]
+
+    @property
+    def supports_ignore_conflicts(self):
+        return getattr(self.connection.features, 'supports_ignore_conflicts', False)
+
+    def insert(self, objs=None):
+        """Inserts model instances in one statement skipping any
+        that conflict with an existing row.
+        """
+        if objs:
+            self.prepare(objs)
+            if self.supports_ignore_conflicts:
+                self.model_cls.objects.bulk_create(objs, ignore_conflicts=True)
+            else:
+                try:
+                    with transaction.atomic():
+                        self.model_cls.objects.bulk_create(objs)
+                except IntegrityError:
+                    for obj in objs:
+                        self.insert_one(obj)
+
+    def insert_one(self, obj=None):
+        """Inserts a model instance, returns False if it conflicts
+        with an existing row.
+        """
+        try:
+            with transaction.atomic():
+                obj.save(force_insert=True)
+        except IntegrityError:
+            return False
+        return True
+
+    def get_or_create(self, defaults=None, **options):
+        """Returns a tuple of (model_obj, created).
+
+        Inserts first and reads the row only if the insert
+        conflicts, so a missing row costs one INSERT. Unlike
+        `QuerySet.get_or_create`, a concurrent insert of the same
+        row is not raised as an IntegrityError.
+        """
+        obj = self.model_cls(**options, **(defaults or {}))
+        if self.insert_one(obj):
+            return obj, True
+        return self.model_cls.objects.get(**options), False
+
+    def prepare(self, objs=None):
+        """Sets attributes otherwise set in `save()`.
+        """
+        try:
+            self.model_cls._meta.get_field('site')
+        except FieldDoesNotExist:
+            pass
+        else:
+            site = django_apps.get_model('sites.site').objects.get_current()
+            for obj in objs:
+                if not obj.site_id:
+                    obj.site = site
@@ -0,0 +1,97 @@
+import threading
+
+from collections import OrderedDict
+from django.apps import apps as django_apps
+from django.db import connections, transaction
+from functools import partial
+
+from .model_resolvers import site_model_resolvers
+
+
+class MetadataCoalescer(threading.local):
+
+    """A class that collects CRFs and requisitions saved or deleted
+    in a transaction and updates their metadata and runs the rules
+    once per visit when the transaction commits.
+
+    Enabled by edc_metadata.AppConfig.coalesce_on_commit. Outside
+    of an atomic block, metadata is updated as before.
+
+    An on_commit callback is registered for each save so that the
+    visits are processed as long as any save survives a savepoint
+    rollback. Processing re-reads the references and metadata, so
+    instances saved in a rolled back savepoint are harmless.
+    Pending visits of a rolled back transaction are processed when
+    the next transaction on the connection commits, skipping
+    visits that no longer exist.
+    """
+
+    def __init__(self):
+        self.pending = {}
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+    @property
+    def enabled(self):
+        return getattr(site_model_resolvers.app_config, 'coalesce_on_commit', False)
+
+    def add(self, instance=None, using=None, update=None):
+        """Returns True if the instance is queued to be processed
+        on commit.
+
+        If `update` is False, only the rules are run for the
+        instance's visit, for example on delete.
+        """
+        update = True if update is None else update
+        connection = connections[using]
+        if (not self.enabled or not connection.in_atomic_block
+                or not hasattr(instance, 'metadata_update')):
+            return False
+        visits = self.pending.setdefault(using, OrderedDict())
+        visit = instance.visit
+        visit, instances = visits.setdefault(visit.pk, (visit, OrderedDict()))
+        if update:
+            instances.update({(instance._meta.label_lower, instance.pk): instance})
+        transaction.on_commit(partial(self.process, using), using=using)
+        return True
+
+    def is_pending(self, using=None):
+        """Returns True if visits are queued for the connection.
+        """
+        return bool(self.pending.get(using))
+
+    def process(self, using=None):
+        """Updates metadata for each queued instance and runs
+        the rules once per visit.
+
+        Called by the first on_commit callback to run.
+        """
+        visits = self.pending.pop(using, {})
+        rules_enabled = django_apps.get_app_config(
+            'edc_metadata_rules').metadata_rules_enabled
+        for visit, instances in self.get_existing(visits.values(), using=using):
+            for instance in instances.values():
+                instance.metadata_update()
+            if rules_enabled:
+                visit.run_metadata_rules(visit=visit)
+
+    @staticmethod
+    def get_existing(visits=None, using=None):
+        """Returns a list of the (visit, instances) whose visit
+        exists, one query per visit model.
+        """
+        visits = list(visits)
+        pks = {}
+        for visit, _ in visits:
+            pks.setdefault(visit.__class__, []).append(visit.pk)
+        existing = set()
+        for model_cls, visit_pks in pks.items():
+            existing.update([
+                (model_cls, pk) for pk in model_cls.objects.using(using).filter(
+                    pk__in=visit_pks).values_list('pk', flat=True)])
+        return [(visit, instances) for visit, instances in visits
+                if (visit.__class__, visit.pk) in existing]
+
+
+metadata_coalescer = MetadataCoalescer()
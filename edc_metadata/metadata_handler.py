@@ -1,5 +1,6 @@
 from django.core.exceptions import ObjectDoesNotExist
 
+from .identity_map import metadata_identity_map
 from .metadata import Creator
 
 
@@ -21,27 +22,36 @@ class MetadataHandler:
     def __init__(self, metadata_model=None, visit=None, model=None):
         """param visit is a visit model instance.
         """
+        self._creator = None
         self.metadata_model = metadata_model
         self.model = model
         self.visit = visit  # visit model instance
-        self.creator = self.creator_cls(visit=self.visit, update_keyed=True)
+
+    @property
+    def creator(self):
+        """Returns a Creator, only needed if the metadata
+        instance does not exist.
+        """
+        if not self._creator:
+            self._creator = self.creator_cls(visit=self.visit, update_keyed=True)
+        return self._creator
 
     @property
     def metadata_obj(self):
         """Returns a metadata model instance.
         """
         try:
-            metadata_obj = self.metadata_model.objects.get(
-                **self.query_options)
+            metadata_obj = metadata_identity_map.get(
+                self.metadata_model, **self.query_options)
         except ObjectDoesNotExist:
             metadata_obj = self._create()
+            metadata_identity_map.put(metadata_obj)
         return metadata_obj
 
     def _create(self):
         """Returns a new metadata model instance for this CRF.
         """
-        crf_object = [
-            crf for crf in self.creator.visit.all_crfs if crf.model == self.model][0]
+        crf_object = self.creator.form_plan.crfs_by_model[self.model]
         return self.creator.create_crf(crf_object)
 
     @property
@@ -0,0 +1,93 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .constants import CRF, REQUISITION
+from .model_resolvers import site_model_resolvers
+
+
+class MetadataReport:
+
+    """A class to stream CRF and requisition metadata across
+    subjects, for example a list of all REQUIRED forms.
+
+    Rows are read with `iterator(chunk_size)` so memory does
+    not grow with the number of rows. Filters are optional.
+
+    For example:
+
+        report = MetadataReport(entry_status=REQUIRED, site_id=10)
+        with open('required.csv', 'w', newline='') as f:
+            report.write_csv(f)
+    """
+
+    fields = ('category', 'subject_identifier', 'visit_schedule_name',
+              'schedule_name', 'visit_code', 'visit_code_sequence',
+              'model', 'panel_name', 'entry_status', 'show_order',
+              'due_datetime', 'report_datetime', 'site_id')
+    ordering = ('subject_identifier', 'visit_schedule_name', 'schedule_name',
+                'visit_code', 'visit_code_sequence', 'show_order')
+
+    def __init__(self, entry_status=None, site_id=None, visit_schedule_name=None,
+                 schedule_name=None, visit_code=None, model=None,
+                 subject_identifier=None, chunk_size=None):
+        self.chunk_size = chunk_size or 2000
+        options = dict(
+            entry_status=entry_status,
+            site_id=site_id,
+            visit_schedule_name=visit_schedule_name,
+            schedule_name=schedule_name,
+            visit_code=visit_code,
+            model=model,
+            subject_identifier=subject_identifier)
+        self.options = {k: v for k, v in options.items() if v is not None}
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.options})'
+
+    def get_queryset(self, category=None):
+        """Returns a values queryset of the metadata of a category.
+        """
+        model_cls = site_model_resolvers.get_metadata_model(category)
+        fields = [f for f in self.fields
+                  if f not in ['category', 'panel_name'] or (
+                      f == 'panel_name' and category == REQUISITION)]
+        return (model_cls.objects.filter(**self.options)
+                .order_by(*self.ordering)
+                .values(*fields))
+
+    def rows(self):
+        """Yields a dictionary per metadata row, CRFs then
+        requisitions.
+        """
+        for category in [CRF, REQUISITION]:
+            queryset = self.get_queryset(category)
+            for row in queryset.iterator(chunk_size=self.chunk_size):
+                row.update(category=category)
+                row.setdefault('panel_name', None)
+                yield row
+
+    def write_csv(self, f=None):
+        """Writes the rows to a text file object as CSV and
+        returns the number of rows.
+        """
+        writer = csv.DictWriter(f, fieldnames=self.fields)
+        writer.writeheader()
+        count = 0
+        for row in self.rows():
+            writer.writerow(row)
+            count += 1
+        return count
+
+    def write_jsonl(self, f=None):
+        """Writes the rows to a text file object as JSON lines
+        and returns the number of rows.
+        """
+        count = 0
+        for row in self.rows():
+            f.write(json.dumps(
+                {field: row[field] for field in self.fields},
+                cls=DjangoJSONEncoder) + '\n')
+            count += 1
+        return count
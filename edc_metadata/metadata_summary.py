@@ -0,0 +1,140 @@
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.utils import IntegrityError
+from edc_base import get_utcnow
+
+from .constants import CRF, KEYED, NOT_REQUIRED, REQUIRED, REQUISITION
+from .model_resolvers import site_model_resolvers
+
+
+class MetadataSummaryUpdater:
+
+    """A class to keep the number of CRF and requisition metadata
+    by entry status per visit in MetadataSummary.
+
+    Enabled by edc_metadata.AppConfig.metadata_summary_enabled.
+
+    A metadata instance inserted or saved with `versioned_save`
+    is applied as a delta in one UPDATE. Since a compare-and-swap
+    save fails if the row changed since read, its entry status as
+    read is current. Otherwise the visit's counts are recomputed,
+    once after the bulk inserts and updates.
+    """
+
+    model = 'edc_metadata.metadatasummary'
+    key_fields = ('subject_identifier', 'visit_schedule_name',
+                  'schedule_name', 'visit_code', 'visit_code_sequence')
+    count_fields = {REQUIRED: 'required', KEYED: 'keyed', NOT_REQUIRED: 'not_required'}
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+    @property
+    def enabled(self):
+        return getattr(site_model_resolvers.app_config, 'metadata_summary_enabled', False)
+
+    @property
+    def model_cls(self):
+        return site_model_resolvers.get_model(self.model)
+
+    @property
+    def metadata_model_classes(self):
+        return [site_model_resolvers.get_metadata_model(CRF),
+                site_model_resolvers.get_metadata_model(REQUISITION)]
+
+    def get_key(self, obj=None):
+        return {field: getattr(obj, field) for field in self.key_fields}
+
+    def get_deltas(self, entry_status=None, delta=None):
+        try:
+            field = self.count_fields[entry_status]
+        except KeyError:
+            return {}
+        return {field: F(field) + delta}
+
+    def update(self, metadata_obj=None, created=None, deleted=None):
+        """Applies the change of a saved or deleted metadata
+        model instance.
+        """
+        if (not self.enabled or not hasattr(metadata_obj, 'versioned_save')
+                or metadata_obj.bulk_updated):
+            return
+        key = self.get_key(metadata_obj)
+        if created or deleted or metadata_obj.compare_and_swap:
+            deltas = {}
+            if deleted:
+                deltas.update(self.get_deltas(metadata_obj.loaded_entry_status, -1))
+            elif created or metadata_obj.loaded_entry_status != metadata_obj.entry_status:
+                if not created:
+                    deltas.update(
+                        self.get_deltas(metadata_obj.loaded_entry_status, -1))
+                deltas.update(self.get_deltas(metadata_obj.entry_status, 1))
+            if not deltas or self.model_cls.objects.filter(**key).update(
+                    updated_datetime=get_utcnow(), **deltas):
+                return
+        self.recompute(**key)
+
+    def update_for_visit(self, visit=None):
+        """Recomputes the counts of a visit model instance,
+        for example after a bulk insert or update.
+        """
+        if self.enabled:
+            options = visit.metadata_query_options
+            options.update(subject_identifier=visit.subject_identifier)
+            self.recompute(**options)
+
+    def get_counts(self, **options):
+        """Returns a dictionary of {(key values): {field: count}}
+        of the metadata matching `options`, one query per
+        metadata model.
+        """
+        counts = {}
+        for model_cls in self.metadata_model_classes:
+            queryset = (
+                model_cls.objects.filter(**options)
+                .order_by()
+                .values(*self.key_fields, 'entry_status')
+                .annotate(count=Count('pk')))
+            for row in queryset.iterator():
+                if row['entry_status'] in self.count_fields:
+                    key = tuple(row[field] for field in self.key_fields)
+                    fields = counts.setdefault(
+                        key, dict.fromkeys(self.count_fields.values(), 0))
+                    fields[self.count_fields[row['entry_status']]] += row['count']
+        return counts
+
+    def recompute(self, **key):
+        """Updates, inserts or, if there is no metadata, deletes
+        the MetadataSummary of a visit.
+        """
+        counts = self.get_counts(**key).get(
+            tuple(key[field] for field in self.key_fields))
+        queryset = self.model_cls.objects.filter(**key)
+        if not counts:
+            queryset.delete()
+        elif not queryset.update(updated_datetime=get_utcnow(), **counts):
+            obj = self.model_cls(updated_datetime=get_utcnow(), **key, **counts)
+            try:
+                with transaction.atomic():
+                    obj.save(force_insert=True)
+            except IntegrityError:
+                queryset.update(updated_datetime=get_utcnow(), **counts)
+
+    def rebuild(self, batch_size=None):
+        """Replaces all MetadataSummary rows with counts read
+        in one aggregate query per metadata model.
+        """
+        counts = self.get_counts()
+        updated_datetime = get_utcnow()
+        objs = [
+            self.model_cls(
+                updated_datetime=updated_datetime,
+                **dict(zip(self.key_fields, key)), **fields)
+            for key, fields in counts.items()]
+        with transaction.atomic():
+            self.model_cls.objects.all().delete()
+            self.model_cls.objects.bulk_create(objs, batch_size=batch_size or 500)
+        return len(objs)
+
+
+metadata_summary = MetadataSummaryUpdater()
@@ -1,5 +1,13 @@
+from django.db.models import F
+
 from .constants import KEYED
-from .target_handler import TargetHandler
+from .form_plans import site_form_plans
+from .identity_map import metadata_identity_map
+from .metadata_summary import metadata_summary
+from .metadata import Creator
+from .model_resolvers import site_model_resolvers
+from .target_handler import TargetHandler, TargetModelConflict, TargetModelLookupError
+from .target_handler import TargetModelNotScheduledForVisit
 
 
 class MetadataUpdaterError(Exception):
@@ -10,30 +18,201 @@ class MetadataUpdater:
 
     """A class to update a subject's metadata given
     the visit, target model name and desired entry status.
+
+    One target handler is built per updater. `update` runs at
+    most three queries: the reference object, the metadata
+    instance and, if the entry status changes, the update of
+    the metadata instance. If the metadata instance does not
+    exist, it is created instead (get/insert).
     """
 
     target_handler = TargetHandler
 
     def __init__(self, visit=None, target_model=None):
-        self._metadata_obj = None
+        self._target = None
         self.visit = visit
         self.target_model = target_model
 
     def __repr__(self):
         return f'{self.__class__.__name__}(visit={self.visit})'
 
-    def update(self, entry_status=None):
+    @classmethod
+    def bulk_update(cls, visit=None, entry_statuses=None):
+        """Updates the entry status of many CRFs and requisitions
+        of a visit given {(model, panel_name): entry_status}.
 
-        if self.target.object:
+        See BulkMetadataUpdater.
+        """
+        return BulkMetadataUpdater(
+            visit=visit, entry_statuses=entry_statuses).update()
+
+    def update(self, entry_status=None):
+        target = self.target
+        if target.object:
             entry_status = KEYED
-        metadata_obj = self.target.metadata_obj
-        if entry_status and metadata_obj.entry_status != entry_status:
-            metadata_obj.entry_status = entry_status
-            metadata_obj.save()
+        metadata_obj = target.metadata_obj
+        if entry_status:
+            metadata_obj = metadata_obj.versioned_save(
+                entry_status=entry_status,
+                decide=lambda obj: self.decide_on_conflict(obj, entry_status))
         return metadata_obj
 
+    def decide_on_conflict(self, metadata_obj=None, entry_status=None):
+        """Returns the values to apply to metadata re-read after a
+        version conflict, re-checking the reference object.
+        """
+        if self.target.get_object():
+            return dict(entry_status=KEYED)
+        return dict(entry_status=entry_status)
+
     @property
     def target(self):
+        if not self._target:
+            self._target = self.get_target()
+        return self._target
+
+    def get_target(self):
         return self.target_handler(
             model=self.target_model,
             visit=self.visit)
+
+
+class BulkMetadataUpdater:
+
+    """A class to update the entry status of many CRFs and
+    requisitions of a visit.
+
+    `entry_statuses` is a dictionary of
+    {(model, panel_name): entry_status} where panel_name is None
+    for CRFs.
+
+    As with MetadataUpdater, targets that are keyed are set to
+    KEYED. Keyed state is resolved with one reference query per
+    reference model, existing metadata is read in one query,
+    missing metadata is inserted and each entry status is then
+    applied with one UPDATE per metadata model. The updated rows
+    are then read once to send the post_save signal, see
+    `Base.send_post_save`.
+
+    As with `versioned_save`, an UPDATE only applies to rows with
+    the entry status read and increments their version, so a row
+    changed since read, for example to KEYED, is not overwritten.
+    """
+
+    creator_cls = Creator
+
+    def __init__(self, visit=None, entry_statuses=None):
+        self.visit = visit  # visit model instance
+        self.entry_statuses = dict(entry_statuses or {})
+        self.creator = self.creator_cls(visit=visit, update_keyed=True)
+        self.form_plan = self.creator.form_plan
+        self.crfs = {}
+        self.requisitions = {}
+        for model, panel_name in self.entry_statuses:
+            self.validate(model=model, panel_name=panel_name)
+        self.keyed_resolver = self.creator.keyed_resolver_cls(
+            visit=visit,
+            crfs=list(self.crfs.values()),
+            requisitions=list(self.requisitions.values()))
+        self.creator.crf_creator.keyed_resolver = self.keyed_resolver
+        self.creator.requisition_creator.keyed_resolver = self.keyed_resolver
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(visit={self.visit})'
+
+    def validate(self, model=None, panel_name=None):
+        """Raises the exceptions of TargetHandler and
+        RequisitionTargetHandler if the target is invalid or
+        not scheduled for this visit.
+        """
+        from .requisition import InvalidTargetPanel, TargetPanelNotScheduledForVisit
+
+        if model == self.visit._meta.label_lower:
+            raise TargetModelConflict(
+                f'Target model and visit model are the same! '
+                f'Got {model}=={self.visit._meta.label_lower}')
+        try:
+            site_model_resolvers.get_model(model)
+        except LookupError as e:
+            raise TargetModelLookupError(
+                f'Target model name is invalid. Got {e}')
+        if model not in self.form_plan.models:
+            raise TargetModelNotScheduledForVisit(
+                f'Target model {model} is not scheduled '
+                f'for visit \'{self.visit.visit_code}\'.')
+        if panel_name:
+            schedule_plan = site_form_plans.get_schedule_plan(
+                visit_schedule_name=self.visit.visit_schedule_name,
+                schedule_name=self.visit.schedule_name)
+            if panel_name not in schedule_plan.panel_names:
+                raise InvalidTargetPanel(
+                    f'Invalid panel. {panel_name} is not a valid '
+                    f'panel for any visit in schedule '
+                    f'{repr(schedule_plan.schedule)}. ')
+            try:
+                requisition = self.form_plan.requisitions_by_key[
+                    (model, panel_name)]
+            except KeyError:
+                raise TargetPanelNotScheduledForVisit(
+                    f'Target panel {panel_name} is not scheduled '
+                    f'for {model} for visit \'{self.visit.visit_code}\'.')
+            self.requisitions.update({(model, panel_name): requisition})
+        else:
+            try:
+                crf = self.form_plan.crfs_by_model[model]
+            except KeyError:
+                raise TargetModelNotScheduledForVisit(
+                    f'Target model {model} is not scheduled as a CRF '
+                    f'for visit \'{self.visit.visit_code}\'. Expected a '
+                    f'panel name.')
+            self.crfs.update({(model, None): crf})
+
+    def get_entry_statuses(self):
+        """Returns a dictionary of {(model, panel_name): entry_status}
+        with keyed targets set to KEYED.
+        """
+        entry_statuses = {}
+        for key, entry_status in self.entry_statuses.items():
+            if key in self.crfs:
+                is_keyed = self.keyed_resolver.is_crf_keyed(self.crfs[key])
+            else:
+                is_keyed = self.keyed_resolver.is_requisition_keyed(
+                    self.requisitions[key])
+            entry_statuses.update({key: KEYED if is_keyed else entry_status})
+        return entry_statuses
+
+    def update(self):
+        """Applies the entry statuses and returns a dictionary of
+        {(model, panel_name): entry_status} of the targets changed.
+        """
+        entry_statuses = self.get_entry_statuses()
+        existing = self.creator.existing
+        changed = {key: entry_status
+                   for key, entry_status in entry_statuses.items()
+                   if existing.get(key) != entry_status}
+        missing = [key for key in changed if key not in existing]
+        for key in missing:
+            if key in self.crfs:
+                self.creator.create_crf(
+                    crf=self.crfs[key], entry_status=changed[key])
+            else:
+                self.creator.create_requisition(
+                    requisition=self.requisitions[key],
+                    entry_status=changed[key])
+        groups = {}
+        for key, entry_status in changed.items():
+            if key not in missing:
+                groups.setdefault(
+                    (existing[key], entry_status), []).append(key)
+        base = self.creator.crf_creator
+        for (read_entry_status, entry_status), keys in groups.items():
+            for queryset in base.get_querysets(keys=keys):
+                queryset.filter(entry_status=read_entry_status).update(
+                    entry_status=entry_status, version=F('version') + 1)
+        if changed:
+            metadata_identity_map.invalidate(visit=self.visit)
+            base.send_post_save(
+                keys=[key for keys in groups.values() for key in keys],
+                update_fields=['entry_status', 'version'])
+            metadata_summary.update_for_visit(visit=self.visit)
+        return changed
@@ -21,11 +21,20 @@ class MetadataWrapper:
     """A class that gets the corresponding model instance, or not, for the
     given metadata object and sets it to itself along with other
     attributes like the visit, model class, metadata_obj, etc.
+
+    If `model_objs`, a dictionary of {key: model_obj} of the
+    model class fetched for the visit, is given, the model
+    instance is looked up by `model_obj_key` instead of queried.
+
+    Set `batch_model_objs = False` in a subclass that overrides
+    `options` so that the model instance is queried instead.
     """
 
     label = None
+    model_obj_select_related = None
+    batch_model_objs = True
 
-    def __init__(self, visit=None, metadata_obj=None, **kwargs):
+    def __init__(self, visit=None, metadata_obj=None, model_objs=None, **kwargs):
         self.metadata_obj = metadata_obj
         self.visit = visit
 
@@ -38,6 +47,9 @@ class MetadataWrapper:
                 f'{self.metadata_obj.visit_code}.'
                 f'{self.metadata_obj.visit_code_sequence}. Got {repr(metadata_obj)}.')
 
+        if model_objs is not None:
+            self.model_obj = model_objs.get(self.model_obj_key)
+            return
         try:
             self.model_obj = self.model_cls.objects.get(**self.options)
         except AttributeError as e:
@@ -57,6 +69,18 @@ class MetadataWrapper:
         """
         return {f'{self.model_cls.visit_model_attr()}': self.visit}
 
+    @property
+    def model_obj_key(self):
+        """Returns the key of the model instance in `model_objs`.
+        """
+        return None
+
+    @classmethod
+    def get_model_obj_key(cls, model_obj=None):
+        """Returns the key of a model instance of the visit.
+        """
+        return None
+
     @property
     def model_cls(self):
         """Returns a model class or raises for the model that
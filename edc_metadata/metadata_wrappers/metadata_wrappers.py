@@ -1,3 +1,6 @@
+from django.apps import apps as django_apps
+
+from ..metadata import MetadataRecord
 from .metadata_wrapper import DeletedInvalidMetadata
 
 
@@ -6,22 +9,51 @@ class MetadataWrappers:
     """A class that generates a collection of MetadataWrapper objects, e.g. CRF
     or REQUISITION, from a queryset of metadata objects.
 
+    The model instances of the visit are fetched with one query
+    per model class, see `get_model_objs`, unless the wrapper
+    class sets `batch_model_objs` to False, see MetadataWrapper.
+
+    If `metadata_projection` is True, the metadata is read as
+    MetadataRecords, see MetadataGetter. The model instance of
+    invalid metadata is read to delete it. The default is False,
+    as dashboards may read any field of the metadata.
+
     See classes Crf, Requisition in edc_visit_schedule.
     """
 
     metadata_getter_cls = None
     metadata_wrapper_cls = None
+    metadata_projection = False
 
     def __init__(self, **kwargs):
+        batched = self.metadata_wrapper_cls.batch_model_objs
+        kwargs.setdefault('projection', self.metadata_projection and batched)
         self.metadata = self.metadata_getter_cls(**kwargs)
         self.objects = []
         if self.metadata.visit:
-            for metadata_obj in self.metadata.metadata_objects:
+            metadata_objects = self.metadata.sorted_objects
+            model_objs = {}
+            for metadata_obj in metadata_objects:
+                if metadata_obj.model not in model_objs:
+                    model_objs.update({
+                        metadata_obj.model: self.get_model_objs(
+                            metadata_obj.model) if batched else None})
+            for metadata_obj in metadata_objects:
+                if isinstance(metadata_obj, MetadataRecord):
+                    if model_objs[metadata_obj.model] is None:
+                        metadata_obj = self.metadata.metadata_model_cls.objects.get(
+                            pk=metadata_obj.pk)
+                        values = metadata_obj.__dict__
+                    else:
+                        values = metadata_obj.as_dict()
+                else:
+                    values = metadata_obj.__dict__
                 try:
                     metadata_wrapper = self.metadata_wrapper_cls(
                         metadata_obj=metadata_obj,
                         visit=self.metadata.visit,
-                        **metadata_obj.__dict__)
+                        model_objs=model_objs[metadata_obj.model],
+                        **values)
                 except DeletedInvalidMetadata:
                     pass
                 else:
@@ -29,3 +61,32 @@ class MetadataWrappers:
 
     def __repr__(self):
         return f'{self.__class__.__name__}({self.objects})'
+
+    def get_model_objs(self, model=None):
+        """Returns a dictionary of {key: model_obj} of the instances
+        of a model for the visit in one query.
+
+        Returns None if the model or its visit_model_attr is
+        invalid, leaving the wrapper to delete the metadata or raise.
+        Raises MultipleObjectsReturned if two instances have the
+        same key.
+        """
+        try:
+            model_cls = django_apps.get_model(model)
+            visit_model_attr = model_cls.visit_model_attr()
+        except (LookupError, AttributeError):
+            return None
+        queryset = model_cls.objects.filter(
+            **{visit_model_attr: self.metadata.visit})
+        if self.metadata_wrapper_cls.model_obj_select_related:
+            queryset = queryset.select_related(
+                *self.metadata_wrapper_cls.model_obj_select_related)
+        model_objs = {}
+        for model_obj in queryset:
+            key = self.metadata_wrapper_cls.get_model_obj_key(model_obj)
+            if key in model_objs:
+                raise model_cls.MultipleObjectsReturned(
+                    f'More than one {model_cls._meta.object_name} for visit '
+                    f'{self.metadata.visit}. Got key {key}.')
+            model_objs.update({key: model_obj})
+        return model_objs
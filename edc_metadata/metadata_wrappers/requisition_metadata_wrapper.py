@@ -4,6 +4,7 @@ from .metadata_wrapper import MetadataWrapper
 class RequisitionMetadataWrapper(MetadataWrapper):
 
     label = 'Requisition'
+    model_obj_select_related = ('panel', )
 
     def __init__(self, metadata_obj=None, **kwargs):
         self.panel_name = metadata_obj.panel_name
@@ -14,3 +15,11 @@ class RequisitionMetadataWrapper(MetadataWrapper):
         options = super().options
         options.update(panel__name=self.panel_name)
         return options
+
+    @property
+    def model_obj_key(self):
+        return self.panel_name
+
+    @classmethod
+    def get_model_obj_key(cls, model_obj=None):
+        return model_obj.panel.name
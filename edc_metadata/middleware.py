@@ -0,0 +1,18 @@
+from .identity_map import metadata_identity_map
+
+
+class MetadataIdentityMapMiddleware:
+
+    """Loads each metadata row at most once per request,
+    see MetadataIdentityMap.
+
+    Add 'edc_metadata.middleware.MetadataIdentityMapMiddleware'
+    to settings.MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with metadata_identity_map:
+            return self.get_response(request)
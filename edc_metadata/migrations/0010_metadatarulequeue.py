@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edc_metadata', '0009_auto_20180116_1528'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetadataRuleQueue',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('visit_model', models.CharField(max_length=50)),
+                ('visit_pk', models.CharField(max_length=36)),
+                ('subject_identifier', models.CharField(max_length=50)),
+                ('trigger', models.CharField(help_text='label_lower of the model that triggered the rules', max_length=50, null=True)),
+                ('enqueued_datetime', models.DateTimeField(db_index=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_error', models.TextField(null=True)),
+            ],
+            options={
+                'verbose_name': 'Metadata Rule Queue',
+                'verbose_name_plural': 'Metadata Rule Queue',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='metadatarulequeue',
+            index=models.Index(fields=['visit_model', 'visit_pk'], name='edc_meta_queue_visit_idx'),
+        ),
+    ]
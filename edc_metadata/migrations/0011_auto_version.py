@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edc_metadata', '0010_metadatarulequeue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crfmetadata',
+            name='version',
+            field=models.IntegerField(default=0, editable=False, help_text='System field. Incremented on every update.'),
+        ),
+        migrations.AddField(
+            model_name='requisitionmetadata',
+            name='version',
+            field=models.IntegerField(default=0, editable=False, help_text='System field. Incremented on every update.'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edc_metadata', '0011_auto_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetadataSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject_identifier', models.CharField(max_length=50)),
+                ('visit_schedule_name', models.CharField(max_length=25)),
+                ('schedule_name', models.CharField(max_length=25)),
+                ('visit_code', models.CharField(max_length=25)),
+                ('visit_code_sequence', models.IntegerField(default=0)),
+                ('required', models.IntegerField(default=0)),
+                ('keyed', models.IntegerField(default=0)),
+                ('not_required', models.IntegerField(default=0)),
+                ('updated_datetime', models.DateTimeField(null=True)),
+            ],
+            options={
+                'verbose_name': 'Metadata Summary',
+                'verbose_name_plural': 'Metadata Summary',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='metadatasummary',
+            unique_together={('subject_identifier', 'visit_schedule_name', 'schedule_name', 'visit_code', 'visit_code_sequence')},
+        ),
+    ]
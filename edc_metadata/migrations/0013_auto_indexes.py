@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edc_metadata', '0012_metadatasummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='crfmetadata',
+            index=models.Index(fields=['subject_identifier', 'visit_code', 'visit_code_sequence', 'show_order'], name='edc_meta_crf_visit_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crfmetadata',
+            index=models.Index(fields=['entry_status', 'model', 'site'], name='edc_meta_crf_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crfmetadata',
+            index=models.Index(fields=['visit_schedule_name', 'schedule_name'], name='edc_meta_crf_schedule_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requisitionmetadata',
+            index=models.Index(fields=['subject_identifier', 'visit_code', 'visit_code_sequence', 'show_order'], name='edc_meta_req_visit_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requisitionmetadata',
+            index=models.Index(fields=['entry_status', 'model', 'site'], name='edc_meta_req_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requisitionmetadata',
+            index=models.Index(fields=['visit_schedule_name', 'schedule_name'], name='edc_meta_req_schedule_idx'),
+        ),
+    ]
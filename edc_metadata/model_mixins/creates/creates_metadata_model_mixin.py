@@ -1,38 +1,109 @@
 from django.db import models
-from edc_metadata_rules import MetadataRuleEvaluator
 
 from ...constants import KEYED, REQUISITION, CRF
 from ...metadata import Metadata, Destroyer, DeleteMetadataError
 from ...metadata import RequisitionMetadataGetter, CrfMetadataGetter
+from ...model_resolvers import site_model_resolvers
+from ...rule_groups import MetadataRuleEvaluator
+from ...rule_queue import rule_queue
 
 
 class CreatesMetadataModelMixin(models.Model):
     """A mixin to enable a model to create metadata on save.
 
     Typically this is a Visit model.
+
+    Metadata is only created and the rules only run on save if
+    one of the fields that affect metadata has changed since the
+    instance was loaded, see `metadata_tracked_fields`. The reason
+    field is always tracked. Set `metadata_force_refresh = True`
+    on the instance before saving to refresh regardless, for
+    example if rule predicates read other fields of this model.
     """
 
     metadata_cls = Metadata
     metadata_destroyer_cls = Destroyer
     metadata_rule_evaluator_cls = MetadataRuleEvaluator
+    metadata_bulk_create = False
+    metadata_tracked_fields = [
+        'visit_schedule_name', 'schedule_name', 'visit_code',
+        'visit_code_sequence']
+
+    metadata_snapshot = None
+    metadata_snapshot_missing = object()
+    metadata_force_refresh = False
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.metadata_snapshot = instance.get_metadata_snapshot()
+        return instance
+
+    def get_metadata_snapshot(self):
+        """Returns a dictionary of the loaded values of the
+        tracked fields.
+
+        Deferred fields are not loaded and are treated as changed.
+        """
+        fields = list(self.metadata_tracked_fields)
+        reason_field = site_model_resolvers.app_config.reason_field.get(
+            self._meta.label_lower)
+        if reason_field:
+            fields.append(reason_field)
+        return {
+            field: self.__dict__.get(field, self.metadata_snapshot_missing)
+            for field in fields}
+
+    @property
+    def metadata_refresh_required(self):
+        """Returns True if metadata should be created and the
+        rules run on save.
+        """
+        if self.metadata_force_refresh or self.metadata_snapshot is None:
+            return True
+        snapshot = self.get_metadata_snapshot()
+        return (snapshot != self.metadata_snapshot
+                or self.metadata_snapshot_missing in snapshot.values())
+
+    def metadata_refreshed(self):
+        """Resets the snapshot after metadata is refreshed, called
+        by post_save signal.
+        """
+        self.metadata_snapshot = self.get_metadata_snapshot()
+        self.metadata_force_refresh = False
 
     def metadata_create(self, sender=None, instance=None):
         """Created metadata, called by post_save signal.
         """
-        metadata = self.metadata_cls(visit=self, update_keyed=True)
+        metadata = self.metadata_cls(
+            visit=self, update_keyed=True, bulk=self.metadata_bulk_create)
         metadata.prepare()
 
-    def run_metadata_rules(self, visit=None):
+    def run_metadata_rules(self, visit=None, trigger=None, defer=None,
+                           source_model=None):
         """Runs all the rule groups.
 
         Initially called by post_save signal.
 
         Also called by post_save signal after metadata is updated.
+
+        If `source_model` is given, only runs the rule groups
+        that depend on it, see MetadataRuleEvaluator.
+
+        If `defer` is True, or None and defer_metadata_rules is
+        enabled, the visit is queued instead, see RuleQueue.
         """
         visit = visit or self
-        metadata_rule_evaluator = self.metadata_rule_evaluator_cls(
-            visit=visit)
-        metadata_rule_evaluator.evaluate_rules()
+        deferred = rule_queue.enabled if defer is None else defer
+        if deferred:
+            rule_queue.enqueue(
+                visit=visit, trigger=trigger or source_model or visit._meta.label_lower)
+        else:
+            options = dict(visit=visit)
+            if source_model:
+                options.update(source_model=source_model)
+            metadata_rule_evaluator = self.metadata_rule_evaluator_cls(**options)
+            metadata_rule_evaluator.evaluate_rules()
 
     @property
     def metadata_query_options(self):
@@ -1,2 +1,3 @@
 from .crf_model_mixin import CrfModelMixin
 from .requisition_metadata_model_mixin import RequisitionMetadataModelMixin
+from .model_mixin import get_metadata_indexes
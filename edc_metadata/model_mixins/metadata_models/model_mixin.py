@@ -1,10 +1,41 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import F
 
 from edc_identifier.model_mixins import NonUniqueSubjectIdentifierFieldMixin
 from edc_visit_schedule.model_mixins import VisitScheduleMethodsModelMixin
 from edc_visit_schedule.model_mixins import VisitScheduleFieldsModelMixin
 
-from ...choices import ENTRY_STATUS, REQUIRED, NOT_REQUIRED
+from ...choices import ENTRY_STATUS, KEYED, REQUIRED, NOT_REQUIRED
+
+
+class MetadataVersionConflict(Exception):
+    pass
+
+
+def get_metadata_indexes(prefix=None):
+    """Returns a list of the composite indexes for the metadata
+    queries, for the Meta of a concrete metadata model.
+
+    Expects a `site` field, see SiteModelMixin. Index names are
+    `prefix` plus a suffix and must be unique in the database,
+    for example:
+
+        class Meta(CrfModelMixin.Meta):
+            app_label = 'my_app'
+            indexes = get_metadata_indexes('my_app_crf')
+    """
+    return [
+        models.Index(
+            fields=['subject_identifier', 'visit_code',
+                    'visit_code_sequence', 'show_order'],
+            name=f'{prefix}_visit_idx'),
+        models.Index(
+            fields=['entry_status', 'model', 'site'],
+            name=f'{prefix}_status_idx'),
+        models.Index(
+            fields=['visit_schedule_name', 'schedule_name'],
+            name=f'{prefix}_schedule_idx'),
+    ]
 
 
 class ModelMixin(NonUniqueSubjectIdentifierFieldMixin,
@@ -13,8 +44,21 @@ class ModelMixin(NonUniqueSubjectIdentifierFieldMixin,
                  models.Model):
 
     """ Mixin for CrfMetadata and RequisitionMetadata models.
+
+    A concrete model should add the composite indexes, see
+    `get_metadata_indexes`.
+
+    Every save and UPDATE increments `version`. Use
+    `versioned_save` for a compare-and-swap save that re-reads the
+    row, re-decides and retries if another process updated it
+    since it was read.
     """
 
+    version_retries = 3
+    compare_and_swap = False
+    bulk_updated = False
+    loaded_entry_status = None
+
     visit_code = models.CharField(max_length=25)
 
     visit_code_sequence = models.IntegerField(default=0)
@@ -54,11 +98,100 @@ class ModelMixin(NonUniqueSubjectIdentifierFieldMixin,
         null=True,
         blank=True)
 
+    version = models.IntegerField(
+        default=0,
+        editable=False,
+        help_text='System field. Incremented on every update.')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Keeps the entry status as read, see MetadataSummaryUpdater.
+        """
+        obj = super().from_db(db, field_names, values)
+        obj.loaded_entry_status = obj.__dict__.get('entry_status')
+        return obj
+
     def natural_key(self):
         return (self.subject_identifier, self.visit_schedule_name,
                 self.schedule_name, self.visit_code,
                 self.visit_code_sequence, self.model)
 
+    def save(self, *args, **kwargs):
+        """Increments `version` on update, unless already
+        incremented by `compare_and_swap_save`.
+        """
+        if not self._state.adding and not self.compare_and_swap:
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs.update(
+                    update_fields=set(kwargs.get('update_fields')) | {'version'})
+        super().save(*args, **kwargs)
+
+    def versioned_save(self, retries=None, decide=None, **values):
+        """Sets `values` and saves if the row's version is unchanged
+        since read, otherwise re-reads the row and tries again.
+
+        On a conflict, `decide` is called with the fresh row and
+        returns the values to apply to it or None to leave it as is.
+        By default, see `decide_on_conflict`, a row KEYED since read
+        is not downgraded.
+
+        Returns the saved model instance, which is not `self`
+        after a retry. Raises MetadataVersionConflict once
+        `retries` is exhausted.
+        """
+        retries = self.version_retries if retries is None else retries
+        decide = decide or (lambda obj: self.decide_on_conflict(obj, **values))
+        obj = self
+        for attempt in range(retries + 1):
+            if not values or all([getattr(obj, k) == v for k, v in values.items()]):
+                break
+            try:
+                obj.compare_and_swap_save(**values)
+            except MetadataVersionConflict:
+                if attempt == retries:
+                    raise
+                obj = self.__class__.objects.get(pk=self.pk)
+                values = decide(obj) or {}
+            else:
+                break
+        return obj
+
+    def compare_and_swap_save(self, **values):
+        """Sets `values` and saves if the row's version is unchanged
+        since read, otherwise raises MetadataVersionConflict.
+
+        The version is incremented with an UPDATE filtered on the
+        version read. The UPDATE locks the row until the save, in
+        the same transaction, is done.
+        """
+        using = self._state.db or router.db_for_write(self.__class__)
+        with transaction.atomic(using=using):
+            queryset = self.__class__._base_manager.using(using).filter(pk=self.pk)
+            if queryset.filter(version=self.version).update(
+                    version=F('version') + 1):
+                self.version += 1
+            elif queryset.exists():
+                raise MetadataVersionConflict(
+                    f'{self._meta.label_lower} {self.pk} was updated by another '
+                    f'process. Expected version {self.version}.')
+            for k, v in values.items():
+                setattr(self, k, v)
+            self.compare_and_swap = True
+            try:
+                self.save(using=using)
+            finally:
+                self.compare_and_swap = False
+
+    def decide_on_conflict(self, obj=None, **values):
+        """Returns the values to apply to a row re-read after a
+        version conflict or None if the row was KEYED since read.
+        """
+        if (obj.entry_status == KEYED
+                and values.get('entry_status', KEYED) != KEYED):
+            return None
+        return values
+
     def is_required(self):
         return self.entry_status != NOT_REQUIRED
 
@@ -1,8 +1,9 @@
-from django.apps import apps as django_apps
 from django.db import models
-from edc_visit_schedule.site_visit_schedules import site_visit_schedules
 
-from ...constants import REQUIRED, NOT_REQUIRED
+from ...constants import REQUIRED
+from ...form_plans import site_form_plans
+from ...identity_map import metadata_identity_map
+from ...model_resolvers import site_model_resolvers
 
 
 class MetadataError(Exception):
@@ -20,9 +21,11 @@ class UpdatesMetadataModelMixin(models.Model):
         self.metadata_updater.update(entry_status=entry_status)
 
     def run_metadata_rules_for_crf(self):
-        """Runs all the rule groups for this app label.
+        """Runs the rule groups for this app label that depend
+        on this model.
         """
-        self.visit.run_metadata_rules(visit=self.visit)
+        self.visit.run_metadata_rules(
+            visit=self.visit, source_model=self._meta.label_lower)
 
     @property
     def metadata_updater(self):
@@ -35,37 +38,37 @@ class UpdatesMetadataModelMixin(models.Model):
     def metadata_reset_on_delete(self):
         """Sets the metadata instance to its original state.
         """
-        obj = self.metadata_model.objects.get(**self.metadata_query_options)
+        obj = metadata_identity_map.get(
+            self.metadata_model, **self.metadata_query_options)
         try:
-            obj.entry_status = self.metadata_default_entry_status
-        except IndexError:
+            entry_status = self.metadata_default_entry_status
+        except (KeyError, IndexError):
             # means crf is not listed in visit schedule, so remove it.
             # for example, this is a PRN form
             obj.delete()
         else:
-            obj.entry_status = self.metadata_default_entry_status or REQUIRED
-            obj.report_datetime = None
-            obj.save()
+            values = dict(
+                entry_status=entry_status or REQUIRED, report_datetime=None)
+            # this form is deleted, so the reset applies to a fresh row too
+            obj.versioned_save(decide=lambda obj: values, **values)
 
     @property
     def metadata_default_entry_status(self):
         """Returns a string that represents the default entry status
         of the crf in the visit schedule.
+
+        Raises KeyError if the crf is not in the visit schedule.
         """
-        crfs_prn = self.metadata_visit_object.crfs_prn
-        if self.visit.visit_code_sequence != 0:
-            crfs = self.metadata_visit_object.crfs_unscheduled + crfs_prn
-        else:
-            crfs = self.metadata_visit_object.crfs + crfs_prn
-        crf = [c for c in crfs if c.model == self._meta.label_lower][0]
-        return REQUIRED if crf.required else NOT_REQUIRED
+        return self.metadata_form_plan.entry_statuses[
+            (self._meta.label_lower, None)]
+
+    @property
+    def metadata_form_plan(self):
+        return site_form_plans.get_plan_for_visit(self.visit)
 
     @property
     def metadata_visit_object(self):
-        visit_schedule = site_visit_schedules.get_visit_schedule(
-            visit_schedule_name=self.visit.visit_schedule_name)
-        schedule = visit_schedule.schedules.get(self.visit.schedule_name)
-        return schedule.visits.get(self.visit.visit_code)
+        return self.metadata_form_plan.visit
 
     @property
     def metadata_query_options(self):
@@ -79,8 +82,7 @@ class UpdatesMetadataModelMixin(models.Model):
     def metadata_model(self):
         """Returns the metadata model associated with self.
         """
-        app_config = django_apps.get_app_config('edc_metadata')
-        return app_config.get_metadata_model(self.metadata_category)
+        return site_model_resolvers.get_metadata_model(self.metadata_category)
 
     class Meta:
         abstract = True
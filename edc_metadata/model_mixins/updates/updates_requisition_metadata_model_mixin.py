@@ -1,4 +1,4 @@
-from ...constants import REQUISITION, REQUIRED, NOT_REQUIRED
+from ...constants import REQUISITION
 from ...requisition import RequisitionMetadataUpdater
 from .updates_metadata_model_mixin import UpdatesMetadataModelMixin
 
@@ -31,16 +31,11 @@ class UpdatesRequisitionMetadataModelMixin(UpdatesMetadataModelMixin):
     def metadata_default_entry_status(self):
         """Returns a string that represents the configured entry status
         of the requisition in the visit schedule.
+
+        Raises KeyError if the requisition is not in the visit schedule.
         """
-        requisitions_prn = self.metadata_visit_object.requisitions_prn
-        if self.visit.visit_code_sequence != 0:
-            requisitions = (
-                self.metadata_visit_object.requisitions_unscheduled + requisitions_prn)
-        else:
-            requisitions = self.metadata_visit_object.requisitions + requisitions_prn
-        requisition = [r for r in requisitions
-                       if r.panel.name == self.panel.name][0]
-        return REQUIRED if requisition.required else NOT_REQUIRED
+        return self.metadata_form_plan.entry_statuses[
+            (self._meta.label_lower, self.panel.name)]
 
     class Meta:
         abstract = True
@@ -0,0 +1,90 @@
+from django.apps import apps as django_apps
+from django.core.exceptions import ImproperlyConfigured
+from edc_reference import site_reference_configs
+
+
+class SiteModelResolvers:
+
+    """A process-local registry of resolved model classes.
+
+    Resolves the edc_metadata AppConfig, the metadata models,
+    target model classes and reference model classes once and
+    returns them from a dictionary thereafter.
+
+    Call `reset` if the AppConfig or site_reference_configs
+    are changed, for example in tests.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+    def reset(self):
+        self._app_config = None
+        self.metadata_models = {}
+        self.models = {}
+        self.reference_models = {}
+        self.unique_together_checked = set()
+
+    @property
+    def app_config(self):
+        """Returns the edc_metadata AppConfig.
+        """
+        if not self._app_config:
+            self._app_config = django_apps.get_app_config('edc_metadata')
+        return self._app_config
+
+    def get_metadata_model(self, category=None):
+        """Returns the metadata model class for a category,
+        e.g. CRF or REQUISITION.
+        """
+        try:
+            model_cls = self.metadata_models[category]
+        except KeyError:
+            model_cls = self.app_config.get_metadata_model(category)
+            if model_cls:
+                self.check_unique_together(model_cls)
+                self.metadata_models.update({category: model_cls})
+        return model_cls
+
+    def check_unique_together(self, model_cls=None):
+        """Raises ImproperlyConfigured if a metadata model
+        class has no unique_together constraint.
+        """
+        if model_cls not in self.unique_together_checked:
+            if not model_cls._meta.unique_together:
+                raise ImproperlyConfigured(
+                    f'{model_cls._meta.label_lower}.unique_together '
+                    'constraint not set.')
+            self.unique_together_checked.add(model_cls)
+
+    def get_model(self, model=None):
+        """Returns a model class given a label_lower.
+
+        Raises LookupError if model is invalid.
+        """
+        try:
+            model_cls = self.models[model]
+        except KeyError:
+            model_cls = django_apps.get_model(model)
+            self.models.update({model: model_cls})
+        return model_cls
+
+    def get_reference_model_cls(self, name=None):
+        """Returns the reference model class for a reference
+        name, e.g. `model` or `model.panel_name`.
+
+        See also edc_reference.
+        """
+        try:
+            model_cls = self.reference_models[name]
+        except KeyError:
+            model_cls = self.get_model(
+                site_reference_configs.get_reference_model(name=name))
+            self.reference_models.update({name: model_cls})
+        return model_cls
+
+
+site_model_resolvers = SiteModelResolvers()
@@ -1,8 +1,10 @@
+from django.db import models
 from edc_base.model_mixins import BaseUuidModel
 from edc_base.sites import CurrentSiteManager, SiteModelMixin
 
 from .managers import CrfMetadataManager, RequisitionMetadataManager
 from .model_mixins.metadata_models import CrfModelMixin, RequisitionMetadataModelMixin
+from .model_mixins.metadata_models import get_metadata_indexes
 
 
 class CrfMetadata(CrfModelMixin, SiteModelMixin, BaseUuidModel):
@@ -17,6 +19,7 @@ class CrfMetadata(CrfModelMixin, SiteModelMixin, BaseUuidModel):
 
     class Meta(CrfModelMixin.Meta):
         app_label = 'edc_metadata'
+        indexes = get_metadata_indexes('edc_meta_crf')
 
 
 class RequisitionMetadata(RequisitionMetadataModelMixin, SiteModelMixin, BaseUuidModel):
@@ -31,3 +34,85 @@ class RequisitionMetadata(RequisitionMetadataModelMixin, SiteModelMixin, BaseUui
 
     class Meta(RequisitionMetadataModelMixin.Meta):
         app_label = 'edc_metadata'
+        indexes = get_metadata_indexes('edc_meta_req')
+
+
+class MetadataRuleQueue(models.Model):
+
+    """A local queue of visits for which the metadata rules
+    are to be run by the `process_metadata_queue` command.
+
+    One or more rows per visit, one per enqueue unless a row of
+    the visit is already queued and not being processed. Not
+    synchronized, see sync_models.
+    """
+
+    visit_model = models.CharField(max_length=50)
+
+    visit_pk = models.CharField(max_length=36)
+
+    subject_identifier = models.CharField(max_length=50)
+
+    trigger = models.CharField(
+        max_length=50,
+        null=True,
+        help_text='label_lower of the model that triggered the rules')
+
+    enqueued_datetime = models.DateTimeField(db_index=True)
+
+    attempts = models.IntegerField(default=0)
+
+    last_error = models.TextField(null=True)
+
+    def __str__(self):
+        return (f'{self.visit_model} {self.visit_pk} '
+                f'{self.subject_identifier} {self.trigger}')
+
+    class Meta:
+        app_label = 'edc_metadata'
+        verbose_name = 'Metadata Rule Queue'
+        verbose_name_plural = 'Metadata Rule Queue'
+        indexes = [
+            models.Index(
+                fields=['visit_model', 'visit_pk'],
+                name='edc_meta_queue_visit_idx')]
+
+
+class MetadataSummary(models.Model):
+
+    """The number of CRF and requisition metadata by entry status
+    per visit, see MetadataSummaryUpdater.
+
+    Not synchronized, see sync_models. Rebuild with the
+    `rebuild_metadata_summary` command.
+    """
+
+    subject_identifier = models.CharField(max_length=50)
+
+    visit_schedule_name = models.CharField(max_length=25)
+
+    schedule_name = models.CharField(max_length=25)
+
+    visit_code = models.CharField(max_length=25)
+
+    visit_code_sequence = models.IntegerField(default=0)
+
+    required = models.IntegerField(default=0)
+
+    keyed = models.IntegerField(default=0)
+
+    not_required = models.IntegerField(default=0)
+
+    updated_datetime = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return (f'{self.subject_identifier} {self.visit_code}.'
+                f'{self.visit_code_sequence}')
+
+    class Meta:
+        app_label = 'edc_metadata'
+        verbose_name = 'Metadata Summary'
+        verbose_name_plural = 'Metadata Summary'
+        unique_together = (
+            ('subject_identifier', 'visit_schedule_name', 'schedule_name',
+             'visit_code', 'visit_code_sequence'), )
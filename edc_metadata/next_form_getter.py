@@ -1,5 +1,6 @@
 from .constants import REQUIRED
 from .metadata import CrfMetadataGetter, RequisitionMetadataGetter
+from .rule_queue import rule_queue
 
 
 class NextFormGetter:
@@ -7,10 +8,22 @@ class NextFormGetter:
     crf_metadata_getter_cls = CrfMetadataGetter
     requisition_metadata_getter_cls = RequisitionMetadataGetter
 
+    # if metadata rules are deferred, seconds to wait for the worker
+    # before running queued rules for the visit. None to read the
+    # metadata as is, 0 to run queued rules without waiting.
+    rule_queue_timeout = None
+
+    # if True, metadata is read as MetadataRecords, see MetadataGetter
+    metadata_projection = True
+
     def next_form(self, model_obj=None, appointment=None, model=None, panel_name=None):
         """Returns the next required form based on the metadata.
 
         A form is a Crf or Requisition object from edc_visit_schedule.
+
+        Reads the metadata of one category for the visit in one
+        query and the requisition metadata only if there is no
+        next CRF.
         """
         next_form = None
 
@@ -26,18 +39,19 @@ class NextFormGetter:
             visit = appointment.visit.visit
             panel_name = panel_name
 
+        if rule_queue.enabled and self.rule_queue_timeout is not None:
+            rule_queue.wait_for_visit(
+                visit=appointment.visit, timeout=self.rule_queue_timeout)
+
         if panel_name:
             this_form = visit.get_requisition(
                 model=model, panel_name=panel_name)
             getter = self.requisition_metadata_getter_cls(
-                appointment=appointment)
-            default_next_form = None
+                appointment=appointment, projection=self.metadata_projection)
         else:
             this_form = visit.get_crf(model=model)
             getter = self.crf_metadata_getter_cls(
-                appointment=appointment)
-            default_next_form = self.first_requisition_form(
-                appointment=appointment, visit=visit)
+                appointment=appointment, projection=self.metadata_projection)
 
         metadata_obj = getter.next_object(
             show_order=this_form.show_order, entry_status=REQUIRED)
@@ -48,12 +62,16 @@ class NextFormGetter:
                     metadata_obj.model, panel_name=metadata_obj.panel_name)
             else:
                 next_form = visit.get_crf(metadata_obj.model)
-        return next_form or default_next_form
+        elif not panel_name:
+            next_form = self.first_requisition_form(
+                appointment=appointment, visit=visit)
+        return next_form
 
     def first_requisition_form(self, appointment=None, visit=None):
         first_requisition_form = None
         metadata_getter_cls = self.requisition_metadata_getter_cls
-        getter = metadata_getter_cls(appointment=appointment)
+        getter = metadata_getter_cls(
+            appointment=appointment, projection=self.metadata_projection)
         metadata_obj = getter.next_object(show_order=0, entry_status=REQUIRED)
         if metadata_obj:
             first_requisition_form = visit.get_requisition(
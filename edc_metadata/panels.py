@@ -0,0 +1,55 @@
+from django.apps import apps as django_apps
+
+
+class SitePanels:
+
+    """A process-local cache of panel model instances by name,
+    loaded with one query per panel model.
+
+    Cleared for a panel model when one of its instances is saved
+    or deleted in this process, see signals. A name not found is
+    looked up again once before returning None so that panels
+    added by another process are found.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+    def reset(self, panel_model=None):
+        """Clears the cache for a panel model or all.
+        """
+        if panel_model:
+            self.registry.pop(panel_model, None)
+            self.reloaded.pop(panel_model, None)
+        else:
+            self.registry = {}
+            self.reloaded = {}
+
+    def load(self, panel_model=None):
+        """Returns a dictionary of {name: panel} for a panel model.
+        """
+        panels = {
+            panel.name: panel
+            for panel in django_apps.get_model(panel_model).objects.all()}
+        self.registry.update({panel_model: panels})
+        return panels
+
+    def get(self, name=None, panel_model=None):
+        """Returns the panel model instance for a name or None.
+        """
+        try:
+            return self.registry[panel_model][name]
+        except KeyError:
+            if panel_model not in self.registry:
+                return self.load(panel_model).get(name)
+            reloaded = self.reloaded.setdefault(panel_model, set())
+            if name in reloaded:
+                return None
+            reloaded.add(name)
+            return self.load(panel_model).get(name)
+
+
+site_panels = SitePanels()
@@ -15,9 +15,8 @@ class RequisitionMetadataHandler(MetadataHandler):
         """Returns a created metadata model instance for
         this requisition.
         """
-        requisition_object = [
-            r for r in self.creator.visit.all_requisitions
-            if r.panel.name == self.panel.name][0]
+        requisition_object = self.creator.form_plan.requisitions_by_panel_name[
+            self.panel.name]
         return self.creator.create_requisition(requisition_object)
 
     @property
@@ -17,8 +17,7 @@ class RequisitionMetadataUpdater(MetadataUpdater):
         super().__init__(**kwargs)
         self.target_panel = target_panel
 
-    @property
-    def target(self):
+    def get_target(self):
         target = self.target_handler(
             model=self.target_model,
             visit=self.visit,
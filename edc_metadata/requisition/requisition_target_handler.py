@@ -1,8 +1,6 @@
-from django.apps import apps as django_apps
-from edc_reference import site_reference_configs
-from edc_visit_schedule.site_visit_schedules import site_visit_schedules
-
 from ..constants import REQUISITION
+from ..form_plans import site_form_plans
+from ..model_resolvers import site_model_resolvers
 from ..target_handler import TargetHandler
 from .requisition_metadata_handler import RequisitionMetadataHandler
 
@@ -26,27 +24,19 @@ class RequisitionTargetHandler(TargetHandler):
 
     @property
     def reference_model_cls(self):
-        name = f'{self.model}.{self.target_panel.name}'
-        reference_model = site_reference_configs.get_reference_model(
-            name=name)
-        return django_apps.get_model(reference_model)
+        return site_model_resolvers.get_reference_model_cls(
+            name=f'{self.model}.{self.target_panel.name}')
 
-    @property
-    def object(self):
+    def get_object(self):
         return self.reference_model_cls.objects.get_requisition_for_visit(
             visit=self.visit,
             name=f'{self.model}.{self.target_panel.name}')
 
     @property
     def target_panel_names(self):
-        """Returns a list of panels for this visit.
+        """Returns a frozenset of panels for this visit.
         """
-        if self.visit.visit_code_sequence != 0:
-            forms = (self.visit.visit.requisitions_unscheduled
-                     + self.visit.visit.requisitions_prn)
-        else:
-            forms = self.visit.visit.requisitions + self.visit.visit.requisitions_prn
-        return list(set([form.panel.name for form in forms]))
+        return self.form_plan.panel_names
 
     def raise_on_not_scheduled_for_visit(self):
         """Raises an exception if target_panel is not scheduled
@@ -58,29 +48,31 @@ class RequisitionTargetHandler(TargetHandler):
                 f'Target panel {self.target_panel.name} is not scheduled '
                 f'for visit \'{self.visit.visit_code}\'.')
 
+    @property
+    def schedule_plan(self):
+        """Returns the SchedulePlan for this visit's schedule.
+        """
+        return site_form_plans.get_schedule_plan(
+            visit_schedule_name=self.visit.visit_schedule_name,
+            schedule_name=self.visit.schedule_name)
+
     @property
     def schedule(self):
         """Returns a schedule instance from site_visit_schedule
         for this visit.
         """
-        visit_schedule = site_visit_schedules.get_visit_schedule(
-            self.visit.visit_schedule_name)
-        return visit_schedule.schedules.get(self.visit.schedule_name)
+        return self.schedule_plan.schedule
 
     def raise_on_invalid_panel(self):
         """Raises an exception if target_panel is not found in any visit
         for this schedule.
         """
-        panel_names = []
-        for visit in self.schedule.visits.values():
-            panel_names.extend([r.panel.name for r in visit.all_requisitions])
-        if self.target_panel.name not in panel_names:
+        if self.target_panel.name not in self.schedule_plan.panel_names:
             raise InvalidTargetPanel(
                 f'Invalid panel. {self.target_panel.name} is not a valid '
                 f'panel for any visit in schedule {repr(self.schedule)}. ')
 
-    @property
-    def metadata_handler(self):
+    def get_metadata_handler(self):
         return self.metadata_handler_cls(
             metadata_model=self.metadata_model,
             model=self.model,
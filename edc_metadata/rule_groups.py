@@ -0,0 +1,142 @@
+from edc_metadata_rules import MetadataRuleEvaluator as BaseMetadataRuleEvaluator
+from edc_metadata_rules.site import site_metadata_rules
+
+
+class SiteRuleGroups:
+
+    """An index of the registered metadata rule groups by the
+    models they depend on, per app_label.
+
+    A rule group depends on its source model and on its target
+    models, since deleting a target resets its metadata. Rule
+    groups without a source model read the visit and are always
+    run.
+
+    Compiled on first use and again if rule groups are
+    registered later. Call `reset` in tests that re-populate
+    site_metadata_rules.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+    def reset(self):
+        self.registry = {}
+        self.always = {}
+        self.compiled_count = None
+
+    @property
+    def registered_count(self):
+        return sum([len(rule_groups) for rule_groups in
+                    site_metadata_rules.registry.values()])
+
+    def compile(self):
+        """Builds {(app_label, model): (rule_group, ...)} in
+        registration order.
+
+        Rule groups that share a target model, directly or through
+        another rule group, are run together so that the last
+        registered still sets the entry status, as in a full
+        evaluation.
+        """
+        registry = {}
+        always = {}
+        for app_label, rule_groups in site_metadata_rules.registry.items():
+            dependencies = [
+                (rule_group, self.get_dependencies(rule_group))
+                for rule_group in rule_groups]
+            always.update({app_label: tuple(
+                rule_group for rule_group, models in dependencies if models is None)})
+            models = set()
+            for _, dependency in dependencies:
+                models.update(dependency or [])
+            for model in models:
+                selected = self.get_shared_targets(rule_groups, [
+                    rule_group for rule_group, dependency in dependencies
+                    if dependency is not None and model in dependency])
+                registry.update({(app_label, model): tuple(
+                    rule_group for rule_group, dependency in dependencies
+                    if dependency is None or rule_group in selected)})
+        self.registry = registry
+        self.always = always
+        self.compiled_count = self.registered_count
+
+    def get_shared_targets(self, rule_groups=None, selected=None):
+        """Returns a set of the selected rule groups and those
+        that share a target model with them, repeated until no
+        more are added.
+        """
+        selected = set(selected)
+        targets = set()
+        for rule_group in selected:
+            targets.update(self.get_targets(rule_group))
+        added = True
+        while added:
+            added = False
+            for rule_group in rule_groups:
+                if (rule_group not in selected
+                        and targets & self.get_targets(rule_group)):
+                    selected.add(rule_group)
+                    targets.update(self.get_targets(rule_group))
+                    added = True
+        return selected
+
+    @staticmethod
+    def get_targets(rule_group=None):
+        """Returns a frozenset of the target models of a rule group.
+        """
+        models = set()
+        for rule in rule_group._meta.options.get('rules') or []:
+            models.update(getattr(rule, 'target_models', None) or [])
+        return frozenset(models)
+
+    @classmethod
+    def get_dependencies(cls, rule_group=None):
+        """Returns a frozenset of the source and target models
+        of a rule group or None if it has no source model.
+        """
+        source_model = rule_group._meta.source_model
+        if not source_model:
+            return None
+        return frozenset({source_model}) | cls.get_targets(rule_group)
+
+    def get_rule_groups(self, app_label=None, model=None):
+        """Returns a tuple of the rule groups to run for
+        a saved or deleted model.
+        """
+        if self.compiled_count != self.registered_count:
+            self.compile()
+        try:
+            return self.registry[(app_label, model)]
+        except KeyError:
+            return self.always.get(app_label, ())
+
+
+site_rule_groups = SiteRuleGroups()
+
+
+class MetadataRuleEvaluator(BaseMetadataRuleEvaluator):
+
+    """Evaluates the rule groups of the visit's app_label or, if
+    `source_model` is given, only the rule groups that depend on
+    it, see SiteRuleGroups.
+
+    Subclass this class to customise the evaluator of
+    CreatesMetadataModelMixin.
+    """
+
+    def __init__(self, visit=None, source_model=None, **kwargs):
+        super().__init__(visit=visit, **kwargs)
+        self.visit = visit
+        self.source_model = source_model
+
+    def evaluate_rules(self):
+        if self.source_model:
+            for rule_group in site_rule_groups.get_rule_groups(
+                    app_label=self.visit._meta.app_label, model=self.source_model):
+                rule_group.evaluate_rules(visit=self.visit)
+        else:
+            super().evaluate_rules()
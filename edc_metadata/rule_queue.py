@@ -0,0 +1,153 @@
+import time
+
+from django.db import connections, router, transaction
+from django.db.models import F
+from edc_base import get_utcnow
+
+from .model_resolvers import site_model_resolvers
+
+
+class RuleQueue:
+
+    """A class to defer running the metadata rules of a visit
+    to a worker, see the `process_metadata_queue` command.
+
+    Enabled by edc_metadata.AppConfig.defer_metadata_rules.
+    Entry status updates are not deferred, only the rules.
+
+    Enqueueing never waits for a worker. A visit already queued
+    is not queued again if its item can be locked, that is, is
+    not being processed by a worker. Otherwise a new item is
+    added. A worker processes all the items of a visit it can
+    lock in one run and deletes only those, so a trigger received
+    while the rules run is not lost.
+    """
+
+    model = 'edc_metadata.metadatarulequeue'
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+    @property
+    def enabled(self):
+        return getattr(site_model_resolvers.app_config, 'defer_metadata_rules', False)
+
+    @property
+    def model_cls(self):
+        return site_model_resolvers.get_model(self.model)
+
+    @property
+    def skip_locked(self):
+        """Returns True if the database can skip locked rows.
+        """
+        connection = connections[router.db_for_write(self.model_cls)]
+        return connection.features.has_select_for_update_skip_locked
+
+    def enqueue(self, visit=None, trigger=None):
+        """Adds a visit to the queue unless a queued item of the
+        visit can be locked without waiting.
+
+        If the database cannot skip locked rows, an item is
+        always added.
+        """
+        with transaction.atomic():
+            queued = self.skip_locked and self.get_queryset(
+                visit=visit).select_for_update(skip_locked=True).first()
+            if not queued:
+                self.model_cls.objects.create(
+                    visit_model=visit._meta.label_lower,
+                    visit_pk=str(visit.pk),
+                    subject_identifier=visit.subject_identifier,
+                    trigger=trigger,
+                    enqueued_datetime=get_utcnow())
+
+    def get_queryset(self, visit=None, visit_model=None, visit_pk=None):
+        return self.model_cls.objects.filter(
+            visit_model=visit._meta.label_lower if visit else visit_model,
+            visit_pk=str(visit.pk) if visit else visit_pk)
+
+    def is_pending(self, visit=None):
+        """Returns True if the visit is queued.
+        """
+        return self.get_queryset(visit=visit).exists()
+
+    def process(self, batch_size=None, max_attempts=None):
+        """Runs the rules for a batch of queued visits in
+        order queued and returns the number processed.
+
+        Each item is claimed and processed in its own transaction.
+        Rows locked by another worker are skipped, if supported
+        by the database.
+        """
+        queryset = self.model_cls.objects.order_by('enqueued_datetime')
+        if max_attempts:
+            queryset = queryset.filter(attempts__lt=max_attempts)
+        skip_locked = self.skip_locked
+        count = 0
+        failed = []
+        while count < (batch_size or 100):
+            with transaction.atomic():
+                item = (queryset.exclude(pk__in=failed)
+                        .select_for_update(skip_locked=skip_locked).first())
+                if not item:
+                    break
+                if not self.process_item(item):
+                    failed.append(item.pk)
+            count += 1
+        return count
+
+    def process_visit(self, visit=None):
+        """Runs the rules now for a visit if queued.
+
+        For readers, such as NextFormGetter, that need
+        consistent metadata for one visit. Waits only for a
+        worker processing this visit.
+        """
+        with transaction.atomic():
+            item = self.get_queryset(visit=visit).select_for_update().first()
+            if item:
+                self.process_item(item, visit=visit)
+
+    def wait_for_visit(self, visit=None, timeout=None, interval=None):
+        """Waits up to `timeout` seconds for a worker to process
+        the visit then processes it, if still queued.
+        """
+        if timeout:
+            deadline = time.time() + timeout
+            while self.is_pending(visit=visit) and time.time() < deadline:
+                time.sleep(interval or 0.1)
+        self.process_visit(visit=visit)
+
+    def process_item(self, item=None, visit=None):
+        """Runs the rules for a queued item and deletes it and the
+        other items of the visit queued and not locked when read.
+        Returns True on success.
+
+        On error, the items are kept and the error recorded on
+        the item.
+        """
+        try:
+            with transaction.atomic():
+                pks = [item.pk] + list(
+                    self.get_queryset(
+                        visit_model=item.visit_model, visit_pk=item.visit_pk)
+                    .exclude(pk=item.pk)
+                    .select_for_update(skip_locked=self.skip_locked)
+                    .values_list('pk', flat=True))
+                if not visit:
+                    visit_model_cls = site_model_resolvers.get_model(
+                        item.visit_model)
+                    visit = visit_model_cls.objects.filter(
+                        pk=item.visit_pk).first()
+                if visit:
+                    visit.run_metadata_rules(visit=visit, defer=False)
+                self.model_cls.objects.filter(pk__in=pks).delete()
+        except Exception as e:
+            self.model_cls.objects.filter(pk=item.pk).update(
+                attempts=F('attempts') + 1,
+                last_error=f'{e.__class__.__name__}: {e}')
+            return False
+        return True
+
+
+rule_queue = RuleQueue()
@@ -2,6 +2,12 @@ from django.apps import apps as django_apps
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
+from .bulk_resetter import metadata_bulk_resetter
+from .identity_map import metadata_identity_map
+from .metadata_coalescer import metadata_coalescer
+from .metadata_summary import metadata_summary
+from .panels import site_panels
+
 
 @receiver(post_save, weak=False, dispatch_uid="metadata_create_on_post_save")
 def metadata_create_on_post_save(sender, instance, raw, created, using,
@@ -10,6 +16,9 @@ def metadata_create_on_post_save(sender, instance, raw, created, using,
     CreatesMetaDataModelMixin.
 
     For example, when saving the visit model.
+
+    Skipped if none of the fields that affect metadata
+    have changed, see CreatesMetadataModelMixin.
     """
     if not raw:
         try:
@@ -17,20 +26,25 @@ def metadata_create_on_post_save(sender, instance, raw, created, using,
         except AttributeError:
             pass
 
-        try:
-            instance.metadata_create(sender=sender, instance=instance)
-        except AttributeError as e:
-            if 'metadata_create' not in str(e):
-                raise
-        else:
-            if django_apps.get_app_config('edc_metadata_rules').metadata_rules_enabled:
-                instance.run_metadata_rules()
+        if getattr(instance, 'metadata_refresh_required', True):
+            try:
+                instance.metadata_create(sender=sender, instance=instance)
+            except AttributeError as e:
+                if 'metadata_create' not in str(e):
+                    raise
+            else:
+                if django_apps.get_app_config('edc_metadata_rules').metadata_rules_enabled:
+                    instance.run_metadata_rules()
+                instance.metadata_refreshed()
 
 
 @receiver(post_save, weak=False, dispatch_uid="metadata_update_on_post_save")
 def metadata_update_on_post_save(sender, instance, raw, created, using,
                                  update_fields, **kwargs):
     """Update the meta data record on post save of a CRF model.
+
+    If coalesce_on_commit is enabled and in an atomic block,
+    defers the update and rules to the end of the transaction.
     """
 
     if not raw and not update_fields:
@@ -39,14 +53,15 @@ def metadata_update_on_post_save(sender, instance, raw, created, using,
         except AttributeError:
             pass
 
-        try:
-            instance.metadata_update()
-        except AttributeError as e:
-            if 'metadata_update' not in str(e):
-                raise
-        else:
-            if django_apps.get_app_config('edc_metadata_rules').metadata_rules_enabled:
-                instance.run_metadata_rules_for_crf()
+        if not metadata_coalescer.add(instance=instance, using=using):
+            try:
+                instance.metadata_update()
+            except AttributeError as e:
+                if 'metadata_update' not in str(e):
+                    raise
+            else:
+                if django_apps.get_app_config('edc_metadata_rules').metadata_rules_enabled:
+                    instance.run_metadata_rules_for_crf()
 
 
 @receiver(post_delete, weak=False, dispatch_uid="metadata_reset_on_post_delete")
@@ -61,17 +76,73 @@ def metadata_reset_on_post_delete(sender, instance, using, **kwargs):
     except AttributeError:
         pass
 
-    try:
-        instance.metadata_reset_on_delete()
-    except AttributeError as e:
-        if 'metadata_reset_on_delete' not in str(e):
-            raise
-    else:
-        if django_apps.get_app_config('edc_metadata_rules').metadata_rules_enabled:
-            instance.run_metadata_rules_for_crf()
+    if not metadata_bulk_resetter.add(instance=instance):
+        try:
+            instance.metadata_reset_on_delete()
+        except AttributeError as e:
+            if 'metadata_reset_on_delete' not in str(e):
+                raise
+        else:
+            if (django_apps.get_app_config('edc_metadata_rules').metadata_rules_enabled
+                    and not metadata_coalescer.add(
+                        instance=instance, using=using, update=False)):
+                instance.run_metadata_rules_for_crf()
     # deletes all for a visit used by CreatesMetadataMixin
     try:
         instance.metadata_delete_for_visit()
     except AttributeError as e:
         if 'metadata_delete_for_visit' not in str(e):
             raise
+
+
+@receiver(post_save, weak=False, dispatch_uid="metadata_identity_map_on_post_save")
+def metadata_identity_map_on_post_save(sender, instance, raw, **kwargs):
+    """Replaces the cached copy of a saved metadata model instance,
+    see MetadataIdentityMap.
+    """
+    if not raw:
+        metadata_identity_map.put(instance)
+
+
+@receiver(post_delete, weak=False, dispatch_uid="metadata_identity_map_on_post_delete")
+def metadata_identity_map_on_post_delete(sender, instance, **kwargs):
+    """Removes a deleted metadata model instance from the
+    MetadataIdentityMap.
+    """
+    metadata_identity_map.discard(instance)
+
+
+@receiver(post_save, weak=False, dispatch_uid="site_panels_reset_on_post_save")
+def site_panels_reset_on_post_save(sender, instance, **kwargs):
+    """Clears the cached panels of a saved panel model instance,
+    see SitePanels.
+    """
+    site_panels.reset(panel_model=sender._meta.label_lower)
+
+
+@receiver(post_delete, weak=False, dispatch_uid="site_panels_reset_on_post_delete")
+def site_panels_reset_on_post_delete(sender, instance, **kwargs):
+    """Clears the cached panels of a deleted panel model instance.
+    """
+    site_panels.reset(panel_model=sender._meta.label_lower)
+
+
+@receiver(post_save, weak=False, dispatch_uid="metadata_summary_on_post_save")
+def metadata_summary_on_post_save(sender, instance, raw, created, **kwargs):
+    """Updates the MetadataSummary of the visit of a saved
+    metadata model instance, see MetadataSummaryUpdater.
+    """
+    if raw:
+        metadata_summary.update(metadata_obj=instance)
+    else:
+        metadata_summary.update(metadata_obj=instance, created=created)
+    if hasattr(instance, 'loaded_entry_status'):
+        instance.loaded_entry_status = instance.entry_status
+
+
+@receiver(post_delete, weak=False, dispatch_uid="metadata_summary_on_post_delete")
+def metadata_summary_on_post_delete(sender, instance, **kwargs):
+    """Updates the MetadataSummary of the visit of a deleted
+    metadata model instance.
+    """
+    metadata_summary.update(metadata_obj=instance, deleted=True)
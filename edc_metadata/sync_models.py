@@ -7,7 +7,10 @@ from edc_sync.sync_model import SyncModel
 sync_models = []
 app_config = django_apps.get_app_config('edc_metadata')
 for model in app_config.get_models():
-    if not issubclass(model, ListModelMixin):
+    if (not issubclass(model, ListModelMixin)
+            and model._meta.label_lower not in [
+                'edc_metadata.metadatarulequeue',
+                'edc_metadata.metadatasummary']):
         sync_models.append(model._meta.label_lower)
 
 site_sync_models.register(sync_models, SyncModel)
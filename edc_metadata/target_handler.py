@@ -1,8 +1,7 @@
-from django.apps import apps as django_apps
-from edc_reference import site_reference_configs
-
 from .constants import CRF
+from .form_plans import site_form_plans
 from .metadata_handler import MetadataHandler
+from .model_resolvers import site_model_resolvers
 
 
 class TargetModelNotScheduledForVisit(Exception):
@@ -34,11 +33,14 @@ class TargetHandler:
     metadata_category = CRF
 
     def __init__(self, model=None, visit=None, **kwargs):
-
+        self._metadata_handler = None
+        self._metadata_obj = None
+        self._object = None
+        self._object_fetched = False
         self.model = model
         self.visit = visit  # visit model instance
-        self.metadata_model = django_apps.get_app_config(
-            'edc_metadata').get_metadata_model(self.metadata_category)
+        self.metadata_model = site_model_resolvers.get_metadata_model(
+            self.metadata_category)
 
         if self.model == self.visit._meta.label_lower:
             raise TargetModelConflict(
@@ -46,52 +48,68 @@ class TargetHandler:
                 f'Got {self.model}=={self.visit._meta.label_lower}')
 
         try:
-            django_apps.get_model(self.model)
+            site_model_resolvers.get_model(self.model)
         except LookupError as e:
             raise TargetModelLookupError(
                 f'{self.metadata_category} target model name is invalid. Got {e}')
 
         self.raise_on_not_scheduled_for_visit()
 
-        self.metadata_obj = self.metadata_handler.metadata_obj
-
     def __repr__(self):
         return (f'<{self.__class__.__name__}({self.model}, {self.visit}), '
                 f'{self.metadata_model._meta.label_lower}>')
 
     @property
     def reference_model_cls(self):
-        reference_model = site_reference_configs.get_reference_model(
-            name=self.model)
-        return django_apps.get_model(reference_model)
+        return site_model_resolvers.get_reference_model_cls(name=self.model)
 
     @property
     def object(self):
-        """Returns a reference model instance for the "target".
+        """Returns a reference model instance for the "target",
+        fetched once.
 
         Recall the CRF/Requisition is not queried directly but rather
         represented by a model instance from edc_reference.
         """
+        if not self._object_fetched:
+            self._object = self.get_object()
+            self._object_fetched = True
+        return self._object
+
+    def get_object(self):
         return self.reference_model_cls.objects.filter_crf_for_visit(
-            name=self.model, visit=self.visit)
+            name=self.model, visit=self.visit).first()
+
+    @property
+    def metadata_obj(self):
+        """Returns the metadata model instance, fetched or
+        created once.
+        """
+        if not self._metadata_obj:
+            self._metadata_obj = self.metadata_handler.metadata_obj
+        return self._metadata_obj
 
     @property
     def metadata_handler(self):
+        if not self._metadata_handler:
+            self._metadata_handler = self.get_metadata_handler()
+        return self._metadata_handler
+
+    def get_metadata_handler(self):
         return self.metadata_handler_cls(
             metadata_model=self.metadata_model,
             model=self.model,
             visit=self.visit)
 
+    @property
+    def form_plan(self):
+        return site_form_plans.get_plan_for_visit(self.visit)
+
     @property
     def models(self):
-        """Returns a list of models for this visit.
+        """Returns a frozenset of models for this visit.
         """
-        if self.visit.visit_code_sequence != 0:
-            forms = (self.visit.visit.unscheduled_forms
-                     + self.visit.visit.prn_forms)
-        else:
-            forms = self.visit.visit.forms + self.visit.visit.prn_forms
-        return list(set([form.model for form in forms]))
+        return self.form_plan.models
 
     def raise_on_not_scheduled_for_visit(self):
         """Raises an exception if model is not scheduled
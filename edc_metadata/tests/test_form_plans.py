@@ -0,0 +1,87 @@
+from django.test import TestCase, tag
+from edc_visit_schedule.site_visit_schedules import site_visit_schedules
+
+from ..constants import REQUIRED
+from ..form_plans import site_form_plans, FormPlanError
+from .visit_schedule import visit_schedule
+
+
+class TestFormPlans(TestCase):
+
+    def setUp(self):
+        site_visit_schedules._registry = {}
+        site_visit_schedules.loaded = False
+        site_visit_schedules.register(visit_schedule)
+        site_form_plans.compile()
+        self.schedule = visit_schedule.schedules.get('schedule')
+
+    def test_compiles_scheduled_and_unscheduled(self):
+        self.assertEqual(
+            len(site_form_plans.registry), len(self.schedule.visits) * 2)
+
+    def test_scheduled_plan(self):
+        visit = self.schedule.visits.get('1000')
+        form_plan = site_form_plans.get_plan(
+            visit_schedule_name='visit_schedule', schedule_name='schedule',
+            visit_code='1000', unscheduled=False)
+        self.assertEqual(form_plan.visit, visit)
+        self.assertEqual(form_plan.crfs, tuple(visit.crfs))
+        self.assertEqual(form_plan.requisitions, tuple(visit.requisitions))
+        self.assertIn('edc_metadata.crfone', form_plan.models)
+        self.assertIn('edc_metadata.subjectrequisition', form_plan.models)
+        self.assertEqual(
+            form_plan.panel_names,
+            frozenset([r.panel.name for r in visit.requisitions]))
+        self.assertEqual(
+            form_plan.entry_statuses[('edc_metadata.crfone', None)], REQUIRED)
+        self.assertEqual(
+            form_plan.show_orders[('edc_metadata.subjectrequisition', 'two')], 20)
+
+    def test_unscheduled_plan(self):
+        visit = self.schedule.visits.get('1000')
+        form_plan = site_form_plans.get_plan(
+            visit_schedule_name='visit_schedule', schedule_name='schedule',
+            visit_code='1000', unscheduled=True)
+        self.assertEqual(form_plan.crfs, tuple(visit.crfs_unscheduled))
+        self.assertNotIn('edc_metadata.crfone', form_plan.models)
+        self.assertNotIn('two', form_plan.panel_names)
+
+    def test_plan_is_immutable(self):
+        form_plan = site_form_plans.get_plan(
+            visit_schedule_name='visit_schedule', schedule_name='schedule',
+            visit_code='1000')
+        self.assertRaises(TypeError, form_plan.entry_statuses.update, {})
+        self.assertRaises(AttributeError, form_plan.models.add, 'blah')
+
+    def test_compiles_on_demand(self):
+        site_form_plans.reset()
+        form_plan = site_form_plans.get_plan(
+            visit_schedule_name='visit_schedule', schedule_name='schedule',
+            visit_code='2000')
+        self.assertIs(form_plan, site_form_plans.get_plan(
+            visit_schedule_name='visit_schedule', schedule_name='schedule',
+            visit_code='2000'))
+
+    def test_invalid_visit_raises(self):
+        self.assertRaises(
+            FormPlanError,
+            site_form_plans.get_plan,
+            visit_schedule_name='visit_schedule', schedule_name='schedule',
+            visit_code='9999')
+
+    def test_schedule_plan(self):
+        schedule_plan = site_form_plans.get_schedule_plan(
+            visit_schedule_name='visit_schedule', schedule_name='schedule')
+        panel_names = set()
+        for visit in self.schedule.visits.values():
+            panel_names.update([r.panel.name for r in visit.all_requisitions])
+        self.assertEqual(schedule_plan.panel_names, frozenset(panel_names))
+        self.assertIn(('edc_metadata.crfone', None), schedule_plan.keys)
+        self.assertIn('edc_metadata.subjectrequisition', schedule_plan.models)
+        self.assertIs(schedule_plan.schedule, self.schedule)
+
+    def test_invalid_schedule_raises(self):
+        self.assertRaises(
+            FormPlanError,
+            site_form_plans.get_schedule_plan,
+            visit_schedule_name='visit_schedule', schedule_name='blah')
@@ -0,0 +1,124 @@
+from django.db import transaction
+from django.test import TestCase, tag
+from edc_appointment.models import Appointment
+from edc_base import get_utcnow
+from edc_reference import site_reference_configs
+from edc_visit_schedule import site_visit_schedules
+from edc_visit_tracking.constants import SCHEDULED
+
+from ..constants import KEYED, NOT_REQUIRED, REQUIRED
+from ..identity_map import metadata_identity_map
+from ..metadata import CrfMetadataGetter
+from ..metadata_updater import MetadataUpdater
+from ..models import CrfMetadata
+from .models import SubjectVisit, SubjectConsent, CrfOne
+from .reference_configs import register_to_site_reference_configs
+from .visit_schedule import visit_schedule
+from edc_facility.import_holidays import import_holidays
+
+
+class TestIdentityMap(TestCase):
+
+    def setUp(self):
+        import_holidays()
+        register_to_site_reference_configs()
+        site_visit_schedules._registry = {}
+        site_visit_schedules.loaded = False
+        site_visit_schedules.register(visit_schedule)
+        site_reference_configs.register_from_visit_schedule(
+            visit_models={
+                'edc_appointment.appointment': 'edc_metadata.subjectvisit'})
+        self.subject_identifier = '1111111'
+        subject_consent = SubjectConsent.objects.create(
+            subject_identifier=self.subject_identifier,
+            consent_datetime=get_utcnow())
+        _, self.schedule = site_visit_schedules.get_by_onschedule_model(
+            'edc_metadata.onschedule')
+        self.schedule.put_on_schedule(
+            subject_identifier=self.subject_identifier,
+            onschedule_datetime=subject_consent.consent_datetime)
+        self.appointment = Appointment.objects.get(
+            subject_identifier=self.subject_identifier,
+            visit_code=self.schedule.visits.first.code)
+        self.subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        self.options = self.subject_visit.metadata_query_options
+        self.options.update(
+            subject_identifier=self.subject_identifier,
+            model='edc_metadata.crfone')
+
+    def test_inactive_reads_database(self):
+        obj = metadata_identity_map.get(CrfMetadata, **self.options)
+        self.assertIsNot(
+            obj, metadata_identity_map.get(CrfMetadata, **self.options))
+
+    def test_loads_row_once(self):
+        with metadata_identity_map:
+            obj = metadata_identity_map.get(CrfMetadata, **self.options)
+            with self.assertNumQueries(0):
+                self.assertIs(
+                    obj, metadata_identity_map.get(CrfMetadata, **self.options))
+        self.assertEqual(metadata_identity_map.rows, {})
+
+    def test_save_replaces_cached_copy(self):
+        with metadata_identity_map:
+            metadata_identity_map.get(CrfMetadata, **self.options)
+            CrfOne.objects.create(subject_visit=self.subject_visit)
+            with self.assertNumQueries(0):
+                obj = metadata_identity_map.get(CrfMetadata, **self.options)
+            self.assertEqual(obj.entry_status, KEYED)
+
+    def test_next_object_loads_visit_once(self):
+        with metadata_identity_map:
+            getter = CrfMetadataGetter(appointment=self.appointment)
+            obj = getter.next_object(show_order=0, entry_status=REQUIRED)
+            with self.assertNumQueries(0):
+                self.assertIs(
+                    obj, getter.next_object(show_order=0, entry_status=REQUIRED))
+                self.assertIs(
+                    obj, metadata_identity_map.get(CrfMetadata, **self.options))
+
+    def test_bulk_update_invalidates_visit(self):
+        with metadata_identity_map:
+            metadata_identity_map.get(CrfMetadata, **self.options)
+            MetadataUpdater.bulk_update(
+                visit=self.subject_visit,
+                entry_statuses={('edc_metadata.crfone', None): NOT_REQUIRED})
+            self.assertEqual(metadata_identity_map.get(
+                CrfMetadata, **self.options).entry_status, NOT_REQUIRED)
+
+    def test_missing_row_in_loaded_visit(self):
+        with metadata_identity_map:
+            CrfMetadataGetter(appointment=self.appointment).next_object(
+                show_order=0)
+            self.options.update(model='edc_metadata.blah')
+            with self.assertNumQueries(0):
+                self.assertRaises(
+                    CrfMetadata.DoesNotExist,
+                    metadata_identity_map.get, CrfMetadata, **self.options)
+
+    def test_partial_key_reads_database(self):
+        with metadata_identity_map:
+            CrfMetadataGetter(appointment=self.appointment).next_object(
+                show_order=0)
+            self.options.pop('visit_code_sequence')
+            self.assertEqual(metadata_identity_map.get(
+                CrfMetadata, **self.options).model, 'edc_metadata.crfone')
+
+    def test_visit_key_includes_schedule(self):
+        options = dict(self.options, schedule_name='blah')
+        self.assertNotEqual(
+            metadata_identity_map.get_visit_key(CrfMetadata, self.options),
+            metadata_identity_map.get_visit_key(CrfMetadata, options))
+
+    def test_rollback_discards_cached_rows(self):
+        with metadata_identity_map:
+            metadata_identity_map.get(CrfMetadata, **self.options)
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    CrfOne.objects.create(subject_visit=self.subject_visit)
+                    self.assertEqual(metadata_identity_map.get(
+                        CrfMetadata, **self.options).entry_status, KEYED)
+                    raise ValueError()
+            self.assertEqual(metadata_identity_map.get(
+                CrfMetadata, **self.options).entry_status, REQUIRED)
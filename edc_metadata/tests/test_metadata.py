@@ -1,15 +1,32 @@
+import json
+import os
+import tempfile
+
+from django.apps import apps as django_apps
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models.signals import post_save
 from django.test import TestCase, tag
+from django.test.utils import CaptureQueriesContext
 from edc_appointment.models import Appointment
 from edc_base import get_utcnow
 from edc_metadata.metadata_updater import MetadataUpdater
 from edc_reference import site_reference_configs
 from edc_visit_schedule import site_visit_schedules
 from edc_visit_tracking.constants import SCHEDULED, UNSCHEDULED, MISSED_VISIT
+from uuid import uuid4
 
-from ..constants import KEYED, REQUIRED
-from ..metadata import CreatesMetadataError
+from ..constants import KEYED, NOT_REQUIRED, REQUIRED
+from ..metadata import CreatesMetadataError, Creator, KeyedResolver, Upserter
+from ..bulk_resetter import metadata_bulk_resetter
+from ..management.commands.create_metadata import create_metadata_for_chunk
 from ..metadata import DeleteMetadataError
-from ..models import CrfMetadata, RequisitionMetadata
+from ..metadata_coalescer import metadata_coalescer
+from ..model_mixins.metadata_models.model_mixin import MetadataVersionConflict
+from ..models import CrfMetadata, RequisitionMetadata, MetadataRuleQueue
+from ..next_form_getter import NextFormGetter
+from ..rule_groups import MetadataRuleEvaluator
+from ..rule_queue import rule_queue
 from .models import SubjectVisit, SubjectConsent, CrfOne, CrfTwo, CrfThree, SubjectRequisition
 from .reference_configs import register_to_site_reference_configs
 from .visit_schedule import visit_schedule
@@ -114,6 +131,253 @@ class TestCreatesDeletesMetadata(TestCase):
             DeleteMetadataError,
             obj.delete)
 
+    def test_bulk_creates_same_metadata(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        crfs = list(CrfMetadata.objects.values_list(
+            'model', 'entry_status', 'show_order').order_by('show_order'))
+        requisitions = list(RequisitionMetadata.objects.values_list(
+            'panel_name', 'entry_status', 'show_order').order_by('show_order'))
+        CrfMetadata.objects.all().delete()
+        RequisitionMetadata.objects.all().delete()
+        Creator(visit=subject_visit, update_keyed=True, bulk=True).create()
+        self.assertEqual(
+            list(CrfMetadata.objects.values_list(
+                'model', 'entry_status', 'show_order').order_by('show_order')),
+            crfs)
+        self.assertEqual(
+            list(RequisitionMetadata.objects.values_list(
+                'panel_name', 'entry_status', 'show_order').order_by('show_order')),
+            requisitions)
+
+    def test_bulk_create_is_idempotent(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        crf_count = CrfMetadata.objects.all().count()
+        requisition_count = RequisitionMetadata.objects.all().count()
+        Creator(visit=subject_visit, update_keyed=True, bulk=True).create()
+        self.assertEqual(CrfMetadata.objects.all().count(), crf_count)
+        self.assertEqual(
+            RequisitionMetadata.objects.all().count(), requisition_count)
+
+    def test_bulk_create_updates_keyed(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        CrfOne.objects.create(subject_visit=subject_visit)
+        CrfMetadata.objects.all().delete()
+        Creator(visit=subject_visit, update_keyed=True, bulk=True).create()
+        self.assertEqual(CrfMetadata.objects.get(
+            model='edc_metadata.crfone').entry_status, KEYED)
+        self.assertEqual(CrfMetadata.objects.get(
+            model='edc_metadata.crftwo').entry_status, REQUIRED)
+
+    def test_keyed_resolver_one_query_per_reference_model(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        CrfOne.objects.create(subject_visit=subject_visit)
+        keyed_resolver = KeyedResolver(
+            visit=subject_visit,
+            crfs=subject_visit.visit.crfs,
+            requisitions=subject_visit.visit.requisitions)
+        with self.assertNumQueries(1):
+            keyed_resolver.keyed
+        crf_one, crf_two = subject_visit.visit.crfs[0:2]
+        self.assertTrue(keyed_resolver.is_crf_keyed(crf_one))
+        self.assertFalse(keyed_resolver.is_crf_keyed(crf_two))
+        self.assertFalse(keyed_resolver.is_requisition_keyed(
+            subject_visit.visit.requisitions[0]))
+
+    def test_creates_keyed_requisition_metadata(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        panel_one = Panel.objects.create(name='one')
+        SubjectRequisition.objects.create(
+            subject_visit=subject_visit, panel=panel_one)
+        requisition = [r for r in subject_visit.visit.requisitions
+                       if r.panel.name == 'one'][0]
+        self.assertTrue(KeyedResolver(
+            visit=subject_visit,
+            requisitions=subject_visit.visit.requisitions).is_requisition_keyed(
+                requisition))
+        RequisitionMetadata.objects.filter(panel_name='one').delete()
+        Creator(visit=subject_visit, update_keyed=True).create()
+        self.assertEqual(RequisitionMetadata.objects.get(
+            panel_name='one').entry_status, KEYED)
+        self.assertEqual(RequisitionMetadata.objects.get(
+            panel_name='two').entry_status, REQUIRED)
+
+    def test_upserter_tolerates_existing_rows(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        options = subject_visit.metadata_query_options
+        options.update(
+            subject_identifier=subject_visit.subject_identifier,
+            model='edc_metadata.crfone')
+        metadata_obj = CrfMetadata.objects.get(**options)
+        upserter = Upserter(model_cls=CrfMetadata)
+        upserter.insert(objs=[CrfMetadata(show_order=1, **options)])
+        self.assertEqual(CrfMetadata.objects.filter(**options).count(), 1)
+        obj, created = upserter.get_or_create(
+            defaults=dict(show_order=1), **options)
+        self.assertFalse(created)
+        self.assertEqual(obj.pk, metadata_obj.pk)
+
+    def test_upserter_creates_missing_row(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        options = subject_visit.metadata_query_options
+        options.update(
+            subject_identifier=subject_visit.subject_identifier,
+            model='edc_metadata.crfone')
+        CrfMetadata.objects.filter(**options).delete()
+        saved = []
+
+        def on_post_save(sender, instance, created, **kwargs):
+            saved.append((instance.pk, created))
+
+        post_save.connect(on_post_save, sender=CrfMetadata)
+        try:
+            with CaptureQueriesContext(connection) as context:
+                obj, created = Upserter(model_cls=CrfMetadata).get_or_create(
+                    defaults=dict(show_order=1, entry_status=REQUIRED), **options)
+        finally:
+            post_save.disconnect(on_post_save, sender=CrfMetadata)
+        self.assertTrue(created)
+        self.assertEqual(saved, [(obj.pk, True)])
+        self.assertFalse([
+            query for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'edc_metadata_crfmetadata' in query['sql']])
+        self.assertEqual(CrfMetadata.objects.get(**options).pk, obj.pk)
+
+    def test_create_metadata_command(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        crf_count = CrfMetadata.objects.all().count()
+        requisition_count = RequisitionMetadata.objects.all().count()
+        CrfMetadata.objects.all().delete()
+        RequisitionMetadata.objects.all().delete()
+        call_command(
+            'create_metadata', models=subject_visit._meta.label_lower,
+            processes=1)
+        self.assertEqual(CrfMetadata.objects.all().count(), crf_count)
+        self.assertEqual(
+            RequisitionMetadata.objects.all().count(), requisition_count)
+
+    def test_create_metadata_for_chunk_records_errors(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        SubjectVisit.objects.filter(pk=subject_visit.pk).update(visit_code='9999')
+        _, _, _, count, errors, failed = create_metadata_for_chunk(
+            subject_visit._meta.label_lower, [subject_visit.pk])
+        self.assertEqual(count, 1)
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith(str(subject_visit.pk)))
+        self.assertEqual(failed, [subject_visit.pk])
+
+    def test_create_metadata_checkpoints_completed_chunks(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        label_lower = subject_visit._meta.label_lower
+        with tempfile.TemporaryDirectory() as path:
+            checkpoint = os.path.join(path, 'checkpoint.json')
+            SubjectVisit.objects.filter(pk=subject_visit.pk).update(
+                visit_code='9999')
+            call_command(
+                'create_metadata', models=label_lower, processes=1,
+                checkpoint=checkpoint)
+            with open(checkpoint) as f:
+                self.assertEqual(json.load(f), dict(
+                    completed={}, failed={label_lower: [str(subject_visit.pk)]}))
+            SubjectVisit.objects.filter(pk=subject_visit.pk).update(
+                visit_code=self.appointment.visit_code)
+            call_command(
+                'create_metadata', models=label_lower, processes=1,
+                checkpoint=checkpoint)
+            with open(checkpoint) as f:
+                self.assertEqual(json.load(f), dict(
+                    completed={label_lower: [
+                        [str(subject_visit.pk), str(subject_visit.pk)]]},
+                    failed={label_lower: []}))
+
+    def test_create_unchanged_visit_does_not_write(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        creator = Creator(visit=subject_visit, update_keyed=True)
+        diff = creator.diff()
+        self.assertFalse(diff)
+        reference_models = KeyedResolver(
+            visit=subject_visit, crfs=diff.unkeyed_crfs,
+            requisitions=diff.unkeyed_requisitions).reference_models
+        # one read of the metadata, one per reference model
+        with self.assertNumQueries(1 + len(reference_models)):
+            creator.create()
+        with self.assertNumQueries(1):
+            Creator(visit=subject_visit).create()
+
+    def test_create_updates_unkeyed_metadata_of_keyed_forms(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        CrfOne.objects.create(subject_visit=subject_visit)
+        # as if CrfOne was saved with raw=True
+        CrfMetadata.objects.filter(model='edc_metadata.crfone').update(
+            entry_status=REQUIRED)
+        subject_visit = SubjectVisit.objects.get(pk=subject_visit.pk)
+        subject_visit.metadata_force_refresh = True
+        subject_visit.save()
+        self.assertEqual(CrfMetadata.objects.get(
+            model='edc_metadata.crfone').entry_status, KEYED)
+        self.assertEqual(CrfMetadata.objects.get(
+            model='edc_metadata.crftwo').entry_status, REQUIRED)
+
+    def test_create_applies_diff(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        CrfOne.objects.create(subject_visit=subject_visit)
+        CrfMetadata.objects.filter(model='edc_metadata.crfone').delete()
+        options = subject_visit.metadata_query_options
+        options.update(subject_identifier=subject_visit.subject_identifier)
+        CrfMetadata.objects.create(
+            model='edc_metadata.crfstale', show_order=999, **options)
+        CrfMetadata.objects.create(
+            model='edc_metadata.crfkeyed', show_order=998,
+            entry_status=KEYED, **options)
+        creator = Creator(visit=subject_visit, update_keyed=True)
+        diff = creator.diff()
+        self.assertEqual([crf.model for crf in diff.crfs], ['edc_metadata.crfone'])
+        self.assertEqual(diff.requisitions, ())
+        self.assertEqual(diff.stale, (('edc_metadata.crfstale', None), ))
+        creator.apply(diff)
+        self.assertEqual(CrfMetadata.objects.get(
+            model='edc_metadata.crfone').entry_status, KEYED)
+        self.assertFalse(CrfMetadata.objects.filter(
+            model='edc_metadata.crfstale').exists())
+        self.assertTrue(CrfMetadata.objects.filter(
+            model='edc_metadata.crfkeyed').exists())
+
+    def test_unchanged_visit_save_skips_metadata(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        self.assertFalse(subject_visit.metadata_refresh_required)
+        CrfMetadata.objects.all().delete()
+        subject_visit = SubjectVisit.objects.get(pk=subject_visit.pk)
+        subject_visit.save()
+        self.assertEqual(CrfMetadata.objects.all().count(), 0)
+        subject_visit.metadata_force_refresh = True
+        subject_visit.save()
+        self.assertGreater(CrfMetadata.objects.all().count(), 0)
+        self.assertFalse(subject_visit.metadata_force_refresh)
+
+    def test_changed_reason_refreshes_metadata(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        subject_visit = SubjectVisit.objects.get(pk=subject_visit.pk)
+        subject_visit.reason = MISSED_VISIT
+        self.assertTrue(subject_visit.metadata_refresh_required)
+        subject_visit.save()
+        self.assertEqual(CrfMetadata.objects.all().count(), 0)
+        self.assertFalse(subject_visit.metadata_refresh_required)
+
 
 class TestUpdatesMetadata(TestCase):
 
@@ -160,6 +424,142 @@ class TestUpdatesMetadata(TestCase):
             model='edc_metadata.crfthree',
             visit_code=subject_visit.visit_code).count(), 1)
 
+    def test_versioned_save_detects_concurrent_update(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        options = dict(
+            subject_identifier=subject_visit.subject_identifier,
+            visit_code=subject_visit.visit_code,
+            model='edc_metadata.crftwo')
+        obj = CrfMetadata.objects.get(**options)
+        stale_obj = CrfMetadata.objects.get(**options)
+        version = obj.version
+        obj = obj.versioned_save(entry_status=KEYED)
+        self.assertEqual(obj.version, version + 1)
+        self.assertRaises(
+            MetadataVersionConflict,
+            stale_obj.versioned_save, retries=0, entry_status=NOT_REQUIRED)
+        obj = stale_obj.versioned_save(entry_status=NOT_REQUIRED)
+        self.assertEqual(obj.entry_status, KEYED)
+        obj = CrfMetadata.objects.get(**options)
+        self.assertEqual(obj.entry_status, KEYED)
+        self.assertEqual(obj.version, version + 1)
+
+    def test_run_metadata_rules_uses_evaluator_cls(self):
+        evaluated = []
+
+        class MyMetadataRuleEvaluator(MetadataRuleEvaluator):
+            def evaluate_rules(self):
+                evaluated.append(self.source_model)
+
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        subject_visit.metadata_rule_evaluator_cls = MyMetadataRuleEvaluator
+        subject_visit.run_metadata_rules(
+            source_model='edc_metadata.crfone', defer=False)
+        subject_visit.run_metadata_rules(defer=False)
+        self.assertEqual(evaluated, ['edc_metadata.crfone', None])
+
+    def test_save_increments_version(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        obj = CrfMetadata.objects.get(
+            visit_code=subject_visit.visit_code, model='edc_metadata.crftwo')
+        version = obj.version
+        obj.save()
+        obj.entry_comment = 'blah'
+        obj.save(update_fields=['entry_comment'])
+        self.assertEqual(
+            CrfMetadata.objects.get(pk=obj.pk).version, version + 2)
+
+    def test_versioned_save_redecides_on_conflict(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        options = dict(
+            subject_identifier=subject_visit.subject_identifier,
+            visit_code=subject_visit.visit_code,
+            model='edc_metadata.crftwo')
+        stale_obj = CrfMetadata.objects.get(**options)
+        version = stale_obj.version
+        CrfMetadata.objects.get(**options).versioned_save(entry_status=KEYED)
+        obj = stale_obj.versioned_save(
+            entry_status=NOT_REQUIRED,
+            decide=lambda obj: dict(entry_status=REQUIRED))
+        self.assertEqual(obj.entry_status, REQUIRED)
+        self.assertEqual(obj.version, version + 2)
+
+    def test_coalesces_updates_on_commit(self):
+        app_config = django_apps.get_app_config('edc_metadata')
+        app_config.coalesce_on_commit = True
+        try:
+            subject_visit = SubjectVisit.objects.create(
+                appointment=self.appointment, reason=SCHEDULED)
+            with transaction.atomic():
+                CrfOne.objects.create(subject_visit=subject_visit)
+                CrfTwo.objects.create(subject_visit=subject_visit)
+            self.assertEqual(len(metadata_coalescer.pending['default']), 1)
+            self.assertTrue(metadata_coalescer.is_pending(using='default'))
+            self.assertEqual(CrfMetadata.objects.filter(entry_status=KEYED).count(), 0)
+            metadata_coalescer.process(using='default')
+            self.assertEqual(metadata_coalescer.pending, {})
+        finally:
+            app_config.coalesce_on_commit = False
+        self.assertEqual(CrfMetadata.objects.filter(
+            entry_status=KEYED,
+            model__in=['edc_metadata.crfone', 'edc_metadata.crftwo']).count(), 2)
+
+    def test_coalescer_skips_visits_that_do_not_exist(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        rolled_back_visit = SubjectVisit(pk=uuid4())
+        self.assertEqual(
+            metadata_coalescer.get_existing(
+                [(subject_visit, {}), (rolled_back_visit, {})], using='default'),
+            [(subject_visit, {})])
+
+    def test_defers_rules_to_queue(self):
+        app_config = django_apps.get_app_config('edc_metadata')
+        app_config.defer_metadata_rules = True
+        try:
+            subject_visit = SubjectVisit.objects.create(
+                appointment=self.appointment, reason=SCHEDULED)
+            CrfOne.objects.create(subject_visit=subject_visit)
+            CrfTwo.objects.create(subject_visit=subject_visit)
+            self.assertTrue(rule_queue.is_pending(visit=subject_visit))
+            self.assertEqual(CrfMetadata.objects.get(
+                model='edc_metadata.crfone').entry_status, KEYED)
+            self.assertEqual(rule_queue.process(batch_size=10), 1)
+            self.assertFalse(rule_queue.is_pending(visit=subject_visit))
+            CrfThree.objects.create(subject_visit=subject_visit)
+            NextFormGetter().next_form(
+                appointment=self.appointment, model='edc_metadata.crfone')
+            self.assertTrue(rule_queue.is_pending(visit=subject_visit))
+            next_form_getter = NextFormGetter()
+            next_form_getter.rule_queue_timeout = 0
+            next_form_getter.next_form(
+                appointment=self.appointment, model='edc_metadata.crfone')
+            self.assertFalse(rule_queue.is_pending(visit=subject_visit))
+        finally:
+            app_config.defer_metadata_rules = False
+
+    def test_keeps_item_enqueued_while_processing(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        rule_queue.enqueue(visit=subject_visit, trigger='edc_metadata.crfone')
+        rule_queue.enqueue(visit=subject_visit, trigger='edc_metadata.crftwo')
+        item = MetadataRuleQueue.objects.order_by('pk').first()
+
+        def run_metadata_rules(**kwargs):
+            rule_queue.enqueue(visit=subject_visit, trigger='edc_metadata.crfthree')
+
+        subject_visit.run_metadata_rules = run_metadata_rules
+        self.assertTrue(rule_queue.process_item(item, visit=subject_visit))
+        self.assertEqual(
+            list(MetadataRuleQueue.objects.values_list('trigger', flat=True)),
+            ['edc_metadata.crfthree'])
+        self.assertEqual(rule_queue.process(batch_size=10), 1)
+        self.assertFalse(rule_queue.is_pending(visit=subject_visit))
+
     def test_updates_all_crf_metadata_as_keyed(self):
         subject_visit = SubjectVisit.objects.create(
             appointment=self.appointment, reason=SCHEDULED)
@@ -189,6 +589,68 @@ class TestUpdatesMetadata(TestCase):
             panel_name=self.panel_two.name,
             visit_code=subject_visit.visit_code).count(), 1)
 
+    def test_crf_update_query_budget(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        crf_one = CrfOne.objects.create(subject_visit=subject_visit)
+        CrfMetadata.objects.filter(
+            model='edc_metadata.crfone').update(entry_status=REQUIRED)
+        with CaptureQueriesContext(connection) as context:
+            crf_one.metadata_update()
+        self.assertLessEqual(len(context.captured_queries), 3)
+        self.assertEqual(CrfMetadata.objects.get(
+            model='edc_metadata.crfone').entry_status, KEYED)
+
+    def test_requisition_update_query_budget(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        requisition = SubjectRequisition.objects.create(
+            subject_visit=subject_visit, panel=self.panel_one)
+        RequisitionMetadata.objects.filter(
+            panel_name=self.panel_one.name).update(entry_status=REQUIRED)
+        with CaptureQueriesContext(connection) as context:
+            requisition.metadata_update()
+        self.assertLessEqual(len(context.captured_queries), 3)
+        self.assertEqual(RequisitionMetadata.objects.get(
+            panel_name=self.panel_one.name).entry_status, KEYED)
+
+    def test_bulk_resets_crf_metadata_on_delete(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        CrfOne.objects.create(subject_visit=subject_visit)
+        CrfTwo.objects.create(subject_visit=subject_visit)
+        self.assertEqual(CrfMetadata.objects.filter(entry_status=KEYED).count(), 2)
+        saved = []
+
+        def on_post_save(sender, instance, **kwargs):
+            saved.append((instance.model, instance.entry_status))
+
+        post_save.connect(on_post_save, sender=CrfMetadata)
+        try:
+            with metadata_bulk_resetter:
+                CrfOne.objects.all().delete()
+                CrfTwo.objects.all().delete()
+                self.assertEqual(
+                    CrfMetadata.objects.filter(entry_status=KEYED).count(), 2)
+        finally:
+            post_save.disconnect(on_post_save, sender=CrfMetadata)
+        self.assertEqual(
+            sorted(saved), [('edc_metadata.crfone', REQUIRED),
+                            ('edc_metadata.crftwo', REQUIRED)])
+        self.assertEqual(CrfMetadata.objects.filter(entry_status=KEYED).count(), 0)
+        self.assertEqual(CrfMetadata.objects.filter(
+            model__in=['edc_metadata.crfone', 'edc_metadata.crftwo'],
+            entry_status=REQUIRED).count(), 2)
+
+    def test_bulk_resets_requisition_metadata_on_queryset_delete(self):
+        subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        SubjectRequisition.objects.create(
+            subject_visit=subject_visit, panel=self.panel_one)
+        metadata_bulk_resetter.delete(SubjectRequisition.objects.all())
+        self.assertEqual(RequisitionMetadata.objects.get(
+            panel_name=self.panel_one.name).entry_status, REQUIRED)
+
     def test_resets_crf_metadata_on_delete(self):
         subject_visit = SubjectVisit.objects.create(
             appointment=self.appointment, reason=SCHEDULED)
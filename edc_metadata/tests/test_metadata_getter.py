@@ -7,7 +7,8 @@ from edc_visit_schedule.site_visit_schedules import site_visit_schedules
 from edc_visit_tracking.constants import SCHEDULED
 
 from ..constants import REQUIRED
-from ..metadata import CrfMetadataGetter
+from ..identity_map import metadata_identity_map
+from ..metadata import CrfMetadataGetter, RequisitionMetadataGetter
 from ..models import CrfMetadata, RequisitionMetadata
 from ..next_form_getter import NextFormGetter
 from .models import SubjectVisit, SubjectConsent, CrfOne, CrfTwo
@@ -85,6 +86,69 @@ class TestMetadataGetter(TestCase):
                 self.assertGreater(obj.show_order, crf.show_order)
         self.assertEqual(len(objects), len(visit.crfs) - 1)
 
+    def test_next_object_fetches_once(self):
+        getter = CrfMetadataGetter(appointment=self.appointment)
+        visit = self.schedule.visits.get(getter.visit_code)
+        with self.assertNumQueries(1):
+            objects = [
+                getter.next_object(crf.show_order, entry_status=REQUIRED)
+                for crf in visit.crfs]
+        self.assertEqual(objects, [
+            getter.metadata_objects.filter(
+                show_order__gt=crf.show_order, entry_status=REQUIRED).first()
+            for crf in visit.crfs])
+
+    def test_projection(self):
+        getter = CrfMetadataGetter(appointment=self.appointment, projection=True)
+        records = getter.sorted_objects
+        self.assertEqual(
+            [(r.pk, r.model, r.show_order, r.entry_status, r.panel_name)
+             for r in records],
+            [(obj.pk, obj.model, obj.show_order, obj.entry_status, None)
+             for obj in getter.metadata_objects])
+        self.assertFalse(hasattr(records[0], '__dict__'))
+        self.assertEqual(
+            getter.next_object(0, entry_status=REQUIRED).model,
+            CrfMetadataGetter(appointment=self.appointment).next_object(
+                0, entry_status=REQUIRED).model)
+
+    def test_projection_records_are_hashable(self):
+        records = CrfMetadataGetter(
+            appointment=self.appointment, projection=True).sorted_objects
+        self.assertEqual(len(set(records)), len(records))
+        self.assertEqual(
+            set(records),
+            set(CrfMetadataGetter.get_records(
+                CrfMetadata.objects.filter(
+                    subject_identifier=self.subject_identifier,
+                    visit_code=self.appointment.visit_code))))
+
+    def test_projection_reads_identity_map(self):
+        with metadata_identity_map:
+            objects = CrfMetadataGetter(appointment=self.appointment).sorted_objects
+            with self.assertNumQueries(0):
+                self.assertEqual(
+                    CrfMetadataGetter(
+                        appointment=self.appointment,
+                        projection=True).sorted_objects,
+                    [CrfMetadataGetter.get_record(obj) for obj in objects])
+
+    def test_projection_requisitions(self):
+        getter = RequisitionMetadataGetter(
+            appointment=self.appointment, projection=True)
+        self.assertEqual(
+            [r.panel_name for r in getter.sorted_objects],
+            list(getter.metadata_objects.values_list('panel_name', flat=True)))
+
+    def test_next_required_form_after_last_crf(self):
+        getter = NextFormGetter()
+        last_crf = self.schedule.visits.get(
+            self.appointment.visit_code).crfs[-1]
+        next_form = getter.next_form(
+            appointment=self.appointment,
+            model=last_crf.model)
+        self.assertEqual(next_form.model, 'edc_metadata.subjectrequisition')
+
     def test_next_required_form(self):
         getter = NextFormGetter()
         next_form = getter.next_form(
@@ -0,0 +1,82 @@
+import csv
+import json
+
+from django.core.management import call_command
+from django.test import TestCase, tag
+from edc_appointment.models import Appointment
+from edc_base import get_utcnow
+from edc_reference import site_reference_configs
+from edc_visit_schedule import site_visit_schedules
+from edc_visit_tracking.constants import SCHEDULED
+from io import StringIO
+
+from ..constants import CRF, KEYED, REQUIRED, REQUISITION
+from ..metadata_report import MetadataReport
+from ..models import CrfMetadata, RequisitionMetadata
+from .models import SubjectVisit, SubjectConsent, CrfOne
+from .reference_configs import register_to_site_reference_configs
+from .visit_schedule import visit_schedule
+from edc_facility.import_holidays import import_holidays
+
+
+class TestMetadataReport(TestCase):
+
+    def setUp(self):
+        import_holidays()
+        register_to_site_reference_configs()
+        site_visit_schedules._registry = {}
+        site_visit_schedules.loaded = False
+        site_visit_schedules.register(visit_schedule)
+        site_reference_configs.register_from_visit_schedule(
+            visit_models={
+                'edc_appointment.appointment': 'edc_metadata.subjectvisit'})
+        for subject_identifier in ['1111111', '2222222']:
+            subject_consent = SubjectConsent.objects.create(
+                subject_identifier=subject_identifier,
+                consent_datetime=get_utcnow())
+            _, schedule = site_visit_schedules.get_by_onschedule_model(
+                'edc_metadata.onschedule')
+            schedule.put_on_schedule(
+                subject_identifier=subject_identifier,
+                onschedule_datetime=subject_consent.consent_datetime)
+            appointment = Appointment.objects.get(
+                subject_identifier=subject_identifier,
+                visit_code=schedule.visits.first.code)
+            subject_visit = SubjectVisit.objects.create(
+                appointment=appointment, reason=SCHEDULED)
+        CrfOne.objects.create(subject_visit=subject_visit)
+
+    def test_rows(self):
+        rows = list(MetadataReport(entry_status=REQUIRED, chunk_size=2).rows())
+        self.assertEqual(
+            len([row for row in rows if row['category'] == CRF]),
+            CrfMetadata.objects.filter(entry_status=REQUIRED).count())
+        self.assertEqual(
+            len([row for row in rows if row['category'] == REQUISITION]),
+            RequisitionMetadata.objects.filter(entry_status=REQUIRED).count())
+        self.assertEqual(set(row['entry_status'] for row in rows), {REQUIRED})
+
+    def test_filters(self):
+        rows = list(MetadataReport(
+            subject_identifier='2222222', model='edc_metadata.crfone').rows())
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['entry_status'], KEYED)
+
+    def test_export_csv(self):
+        out = StringIO()
+        call_command('export_metadata', stdout=out)
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual(
+            len(rows),
+            CrfMetadata.objects.filter(entry_status=REQUIRED).count()
+            + RequisitionMetadata.objects.filter(entry_status=REQUIRED).count())
+
+    def test_export_jsonl(self):
+        out = StringIO()
+        call_command(
+            'export_metadata', format='jsonl', entry_status='all',
+            model='edc_metadata.crfone', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(
+            sorted([row['entry_status'] for row in rows]), [KEYED, REQUIRED])
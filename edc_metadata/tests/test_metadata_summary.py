@@ -0,0 +1,112 @@
+from django.core.management import call_command
+from django.test import TestCase, tag
+from edc_appointment.models import Appointment
+from edc_base import get_utcnow
+from edc_reference import site_reference_configs
+from edc_visit_schedule import site_visit_schedules
+from edc_visit_tracking.constants import SCHEDULED
+
+from ..constants import KEYED, NOT_REQUIRED, REQUIRED
+from ..metadata import Creator
+from ..metadata_updater import MetadataUpdater
+from ..model_resolvers import site_model_resolvers
+from ..models import CrfMetadata, RequisitionMetadata, MetadataSummary
+from .models import SubjectVisit, SubjectConsent, CrfOne
+from .reference_configs import register_to_site_reference_configs
+from .visit_schedule import visit_schedule
+from edc_facility.import_holidays import import_holidays
+
+
+class TestMetadataSummary(TestCase):
+
+    def setUp(self):
+        site_model_resolvers.app_config.metadata_summary_enabled = True
+        import_holidays()
+        register_to_site_reference_configs()
+        site_visit_schedules._registry = {}
+        site_visit_schedules.loaded = False
+        site_visit_schedules.register(visit_schedule)
+        site_reference_configs.register_from_visit_schedule(
+            visit_models={
+                'edc_appointment.appointment': 'edc_metadata.subjectvisit'})
+        self.subject_identifier = '1111111'
+        subject_consent = SubjectConsent.objects.create(
+            subject_identifier=self.subject_identifier,
+            consent_datetime=get_utcnow())
+        _, self.schedule = site_visit_schedules.get_by_onschedule_model(
+            'edc_metadata.onschedule')
+        self.schedule.put_on_schedule(
+            subject_identifier=self.subject_identifier,
+            onschedule_datetime=subject_consent.consent_datetime)
+        self.appointment = Appointment.objects.get(
+            subject_identifier=self.subject_identifier,
+            visit_code=self.schedule.visits.first.code)
+        self.subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+
+    def tearDown(self):
+        site_model_resolvers.app_config.metadata_summary_enabled = False
+
+    def get_counts(self):
+        counts = {}
+        for entry_status in [REQUIRED, KEYED, NOT_REQUIRED]:
+            counts.update({entry_status: (
+                CrfMetadata.objects.filter(
+                    visit_code=self.subject_visit.visit_code,
+                    entry_status=entry_status).count()
+                + RequisitionMetadata.objects.filter(
+                    visit_code=self.subject_visit.visit_code,
+                    entry_status=entry_status).count())})
+        return counts
+
+    def assertSummary(self):
+        obj = MetadataSummary.objects.get(
+            subject_identifier=self.subject_identifier,
+            visit_code=self.subject_visit.visit_code,
+            visit_code_sequence=self.subject_visit.visit_code_sequence)
+        self.assertEqual(
+            {REQUIRED: obj.required, KEYED: obj.keyed,
+             NOT_REQUIRED: obj.not_required},
+            self.get_counts())
+        return obj
+
+    def test_created_with_metadata(self):
+        obj = self.assertSummary()
+        self.assertGreater(obj.required, 0)
+        self.assertEqual(obj.keyed, 0)
+
+    def test_updated_on_save_and_delete(self):
+        crf_one = CrfOne.objects.create(subject_visit=self.subject_visit)
+        self.assertEqual(self.assertSummary().keyed, 1)
+        crf_one.delete()
+        self.assertEqual(self.assertSummary().keyed, 0)
+
+    def test_updated_on_bulk_update(self):
+        MetadataUpdater.bulk_update(
+            visit=self.subject_visit,
+            entry_statuses={
+                ('edc_metadata.crftwo', None): NOT_REQUIRED,
+                ('edc_metadata.crfthree', None): NOT_REQUIRED})
+        self.assertEqual(self.assertSummary().not_required, 2)
+
+    def test_unchanged_visit_is_one_query(self):
+        creator = Creator(visit=self.subject_visit)
+        with self.assertNumQueries(1):
+            creator.create()
+        self.assertSummary()
+
+    def test_bulk_create_updates_summary_if_written(self):
+        CrfMetadata.objects.filter(model='edc_metadata.crfone').delete()
+        MetadataSummary.objects.all().delete()
+        Creator(visit=self.subject_visit, update_keyed=True, bulk=True).create()
+        self.assertSummary()
+
+    def test_deleted_with_metadata(self):
+        self.subject_visit.delete()
+        self.assertFalse(MetadataSummary.objects.all().exists())
+
+    def test_rebuild_command(self):
+        CrfOne.objects.create(subject_visit=self.subject_visit)
+        MetadataSummary.objects.all().delete()
+        call_command('rebuild_metadata_summary')
+        self.assertEqual(self.assertSummary().keyed, 1)
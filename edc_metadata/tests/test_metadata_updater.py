@@ -1,16 +1,22 @@
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
+from django.db.models.signals import post_save
 from django.test import TestCase, tag
+from django.test.utils import CaptureQueriesContext
 from edc_appointment.models import Appointment
 from edc_base import get_utcnow
-from edc_metadata import NOT_REQUIRED, REQUIRED
+from edc_metadata import KEYED, NOT_REQUIRED, REQUIRED
 from edc_reference import site_reference_configs
 from edc_visit_schedule.site_visit_schedules import site_visit_schedules
 from edc_visit_tracking.constants import SCHEDULED
 
-from ..metadata_updater import MetadataUpdater
+from ..metadata import Creator
+from ..metadata_updater import MetadataUpdater, BulkMetadataUpdater
+from ..requisition import TargetPanelNotScheduledForVisit
 from ..models import CrfMetadata, RequisitionMetadata
-from ..target_handler import TargetModelLookupError, TargetModelNotScheduledForVisit
-from .models import SubjectVisit, SubjectConsent
+from ..target_handler import TargetModelConflict, TargetModelLookupError
+from ..target_handler import TargetModelNotScheduledForVisit
+from .models import SubjectVisit, SubjectConsent, CrfOne
 from .reference_configs import register_to_site_reference_configs
 from .visit_schedule import visit_schedule
 from edc_facility.import_holidays import import_holidays
@@ -101,3 +107,101 @@ class TestMetadataUpdater(TestCase):
             TargetModelNotScheduledForVisit,
             metadata_updater.update,
             entry_status=NOT_REQUIRED)
+
+    def test_bulk_update(self):
+        CrfOne.objects.create(subject_visit=self.subject_visit)
+        CrfMetadata.objects.filter(
+            visit_code=self.subject_visit.visit_code,
+            model='edc_metadata.crftwo').delete()
+        changed = MetadataUpdater.bulk_update(
+            visit=self.subject_visit,
+            entry_statuses={
+                ('edc_metadata.crfone', None): NOT_REQUIRED,
+                ('edc_metadata.crftwo', None): NOT_REQUIRED,
+                ('edc_metadata.crfthree', None): NOT_REQUIRED})
+        self.assertEqual(
+            changed, {('edc_metadata.crftwo', None): NOT_REQUIRED,
+                      ('edc_metadata.crfthree', None): NOT_REQUIRED})
+        for model, entry_status in [('edc_metadata.crfone', KEYED),
+                                    ('edc_metadata.crftwo', NOT_REQUIRED),
+                                    ('edc_metadata.crfthree', NOT_REQUIRED)]:
+            self.assertEqual(CrfMetadata.objects.get(
+                visit_code=self.subject_visit.visit_code,
+                model=model).entry_status, entry_status)
+
+    def test_bulk_update_query_budget(self):
+        entry_statuses = {
+            ('edc_metadata.crftwo', None): NOT_REQUIRED,
+            ('edc_metadata.crfthree', None): NOT_REQUIRED}
+        updater = BulkMetadataUpdater(
+            visit=self.subject_visit, entry_statuses=entry_statuses)
+        saved = []
+
+        def on_post_save(sender, instance, update_fields, **kwargs):
+            saved.append((instance.model, instance.entry_status))
+
+        post_save.connect(on_post_save, sender=CrfMetadata)
+        try:
+            with CaptureQueriesContext(connection) as context:
+                updater.update()
+        finally:
+            post_save.disconnect(on_post_save, sender=CrfMetadata)
+        # existing metadata, one UPDATE, the rows read for post_save
+        self.assertEqual(len([
+            query for query in context.captured_queries
+            if 'edc_metadata_crfmetadata' in query['sql']]), 3)
+        self.assertEqual(
+            sorted(saved), [('edc_metadata.crfthree', NOT_REQUIRED),
+                            ('edc_metadata.crftwo', NOT_REQUIRED)])
+
+    def test_bulk_update_does_not_overwrite_concurrent_update(self):
+
+        class MyCreator(Creator):
+            @property
+            def existing(self):
+                existing = super().existing
+                CrfMetadata.objects.filter(
+                    model='edc_metadata.crftwo').update(entry_status=KEYED)
+                return existing
+
+        class MyBulkMetadataUpdater(BulkMetadataUpdater):
+            creator_cls = MyCreator
+
+        MyBulkMetadataUpdater(
+            visit=self.subject_visit,
+            entry_statuses={
+                ('edc_metadata.crftwo', None): NOT_REQUIRED,
+                ('edc_metadata.crfthree', None): NOT_REQUIRED}).update()
+        self.assertEqual(CrfMetadata.objects.get(
+            model='edc_metadata.crftwo').entry_status, KEYED)
+        self.assertEqual(CrfMetadata.objects.get(
+            model='edc_metadata.crfthree').entry_status, NOT_REQUIRED)
+
+    def test_bulk_update_panel_of_other_model(self):
+        self.assertRaises(
+            TargetPanelNotScheduledForVisit,
+            BulkMetadataUpdater,
+            visit=self.subject_visit,
+            entry_statuses={('edc_metadata.crfone', 'one'): NOT_REQUIRED})
+
+    def test_bulk_update_not_scheduled(self):
+        self.assertRaises(
+            TargetModelNotScheduledForVisit,
+            BulkMetadataUpdater,
+            visit=self.subject_visit,
+            entry_statuses={('edc_metadata.crfseven', None): NOT_REQUIRED})
+        self.assertRaises(
+            TargetModelLookupError,
+            BulkMetadataUpdater,
+            visit=self.subject_visit,
+            entry_statuses={('edc_metadata.blah', None): NOT_REQUIRED})
+        self.assertRaises(
+            TargetModelConflict,
+            BulkMetadataUpdater,
+            visit=self.subject_visit,
+            entry_statuses={('edc_metadata.subjectvisit', None): NOT_REQUIRED})
+        self.assertRaises(
+            TargetModelNotScheduledForVisit,
+            BulkMetadataUpdater,
+            visit=self.subject_visit,
+            entry_statuses={('edc_metadata.subjectrequisition', None): NOT_REQUIRED})
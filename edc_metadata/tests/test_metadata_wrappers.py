@@ -5,6 +5,7 @@ from edc_reference import site_reference_configs
 from edc_visit_schedule.site_visit_schedules import site_visit_schedules
 from edc_visit_tracking.constants import SCHEDULED
 
+from ..metadata import MetadataRecord
 from ..metadata_wrappers import RequisitionMetadataWrapper, CrfMetadataWrapper
 from ..metadata_wrappers import MetadataWrapperError
 from ..metadata_wrappers import RequisitionMetadataWrappers, CrfMetadataWrappers
@@ -137,3 +138,72 @@ class TestMetadataWrapperObjects(TestCase):
         requisition_metadata_wrappers = RequisitionMetadataWrappers(
             appointment=self.appointment)
         self.assertEqual(len(requisition_metadata_wrappers.objects), 6)
+
+    def test_get_requisitions_one_query_per_model(self):
+        model_obj = SubjectRequisition.objects.create(
+            subject_visit=self.subject_visit,
+            panel=self.panel_one)
+        with self.assertNumQueries(2):
+            requisition_metadata_wrappers = RequisitionMetadataWrappers(
+                appointment=self.appointment)
+        model_objs = {
+            wrapper.panel_name: wrapper.model_obj
+            for wrapper in requisition_metadata_wrappers.objects}
+        self.assertEqual(model_objs.pop(self.panel_one.name), model_obj)
+        self.assertEqual(set(model_objs.values()), {None})
+
+    def test_get_crfs_reads_instances(self):
+        crf_metadata_wrappers = CrfMetadataWrappers(
+            appointment=self.appointment)
+        for wrapper in crf_metadata_wrappers.objects:
+            self.assertIsInstance(wrapper.metadata_obj, CrfMetadata)
+
+    def test_get_crfs_reads_records(self):
+
+        class MyCrfMetadataWrappers(CrfMetadataWrappers):
+            metadata_projection = True
+
+        crf_metadata_wrappers = MyCrfMetadataWrappers(
+            appointment=self.appointment)
+        for wrapper in crf_metadata_wrappers.objects:
+            self.assertIsInstance(wrapper.metadata_obj, MetadataRecord)
+
+    def test_get_crfs_deletes_invalid_metadata(self):
+        CrfMetadata.objects.create(
+            subject_identifier=self.subject_identifier,
+            model='edc_metadata.blah',
+            show_order=9999,
+            **self.subject_visit.metadata_query_options)
+        crf_metadata_wrappers = CrfMetadataWrappers(
+            appointment=self.appointment)
+        self.assertEqual(len(crf_metadata_wrappers.objects), 5)
+        self.assertFalse(
+            CrfMetadata.objects.filter(model='edc_metadata.blah').exists())
+
+    def test_get_crfs_raises_on_duplicate_model_obj(self):
+        CrfOne.objects.create(subject_visit=self.subject_visit)
+        CrfOne.objects.bulk_create([
+            CrfOne(subject_visit=self.subject_visit, report_datetime=get_utcnow())])
+        self.assertRaises(
+            CrfOne.MultipleObjectsReturned,
+            CrfMetadataWrappers, appointment=self.appointment)
+
+    def test_wrapper_with_options_is_not_batched(self):
+
+        class MyCrfMetadataWrapper(CrfMetadataWrapper):
+            batch_model_objs = False
+
+            @property
+            def options(self):
+                options = super().options
+                options.update(f1='car')
+                return options
+
+        class MyCrfMetadataWrappers(CrfMetadataWrappers):
+            metadata_wrapper_cls = MyCrfMetadataWrapper
+
+        CrfOne.objects.create(subject_visit=self.subject_visit, f1='bicycle')
+        wrappers = MyCrfMetadataWrappers(appointment=self.appointment)
+        self.assertEqual(
+            [wrapper.model_obj for wrapper in wrappers.objects
+             if wrapper.metadata_obj.model == 'edc_metadata.crfone'], [None])
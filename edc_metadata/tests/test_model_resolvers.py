@@ -0,0 +1,38 @@
+from django.apps import apps as django_apps
+from django.test import TestCase, tag
+
+from ..constants import CRF, REQUISITION
+from ..model_resolvers import site_model_resolvers
+from ..models import CrfMetadata, RequisitionMetadata
+from .reference_configs import register_to_site_reference_configs
+
+
+class TestModelResolvers(TestCase):
+
+    def setUp(self):
+        register_to_site_reference_configs()
+        site_model_resolvers.reset()
+
+    def test_metadata_models(self):
+        self.assertEqual(site_model_resolvers.get_metadata_model(CRF), CrfMetadata)
+        self.assertEqual(
+            site_model_resolvers.get_metadata_model(REQUISITION), RequisitionMetadata)
+        self.assertIsNone(site_model_resolvers.get_metadata_model('blah'))
+
+    def test_resolves_once(self):
+        site_model_resolvers.get_model('edc_metadata.crfone')
+        site_model_resolvers.get_reference_model_cls(name='edc_metadata.crfone')
+        self.assertIn('edc_metadata.crfone', site_model_resolvers.models)
+        self.assertIn('edc_metadata.crfone', site_model_resolvers.reference_models)
+        self.assertEqual(
+            site_model_resolvers.get_model('edc_metadata.crfone'),
+            django_apps.get_model('edc_metadata.crfone'))
+
+    def test_invalid_model_raises(self):
+        self.assertRaises(LookupError, site_model_resolvers.get_model, 'edc_metadata.blah')
+        self.assertNotIn('edc_metadata.blah', site_model_resolvers.models)
+
+    def test_reset(self):
+        site_model_resolvers.get_metadata_model(CRF)
+        site_model_resolvers.reset()
+        self.assertEqual(site_model_resolvers.metadata_models, {})
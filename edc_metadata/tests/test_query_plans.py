@@ -0,0 +1,69 @@
+from django.db import connection
+from django.test import TestCase
+from unittest import skipUnless
+
+from ..constants import REQUIRED
+from ..models import CrfMetadata, RequisitionMetadata
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is sqlite only')
+class TestQueryPlans(TestCase):
+
+    """Checks that each query shape issued on the metadata
+    models uses an index.
+    """
+
+    def get_plan(self, queryset=None):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset=None, ordered=None):
+        plan = self.get_plan(queryset)
+        table = queryset.model._meta.db_table
+        for detail in plan:
+            self.assertFalse(
+                detail.startswith('SCAN') and table in detail,
+                msg=f'Full table scan. Got {plan}')
+            if ordered:
+                self.assertNotIn('TEMP B-TREE', detail, msg=f'Sorted. Got {plan}')
+
+    def test_visit_ordered_by_show_order(self):
+        """MetadataGetter.
+        """
+        for model_cls in [CrfMetadata, RequisitionMetadata]:
+            self.assertUsesIndex(
+                model_cls.objects.filter(
+                    subject_identifier='1', visit_code='1000',
+                    visit_code_sequence=0).order_by('show_order'),
+                ordered=True)
+
+    def test_visit_and_model(self):
+        """MetadataHandler, Creator, BulkMetadataUpdater, Resetter.
+        """
+        options = dict(
+            subject_identifier='1', visit_schedule_name='visit_schedule',
+            schedule_name='schedule', visit_code='1000',
+            visit_code_sequence=0)
+        self.assertUsesIndex(
+            CrfMetadata.objects.filter(model='app_label.crfone', **options))
+        self.assertUsesIndex(
+            RequisitionMetadata.objects.filter(
+                model='app_label.requisition', panel_name='one', **options))
+        self.assertUsesIndex(CrfMetadata.objects.filter(**options))
+
+    def test_entry_status_model_site(self):
+        """MetadataReport.
+        """
+        for model_cls in [CrfMetadata, RequisitionMetadata]:
+            self.assertUsesIndex(model_cls.objects.filter(entry_status=REQUIRED))
+            self.assertUsesIndex(model_cls.objects.filter(
+                entry_status=REQUIRED, model='app_label.crfone', site_id=1))
+
+    def test_visit_schedule_name(self):
+        """update_metadata.
+        """
+        for model_cls in [CrfMetadata, RequisitionMetadata]:
+            self.assertUsesIndex(
+                model_cls.objects.filter(visit_schedule_name='visit_schedule'))
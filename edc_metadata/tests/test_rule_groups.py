@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from django.test import TestCase, tag
+from edc_metadata_rules import CrfRule, CrfRuleGroup, P
+from edc_metadata_rules.site import site_metadata_rules
+
+from ..constants import NOT_REQUIRED, REQUIRED
+from ..rule_groups import site_rule_groups
+
+
+class CrfRuleGroupOne(CrfRuleGroup):
+
+    crfs_car = CrfRule(
+        predicate=P('f1', 'eq', 'car'),
+        consequence=REQUIRED,
+        alternative=NOT_REQUIRED,
+        target_models=['crftwo'])
+
+    class Meta:
+        app_label = 'edc_metadata'
+        source_model = 'edc_metadata.crfone'
+
+
+class CrfRuleGroupTwo(CrfRuleGroup):
+
+    crfs_visit = CrfRule(
+        predicate=P('reason', 'eq', 'blah'),
+        consequence=REQUIRED,
+        alternative=NOT_REQUIRED,
+        target_models=['crfthree'])
+
+    class Meta:
+        app_label = 'edc_metadata'
+
+
+class CrfRuleGroupThree(CrfRuleGroup):
+
+    crfs_bicycle = CrfRule(
+        predicate=P('f1', 'eq', 'bicycle'),
+        consequence=NOT_REQUIRED,
+        alternative=REQUIRED,
+        target_models=['crftwo'])
+
+    class Meta:
+        app_label = 'edc_metadata'
+        source_model = 'edc_metadata.crffour'
+
+
+class TestRuleGroups(TestCase):
+
+    def setUp(self):
+        self.registry = site_metadata_rules.registry
+        site_metadata_rules.registry = OrderedDict()
+        site_metadata_rules.register(CrfRuleGroupOne)
+        site_metadata_rules.register(CrfRuleGroupTwo)
+        site_rule_groups.reset()
+
+    def tearDown(self):
+        site_metadata_rules.registry = self.registry
+        site_rule_groups.reset()
+
+    def test_source_model(self):
+        self.assertEqual(
+            site_rule_groups.get_rule_groups(
+                app_label='edc_metadata', model='edc_metadata.crfone'),
+            (CrfRuleGroupOne, CrfRuleGroupTwo))
+
+    def test_target_model(self):
+        self.assertEqual(
+            site_rule_groups.get_rule_groups(
+                app_label='edc_metadata', model='edc_metadata.crftwo'),
+            (CrfRuleGroupOne, CrfRuleGroupTwo))
+
+    def test_unrelated_model_runs_groups_without_source_model(self):
+        self.assertEqual(
+            site_rule_groups.get_rule_groups(
+                app_label='edc_metadata', model='edc_metadata.crffour'),
+            (CrfRuleGroupTwo, ))
+        self.assertEqual(
+            site_rule_groups.get_rule_groups(
+                app_label='blah', model='edc_metadata.crffour'), ())
+
+    def test_recompiles_on_register(self):
+        site_rule_groups.get_rule_groups(
+            app_label='edc_metadata', model='edc_metadata.crfone')
+        site_metadata_rules.registry = OrderedDict()
+        site_metadata_rules.register(CrfRuleGroupTwo)
+        self.assertEqual(
+            site_rule_groups.get_rule_groups(
+                app_label='edc_metadata', model='edc_metadata.crfone'),
+            (CrfRuleGroupTwo, ))
+
+    def test_runs_groups_with_same_target(self):
+        site_metadata_rules.register(CrfRuleGroupThree)
+        for model in ['edc_metadata.crfone', 'edc_metadata.crffour']:
+            with self.subTest(model=model):
+                self.assertEqual(
+                    site_rule_groups.get_rule_groups(
+                        app_label='edc_metadata', model=model),
+                    (CrfRuleGroupOne, CrfRuleGroupTwo, CrfRuleGroupThree))
@@ -0,0 +1,114 @@
+from django.apps import apps as django_apps
+from django.test import TestCase, tag
+from edc_appointment.models import Appointment
+from edc_base import get_utcnow
+from edc_reference import site_reference_configs
+from edc_visit_schedule import site_visit_schedules
+from edc_visit_tracking.constants import SCHEDULED
+
+from ..constants import CRF, KEYED, NOT_REQUIRED, REQUIRED, REQUISITION
+from ..metadata import SubjectMetadataTimeline
+from ..models import CrfMetadata, RequisitionMetadata
+from .models import SubjectVisit, SubjectConsent, CrfOne
+from .reference_configs import register_to_site_reference_configs
+from .visit_schedule import visit_schedule
+from edc_facility.import_holidays import import_holidays
+
+
+class TestSubjectMetadataTimeline(TestCase):
+
+    def setUp(self):
+        import_holidays()
+        register_to_site_reference_configs()
+        site_visit_schedules._registry = {}
+        site_visit_schedules.loaded = False
+        site_visit_schedules.register(visit_schedule)
+        site_reference_configs.register_from_visit_schedule(
+            visit_models={
+                'edc_appointment.appointment': 'edc_metadata.subjectvisit'})
+        self.subject_identifier = '1111111'
+        subject_consent = SubjectConsent.objects.create(
+            subject_identifier=self.subject_identifier,
+            consent_datetime=get_utcnow())
+        _, self.schedule = site_visit_schedules.get_by_onschedule_model(
+            'edc_metadata.onschedule')
+        self.schedule.put_on_schedule(
+            subject_identifier=self.subject_identifier,
+            onschedule_datetime=subject_consent.consent_datetime)
+        self.appointment = Appointment.objects.get(
+            subject_identifier=self.subject_identifier,
+            visit_code=self.schedule.visits.first.code)
+        self.subject_visit = SubjectVisit.objects.create(
+            appointment=self.appointment, reason=SCHEDULED)
+        CrfOne.objects.create(subject_visit=self.subject_visit)
+
+    def count(self, entry_status=None):
+        return (CrfMetadata.objects.filter(entry_status=entry_status).count()
+                + RequisitionMetadata.objects.filter(entry_status=entry_status).count())
+
+    def test_loads_in_two_queries(self):
+        with self.assertNumQueries(2):
+            timeline = SubjectMetadataTimeline(
+                subject_identifier=self.subject_identifier)
+        self.assertEqual(
+            len(timeline),
+            CrfMetadata.objects.all().count() + RequisitionMetadata.objects.all().count())
+        self.assertEqual(len(timeline.visits), 1)
+        self.assertEqual(list(timeline.offsets), [0, len(timeline)])
+        self.assertEqual(
+            timeline.get_visit_index(
+                self.subject_visit.visit_schedule_name,
+                self.subject_visit.schedule_name,
+                self.subject_visit.visit_code, 0), 0)
+        self.assertRaises(
+            ValueError, timeline.get_visit_index,
+            self.subject_visit.visit_schedule_name, 'blah',
+            self.subject_visit.visit_code, 0)
+        self.assertEqual(list(timeline.show_orders), sorted(timeline.show_orders))
+
+    def test_visits_ordered_by_visit_schedule(self):
+        metadata_obj = CrfMetadata.objects.filter(
+            visit_code=self.subject_visit.visit_code).first()
+        for visit_code in ['0500', '2000']:
+            CrfMetadata.objects.create(
+                subject_identifier=self.subject_identifier,
+                visit_schedule_name=metadata_obj.visit_schedule_name,
+                schedule_name=metadata_obj.schedule_name,
+                visit_code=visit_code,
+                model=metadata_obj.model,
+                show_order=metadata_obj.show_order)
+        timeline = SubjectMetadataTimeline(subject_identifier=self.subject_identifier)
+        self.assertEqual(
+            [visit_key[2] for visit_key in timeline.visits],
+            [self.subject_visit.visit_code, '2000', '0500'])
+
+    def test_counts(self):
+        timeline = SubjectMetadataTimeline(subject_identifier=self.subject_identifier)
+        for entry_status in [REQUIRED, KEYED, NOT_REQUIRED]:
+            self.assertEqual(timeline.counts(entry_status), [self.count(entry_status)])
+        keyed = self.count(KEYED)
+        self.assertEqual(
+            timeline.percent_complete(),
+            [round(100.0 * keyed / (keyed + self.count(REQUIRED)), 1)])
+
+    def test_first_required(self):
+        timeline = SubjectMetadataTimeline(subject_identifier=self.subject_identifier)
+        show_order = min(
+            [obj.show_order for obj in CrfMetadata.objects.filter(entry_status=REQUIRED)]
+            + [obj.show_order for obj in RequisitionMetadata.objects.filter(
+                entry_status=REQUIRED)])
+        category, model, _, entry_status, first_show_order = timeline.first_required()[0]
+        self.assertIn(category, [CRF, REQUISITION])
+        self.assertEqual(entry_status, REQUIRED)
+        self.assertEqual(first_show_order, show_order)
+
+    def test_app_config(self):
+        timeline = django_apps.get_app_config('edc_metadata').get_metadata_timeline(
+            self.subject_identifier)
+        self.assertEqual(len(timeline.visits), 1)
+
+    def test_unknown_subject(self):
+        timeline = SubjectMetadataTimeline(subject_identifier='blah')
+        self.assertEqual(len(timeline), 0)
+        self.assertEqual(timeline.counts(REQUIRED), [])
+        self.assertEqual(timeline.percent_complete(), [])
@@ -12,6 +12,7 @@ from edc_visit_schedule.site_visit_schedules import site_visit_schedules
 from edc_visit_tracking.constants import SCHEDULED
 
 from ..models import CrfMetadata, RequisitionMetadata
+from ..panels import site_panels
 from ..view_mixins import MetaDataViewMixin
 from .models import SubjectConsent, SubjectVisit, CrfOne, CrfThree
 from .reference_configs import register_to_site_reference_configs
@@ -106,6 +107,31 @@ class TestViewMixin(TestCase):
         context_data = view.get_context_data()
         self.assertEqual(len(context_data.get('requisitions')), 6)
 
+    def test_view_mixin_caches_panels(self):
+        view = MyView()
+        view.appointment = self.appointment
+        view.subject_identifier = self.subject_identifier
+        site_panels.reset()
+        view.get_context_data()
+        self.assertEqual(len(site_panels.registry.get('edc_lab.panel')), 6)
+        metadata_wrappers = view.requisition_metadata_wrappers_cls(
+            appointment=self.appointment)
+        with self.assertNumQueries(0):
+            view.get_requisition_model_wrapper(
+                metadata_wrappers=metadata_wrappers)
+        Panel.objects.create(name='seven')
+        self.assertNotIn('edc_lab.panel', site_panels.registry)
+
+    def test_site_panels_reloads_missing_name_once(self):
+        site_panels.reset()
+        site_panels.get(name='blah', panel_model='edc_lab.panel')
+        with self.assertNumQueries(1):
+            self.assertIsNone(
+                site_panels.get(name='blah', panel_model='edc_lab.panel'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(
+                site_panels.get(name='blah', panel_model='edc_lab.panel'))
+
     def test_view_mixin_context_data_crfs_unscheduled(self):
         self.appointment.appt_status = INCOMPLETE_APPT
         self.appointment.save()
@@ -1,6 +1,5 @@
 from django.apps import apps as django_apps
 from django.contrib import messages
-from django.core.exceptions import ObjectDoesNotExist
 from django.utils.safestring import mark_safe
 from django.views.generic.base import ContextMixin
 from edc_appointment.constants import IN_PROGRESS_APPT
@@ -8,6 +7,7 @@ from edc_visit_schedule.model_wrappers import RequisitionModelWrapper, CrfModelW
 
 from ..constants import CRF, NOT_REQUIRED, REQUISITION, REQUIRED, KEYED
 from ..metadata_wrappers import CrfMetadataWrappers, RequisitionMetadataWrappers
+from ..panels import site_panels
 
 
 class MetaDataViewError(Exception):
@@ -83,12 +83,15 @@ class MetaDataViewMixin(ContextMixin):
         return model_wrappers
 
     def get_panel(self, metadata_wrapper=None):
-        try:
-            panel = self.panel_model_cls.objects.get(
-                name=metadata_wrapper.panel_name)
-        except ObjectDoesNotExist as e:
+        """Returns the panel model instance from site_panels.
+        """
+        panel = site_panels.get(
+            name=metadata_wrapper.panel_name,
+            panel_model=self.panel_model_cls._meta.label_lower)
+        if not panel:
             raise MetaDataViewError(
-                f'{e} Got panel name \'{metadata_wrapper.panel_name}\'. '
+                f'{self.panel_model_cls._meta.object_name} matching query '
+                f'does not exist. Got panel name \'{metadata_wrapper.panel_name}\'. '
                 f'See {metadata_wrapper}.')
         return panel
 